@@ -11,37 +11,79 @@ import logging
 import os
 import sys
 
-from PySide6.QtCore import QTimer
-from PySide6.QtWidgets import QApplication
-
-from src.core.app import AppContext
-from src.core.config import load_config
-from src.core.events import EventBus
-from src.core.logger import setup_logging
-from src.core.registry import autodiscover_modules
-from src.ui.main_window import MainWindow
+from src.core.startup import PROFILE_FLAG, StartupProfiler
 
 
 def main() -> None:
     """Инициализация зависимостей и запуск главного окна."""
 
+    startup = StartupProfiler()
+    profile_startup = PROFILE_FLAG in sys.argv
+    if profile_startup:
+        sys.argv.remove(PROFILE_FLAG)
+        startup.install()
+
+    # Тяжёлые зависимости импортируются здесь, чтобы их время попадало в
+    # профиль запуска.
+    from PySide6.QtCore import QTimer
+    from PySide6.QtWidgets import QApplication
+
+    from src.app.app import watch_result_cache
+    from src.core.app import AppContext
+    from src.core.container import container
+    from src.core.events import EventBus
+    from src.core.logger import setup_logging, shutdown_logging
+    from src.core.module_api import profiler
+    from src.core.registry import autodiscover_modules
+    from src.ui.main_window import MainWindow
+    from src.ui.startup import on_first_paint
+
+    startup.mark("imports")
+
     context = AppContext()
     context.ensure_dirs()
-    setup_logging(context.logs_dir)
+    setup_logging(context.logs_dir, json_lines=bool(os.getenv("APP_LOG_JSON")))
 
     event_bus = EventBus()
+    stats_budget = os.getenv("APP_EVENT_STATS")
+    if stats_budget:
+        # Значение — бюджет обработчика в GUI-потоке, мс.
+        event_bus.enable_stats(float(stats_budget))
     context.set("event_bus", event_bus)
+    if os.getenv("APP_PROFILE_MODULES"):
+        profiler.enable()
+
+    # Независимые сервисы (конфигурация, локальная БД, шифрование) создаются
+    # в фоне, пока импортируются модули и строится окно.
+    context.set("warm_up", container.warm_up())
 
-    config = load_config()
     autodiscover_modules()
+    config = container.get("config")
+    config_service = container.get("config_service")
+    config_service.bus = event_bus
+    config_service.start_watching()
+    container.get("task_runner").bus = event_bus
+    container.get("connection_manager").bus = event_bus
+    watch_result_cache(event_bus)
     logging.info("Приложение запущено")
 
     app = QApplication(sys.argv)
+    startup.mark("qapplication")
     app.setOrganizationName("mssql-module-construct")
     app.setApplicationName(config.app_name)
 
     window = MainWindow(config, event_bus)
     window.resize(800, 600)
+    startup.mark("main_window")
+    if profile_startup:
+
+        def report_startup() -> None:
+            startup.mark("first_paint")
+            startup.uninstall()
+            path = startup.dump(context.logs_dir / "startup_profile.json")
+            logging.info("Профиль запуска (%s):\n%s", path, startup.format_report())
+
+        on_first_paint(window, report_startup)
     window.show()
 
     delay = os.getenv("APP_AUTOSTOP_DELAY")
@@ -49,7 +91,14 @@ def main() -> None:
         QTimer.singleShot(int(delay), app.quit)
 
     def on_exit() -> None:
+        if stats_budget:
+            logging.info("Статистика событий:\n%s", event_bus.dump_stats())
+        if profiler.enabled:
+            path = profiler.dump(context.logs_dir / "module_profile.json")
+            logging.info("Профиль модулей (%s):\n%s", path, profiler.format_report())
+        container.shutdown()
         logging.info("Приложение остановлено")
+        shutdown_logging()
 
     atexit.register(on_exit)
     sys.exit(app.exec())
@@ -0,0 +1,10 @@
+"""Точка входа пакетного режима: выгрузка наборов данных без GUI."""
+
+from __future__ import annotations
+
+import sys
+
+from src.app.batch import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,774 @@
+"""Пакетный запуск выгрузок без графического интерфейса.
+
+Модуль не импортирует Qt: конфигурация, локальная БД и шифрование
+загружаются напрямую, поэтому накладные расходы запуска — миллисекунды.
+
+Примеры::
+
+    python run_batch.py export-key /secure/app.key
+    APP_KEY_FILE=/secure/app.key python run_batch.py run sales orders --jobs 4
+    APP_KEY_FILE=/secure/app.key python run_batch.py run --all
+    APP_KEY_FILE=/secure/app.key python run_batch.py run sales --no-cache
+    APP_KEY_FILE=/secure/app.key python run_batch.py run orders --unordered
+    APP_KEY_FILE=/secure/app.key python run_batch.py run report --server-jobs 2 --force
+    APP_KEY_FILE=/secure/app.key python run_batch.py diagnose --profile prod -o report.txt
+"""
+
+from __future__ import annotations
+
+import argparse
+import getpass
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Sequence
+
+from ..core.app import AppContext
+from ..core.container import container
+from ..core.logger import setup_logging, shutdown_logging
+from ..modules.datasets import (
+    COMPRESSION_SUFFIXES,
+    FORMATS,
+    CachedResult,
+    CycleError,
+    Dataset,
+    DatasetManager,
+    DigestSink,
+    NodeRun,
+    ResultCache,
+    RunRecord,
+    critical_path,
+    fetch_partitioned,
+    normalize_sql,
+    open_sink,
+    referenced_tables,
+    run_graph,
+    tee,
+    topological_order,
+    watermark_query,
+)
+from ..modules.datasource import ConnectionManager, ConnectionProfile, ServerSlots
+from ..modules.envcheck import CheckStatus, format_report, run_diagnostics, write_report
+from ..modules.schema import SchemaCache
+from ..modules.security import validate_sql
+
+#: Переменная окружения с путём к файлу ключа шифрования.
+KEY_FILE_ENV = "APP_KEY_FILE"
+
+log = logging.getLogger("app")
+
+
+class BatchError(RuntimeError):
+    """Ошибка подготовки пакетного запуска."""
+
+
+@dataclass
+class ExportResult:
+    """Результат выгрузки одного набора данных."""
+
+    dataset: Dataset
+    paths: List[Path]
+    rows: int = 0
+    duration_ms: float = 0.0
+    error: Optional[str] = None
+    #: Время готовности каждого файла, мс.
+    output_ms: Dict[Path, float] = field(default_factory=dict)
+    #: Результат взят из кеша, без полного запроса к серверу.
+    cached: bool = False
+    #: Число строк, догруженных выше сохранённого водяного знака.
+    appended: Optional[int] = None
+    #: Выгрузка пропущена: входные данные не изменились с прошлого запуска,
+    #: файлы не создавались (``paths`` пуст).
+    skipped: bool = False
+    #: Отпечаток выгруженных строк (см. ``DigestSink``).
+    fingerprint: Optional[str] = None
+    #: Отпечаток запроса и отпечатков зависимостей.
+    inputs: Optional[str] = None
+    #: Время ожидания свободного места после готовности зависимостей, мс.
+    wait_ms: float = 0.0
+
+    @property
+    def path(self) -> Optional[Path]:
+        return self.paths[0] if self.paths else None
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", name).strip("_") or "dataset"
+
+
+def _suffix(fmt: str, compression: Optional[str]) -> str:
+    # XLSX уже сжат внутри; дополнительное сжатие применяется только к тексту.
+    if compression and fmt != "xlsx":
+        return f".{fmt}{COMPRESSION_SUFFIXES[compression]}"
+    return f".{fmt}"
+
+
+def unlock_crypto(crypto, key_file: Optional[str]) -> None:
+    """Разблокирует ``CryptoManager`` ключом из файла."""
+
+    key_file = key_file or os.getenv(KEY_FILE_ENV)
+    if not key_file:
+        raise BatchError(f"Не задан файл ключа: укажите --key-file или {KEY_FILE_ENV}")
+    try:
+        key = Path(key_file).read_bytes()
+    except OSError as exc:
+        raise BatchError(f"Не удалось прочитать файл ключа {key_file}: {exc}") from exc
+    if not crypto.unlock_with_key(key):
+        raise BatchError(f"Ключ из {key_file} не подходит к хранилищу секретов")
+
+
+def export_dataset(
+    manager: ConnectionManager,
+    profile: ConnectionProfile,
+    dataset: Dataset,
+    paths: Sequence[Path],
+    cache: Optional[ResultCache] = None,
+    slots: Optional[ServerSlots] = None,
+    ordered: bool = True,
+    digest: bool = False,
+    partition_column: Optional[str] = None,
+    watermark_column: Optional[str] = None,
+) -> ExportResult:
+    """Выполняет запрос набора данных один раз и записывает результат во все ``paths``.
+
+    Формат каждого файла определяется его расширением (см. ``open_sink``).
+    Если у набора задан ``cache_ttl``, а в ``cache`` есть результат не
+    старше этого срока, сервер не запрашивается; иначе свежий результат
+    попутно сохраняется в кеш. Если задан ``watermark_column`` (см.
+    ``watermark_key``), при наличии кеша запрашиваются только строки выше
+    сохранённого значения этого столбца; они дописываются в кеш, а файлы
+    выгружаются из кеша.
+
+    Если задан ``partition_column`` (см. ``partition_key``) и у набора
+    ``partitions`` > 1, полная выгрузка выполняется параллельно по
+    диапазонам этого ключа (см. ``fetch_partitioned``);
+    при ``ordered=False`` строки идут в порядке поступления. Каждое
+    подключение занимает место в ``slots`` сервера профиля. При
+    ``digest=True`` в ``fingerprint`` сохраняется отпечаток строк.
+    """
+
+    result = ExportResult(dataset, list(paths))
+    slot = _server_slot(slots, profile)
+    started = time.perf_counter()
+    try:
+        validate_sql(dataset.query)
+        sinks = [open_sink(path) for path in paths]
+        digest_sink = DigestSink() if digest else None
+        if digest_sink is not None:
+            sinks.append(digest_sink)
+        key = cached = None
+        watermark = watermark_column
+        if cache is not None and (dataset.cache_ttl or watermark):
+            key = cache.key(profile.id, dataset.query)
+            if watermark:
+                cached = _refresh_incremental(
+                    manager, profile, dataset, watermark, cache, key, result, slot
+                )
+            else:
+                cached = cache.get(key, max_age=dataset.cache_ttl)
+        if cached is not None:
+            result.rows = tee(cached.cursor(), sinks)
+            result.cached = True
+            cached.close()
+        else:
+            if key is not None:
+                sinks.append(
+                    cache.sink(
+                        key,
+                        watermark=watermark,
+                        profile_id=profile.id,
+                        dataset_id=dataset.id,
+                    )
+                )
+            if partition_column and (dataset.partitions or 1) > 1:
+                cursor = fetch_partitioned(
+                    lambda: manager.connect(profile),
+                    dataset.query,
+                    partition_column,
+                    dataset.partitions,
+                    ordered=ordered,
+                    timeout=profile.query_timeout,
+                    slot=slot,
+                )
+                try:
+                    result.rows = tee(cursor, sinks)
+                finally:
+                    cursor.close()
+            else:
+                with slot():
+                    connection = manager.connect(profile)
+                    try:
+                        cursor = connection.cursor()
+                        cursor.timeout = profile.query_timeout
+                        cursor.execute(dataset.query)
+                        result.rows = tee(cursor, sinks)
+                    finally:
+                        connection.close()
+        result.output_ms = {sink.path: sink.duration_ms for sink in sinks[: len(paths)]}
+        if digest_sink is not None:
+            result.fingerprint = digest_sink.digest
+    except Exception as exc:  # noqa: BLE001 - ошибка одного набора не прерывает остальные
+        result.error = str(exc) or type(exc).__name__
+        for path in paths:
+            path.unlink(missing_ok=True)
+    result.duration_ms = (time.perf_counter() - started) * 1000
+    return result
+
+
+def _key_candidates(
+    dataset: Dataset, columns: Callable[[str, Optional[str]], List[str]]
+) -> Optional[List[str]]:
+    # Подходящие столбцы всех таблиц запроса; ``None``, если запрос нельзя обернуть.
+    try:
+        tables = referenced_tables(dataset.query)
+    except ValueError as exc:
+        log.warning("Набор %s: запрос нельзя обернуть: %s", dataset.name, exc)
+        return None
+    candidates: List[str] = []
+    for schema, table in tables:
+        for column in columns(table, schema or "dbo"):
+            if column not in candidates:
+                candidates.append(column)
+    return candidates
+
+
+def _match(candidates: List[str], column: str) -> Optional[str]:
+    return next((c for c in candidates if c.lower() == column.lower()), None)
+
+
+def partition_key(schemas: SchemaCache, profile: ConnectionProfile, dataset: Dataset) -> Optional[str]:
+    """Ключ разбиения набора по снимку схемы подключения (``profile.name``).
+
+    Подходят первые столбцы первичного ключа и индексов таблиц из запроса
+    (см. ``SchemaCache.partition_columns``). Заданный ``partition_column``
+    проверяется по ним, незаданный выбирается первым подходящим. Возвращает
+    ``None``, если разбивать не нужно или не по чему; тогда набор
+    выгружается через одно подключение.
+    """
+
+    if (dataset.partitions or 1) < 2:
+        return None
+    candidates = _key_candidates(
+        dataset, lambda table, schema: schemas.partition_columns(profile.name, table, schema)
+    )
+    if candidates is None:
+        return None
+    if dataset.partition_column is None:
+        if not candidates:
+            log.warning(
+                "Набор %s: в снимке схемы %s нет индексированного ключа для разбиения",
+                dataset.name,
+                profile.name,
+            )
+        return candidates[0] if candidates else None
+    column = _match(candidates, dataset.partition_column)
+    if column is None:
+        log.warning(
+            "Набор %s: столбец %s не ведёт первичный ключ или индекс в снимке схемы %s, "
+            "выгрузка без разбиения",
+            dataset.name,
+            dataset.partition_column,
+            profile.name,
+        )
+    return column
+
+
+def watermark_key(schemas: SchemaCache, profile: ConnectionProfile, dataset: Dataset) -> Optional[str]:
+    """Проверяет ``watermark_column`` набора по снимку схемы подключения.
+
+    Водяным знаком может быть только уникальный растущий столбец —
+    первичный ключ таблицы из запроса (см. ``SchemaCache.watermark_columns``).
+    Возвращает имя столбца или ``None``: тогда набор выгружается целиком.
+    """
+
+    if not dataset.watermark_column:
+        return None
+    candidates = _key_candidates(
+        dataset, lambda table, schema: schemas.watermark_columns(profile.name, table, schema)
+    )
+    if candidates is None:
+        return None
+    column = _match(candidates, dataset.watermark_column)
+    if column is None:
+        log.warning(
+            "Набор %s: столбец %s не является уникальным растущим ключом в снимке схемы %s, "
+            "полная выгрузка вместо догрузки",
+            dataset.name,
+            dataset.watermark_column,
+            profile.name,
+        )
+    return column
+
+
+def _server_slot(
+    slots: Optional[ServerSlots], profile: ConnectionProfile
+) -> Callable[[], ContextManager[Any]]:
+    if slots is None:
+        return nullcontext
+    return lambda: slots.acquire(profile.server)
+
+
+def _inputs(dataset: Dataset, upstream: Sequence[ExportResult]) -> Optional[str]:
+    # Без отпечатка хотя бы одной зависимости изменения не определить.
+    if any(result.fingerprint is None for result in upstream):
+        return None
+    payload = json.dumps(
+        [
+            dataset.connection_id,
+            normalize_sql(dataset.query),
+            sorted((result.dataset.id, result.fingerprint) for result in upstream),
+        ]
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _refresh_incremental(
+    manager: ConnectionManager,
+    profile: ConnectionProfile,
+    dataset: Dataset,
+    column: str,
+    cache: ResultCache,
+    key: str,
+    result: ExportResult,
+    slot: Callable[[], ContextManager[Any]] = nullcontext,
+) -> Optional[CachedResult]:
+    """Дописывает в кеш строки выше водяного знака и возвращает обновлённый результат.
+
+    Возвращает ``None``, если нужна полная выгрузка: кеша ещё нет, в нём
+    нет водяного знака для этого столбца, сервер отклонил обёрнутый запрос
+    или запрос вернул другие столбцы.
+    """
+
+    cached = cache.get(key)
+    if cached is None:
+        return None
+    watermark = cached.watermark
+    if (cached.meta.get("watermark") or {}).get("column") != column or watermark is None:
+        cached.close()
+        return None
+    if dataset.cache_ttl and cached.age <= dataset.cache_ttl:
+        return cached
+    cached.close()
+    with slot():
+        connection = manager.connect(profile)
+        try:
+            cursor = connection.cursor()
+            cursor.timeout = profile.query_timeout
+            try:
+                cursor.execute(watermark_query(dataset.query, column), watermark)
+            except Exception as exc:  # noqa: BLE001 - ошибка драйвера, например в обёртке запроса
+                log.warning("Набор %s: полная выгрузка вместо догрузки: %s", dataset.name, exc)
+                return None
+            result.appended = tee(cursor, [cache.sink(key, append=True, watermark=column)])
+        except ValueError as exc:
+            # Изменился набор столбцов: кеш больше не соответствует запросу.
+            log.warning("Набор %s: полная выгрузка вместо догрузки: %s", dataset.name, exc)
+            cache.invalidate(key)
+            return None
+        finally:
+            connection.close()
+    return cache.get(key)
+
+
+def run_datasets(
+    refs: Sequence[str],
+    *,
+    run_all: bool = False,
+    jobs: int = 4,
+    output_dir: Path,
+    key_file: Optional[str] = None,
+    formats: Sequence[str] = ("csv",),
+    compression: Optional[str] = None,
+    use_cache: bool = True,
+    cache: Optional[ResultCache] = None,
+    ordered: bool = True,
+    slots: Optional[ServerSlots] = None,
+    server_jobs: Optional[int] = None,
+    force: bool = False,
+) -> List[ExportResult]:
+    """Выгружает наборы данных с учётом зависимостей и записывает их в ``exports``.
+
+    Вместе с выбранными наборами выгружаются все наборы, от которых они
+    зависят. Набор запускается, как только выгружены его зависимости, так
+    что независимые ветви выполняются параллельно: не более ``jobs``
+    выгрузок всего и не более ``server_jobs`` (по умолчанию — лимит
+    ``slots``) на один сервер. Если выгрузка зависимости не удалась,
+    зависящие от неё наборы не запускаются. Набор с ``skip_unchanged``
+    пропускается, если отпечатки его зависимостей и запрос не изменились с
+    прошлого успешного запуска (``force=True`` отключает пропуск); файлы
+    при этом не создаются. Остальные наборы выгружаются всегда: их
+    собственные источники могут измениться независимо от зависимостей.
+    Время ожидания и выполнения каждого набора записывается в
+    ``dataset_runs``.
+
+    Обращения к локальной БД и расшифровка секретов выполняются в текущем
+    потоке; в пуле выполняются только запросы к серверу и запись файлов.
+    Каждый запрос выполняется один раз, даже если задано несколько
+    ``formats``; каждый файл получает свою запись в ``exports``.
+    Наборы с ``cache_ttl`` используют кеш результатов (по умолчанию общий
+    сервис ``result_cache``), если не задано ``use_cache=False``.
+    Число одновременных подключений к одному серверу ограничено ``slots``
+    (по умолчанию общий сервис ``server_slots``) независимо от ``jobs``.
+    """
+
+    # Повторный формат дал бы второй приёмник с тем же путём.
+    formats = list(dict.fromkeys(formats))
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown or not formats:
+        raise BatchError(f"Неизвестный формат выгрузки: {', '.join(unknown)}")
+    suffixes = [_suffix(fmt, compression) for fmt in formats]
+    unlock_crypto(container.get("crypto_manager"), key_file)
+    connections: ConnectionManager = container.get("connection_manager")
+    datasets = DatasetManager(container.get("db_connection"))
+    if not use_cache:
+        cache = None
+    elif cache is None:
+        cache = container.get("result_cache")
+    if slots is None:
+        slots = container.get("server_slots")
+
+    dependencies = datasets.dependencies()
+    if run_all:
+        selected = datasets.list()
+    else:
+        selected = []
+        for ref in refs:
+            dataset = datasets.find(ref)
+            if dataset is None:
+                raise BatchError(f"Набор данных {ref!r} не найден")
+            selected.append(dataset)
+    if not selected:
+        raise BatchError("Не выбрано ни одного набора данных")
+
+    by_id: Dict[int, Dataset] = {}
+    pending = list(selected)
+    while pending:
+        dataset = pending.pop(0)
+        if dataset.id in by_id:
+            continue
+        by_id[dataset.id] = dataset
+        for dep_id in dependencies.get(dataset.id, []):
+            if dep_id not in by_id:
+                dep = datasets.get(dep_id)
+                if dep is None:
+                    raise BatchError(f"Набор {dataset.name!r} зависит от удалённого набора {dep_id}")
+                pending.append(dep)
+    graph = {dataset_id: dependencies.get(dataset_id, []) for dataset_id in by_id}
+    try:
+        topological_order(graph)
+    except CycleError as exc:
+        names = " -> ".join(by_id[node].name for node in exc.cycle)
+        raise BatchError(f"Циклическая зависимость наборов: {names}") from exc
+
+    profiles: Dict[int, ConnectionProfile] = {}
+    for dataset in by_id.values():
+        if dataset.connection_id is None:
+            raise BatchError(f"Для набора {dataset.name!r} не задано подключение")
+        if dataset.connection_id not in profiles:
+            profile = connections.get(dataset.connection_id)
+            if profile is None:
+                raise BatchError(f"Подключение {dataset.connection_id} не найдено")
+            profiles[dataset.connection_id] = profile
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    paths = {
+        dataset.id: [
+            output_dir / f"{_safe_name(dataset.name)}_{dataset.id}_{stamp}{suffix}"
+            for suffix in suffixes
+        ]
+        for dataset in by_id.values()
+    }
+    schemas = SchemaCache(container.get("db_connection"))
+    partition_keys = {
+        dataset.id: partition_key(schemas, profiles[dataset.connection_id], dataset)
+        for dataset in by_id.values()
+    }
+    watermark_keys = {
+        dataset.id: watermark_key(schemas, profiles[dataset.connection_id], dataset)
+        for dataset in by_id.values()
+    }
+    upstream_ids = {dep_id for deps in graph.values() for dep_id in deps}
+    previous = datasets.last_runs()
+    results: List[ExportResult] = []
+
+    def work(dataset_id: int, upstream: Dict[int, NodeRun]) -> ExportResult:
+        dataset = by_id[dataset_id]
+        inputs = _inputs(dataset, [run.result for run in upstream.values()])
+        last = previous.get(dataset_id)
+        if (
+            dataset.skip_unchanged
+            and not force
+            and upstream
+            and inputs is not None
+            and last is not None
+            and last.inputs == inputs
+        ):
+            return ExportResult(
+                dataset,
+                [],
+                rows=last.rows or 0,
+                skipped=True,
+                fingerprint=last.fingerprint,
+                inputs=inputs,
+            )
+        result = export_dataset(
+            connections,
+            profiles[dataset.connection_id],
+            dataset,
+            paths[dataset_id],
+            cache,
+            slots,
+            ordered,
+            digest=dataset_id in upstream_ids,
+            partition_column=partition_keys[dataset_id],
+            watermark_column=watermark_keys[dataset_id],
+        )
+        result.inputs = inputs
+        return result
+
+    def on_done(dataset_id: int, run: NodeRun) -> None:
+        result = run.result
+        if result is None:
+            dataset = by_id[dataset_id]
+            if run.status == "blocked":
+                error = "не выполнен: не выгружена зависимость"
+            else:
+                error = str(run.error) or type(run.error).__name__
+            result = ExportResult(dataset, paths[dataset_id], error=error)
+        result.wait_ms = run.wait_ms
+        results.append(result)
+        if run.status == "blocked":
+            status = "blocked"
+        elif result.error is not None:
+            status = "failed"
+        else:
+            status = "skipped" if result.skipped else "done"
+        datasets.record_run(
+            RunRecord(
+                run_id=stamp,
+                dataset_id=dataset_id,
+                status=status,
+                started_at=(began + timedelta(seconds=run.started_at or 0)).isoformat(
+                    timespec="seconds"
+                ),
+                wait_ms=run.wait_ms,
+                duration_ms=result.duration_ms,
+                rows=result.rows,
+                fingerprint=result.fingerprint,
+                inputs=result.inputs,
+            )
+        )
+        if result.error is not None:
+            log.error("Набор %s: %s", result.dataset.name, result.error)
+            return
+        if result.skipped:
+            log.info("Набор %s: зависимости не изменились, выгрузка пропущена", result.dataset.name)
+            return
+        for path in result.paths:
+            datasets.record_export(
+                result.dataset.id,
+                str(path),
+                rows=result.rows,
+                duration_ms=result.output_ms.get(path, result.duration_ms),
+            )
+        if result.appended is not None:
+            source = f" (из кеша, догружено {result.appended})"
+        else:
+            source = " (из кеша)" if result.cached else ""
+        log.info(
+            "Набор %s: %d строк за %.0f мс%s -> %s",
+            result.dataset.name,
+            result.rows,
+            result.duration_ms,
+            source,
+            ", ".join(str(path) for path in result.paths),
+        )
+
+    began = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    run_graph(
+        graph,
+        work,
+        jobs=jobs,
+        group=lambda dataset_id: profiles[by_id[dataset_id].connection_id].server.lower(),
+        group_limit=server_jobs or slots.limit,
+        weights={dataset_id: run.duration_ms or 0.0 for dataset_id, run in previous.items()},
+        ok=lambda result: result.error is None,
+        on_done=on_done,
+    )
+    if len(results) > 1:
+        length, chain = critical_path(graph, {r.dataset.id: r.duration_ms for r in results})
+        log.info(
+            "Выполнено наборов: %d за %.0f мс (сумма выгрузок %.0f мс, критический путь %.0f мс: %s)",
+            len(results),
+            (time.perf_counter() - started) * 1000,
+            sum(r.duration_ms for r in results),
+            length,
+            " -> ".join(by_id[node].name for node in chain),
+        )
+    if cache is not None and cache.stats.hits + cache.stats.misses:
+        stats = cache.stats
+        log.info(
+            "Кеш результатов: попаданий %d, промахов %d (устарело %d), вытеснено %d",
+            stats.hits,
+            stats.misses,
+            stats.expired,
+            stats.evictions,
+        )
+    return results
+
+
+def write_key_file(path: Path, password: str) -> None:
+    """Сохраняет ключ, полученный из мастер-пароля, в файл с правами 0600."""
+
+    key = container.get("crypto_manager").derive_master_key(password)
+    if key is None:
+        raise BatchError("Неверный мастер-пароль или он ещё не задан")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(key)
+
+
+def diagnose(
+    profile_ref: Optional[str],
+    *,
+    report: Optional[Path] = None,
+    key_file: Optional[str] = None,
+    size_mb: int = 64,
+) -> bool:
+    """Выполняет диагностику производительности и печатает или сохраняет отчёт.
+
+    Скорость выборки измеряется, только если задан ``profile_ref`` (номер
+    или имя подключения); для него нужен файл ключа. Возвращает ``True``,
+    если ни одно измерение не завершилось ошибкой.
+    """
+
+    connections: Optional[ConnectionManager] = None
+    profile: Optional[ConnectionProfile] = None
+    if profile_ref:
+        unlock_crypto(container.get("crypto_manager"), key_file)
+        connections = container.get("connection_manager")
+        profile = next(
+            (p for p in connections.list() if str(p.id) == profile_ref or p.name == profile_ref),
+            None,
+        )
+        if profile is None:
+            raise BatchError(f"Подключение {profile_ref!r} не найдено")
+
+    results = run_diagnostics(
+        AppContext().base_dir, manager=connections, profile=profile, size_mb=size_mb
+    )
+    if report is not None:
+        write_report(results, report)
+        log.info("Отчёт диагностики сохранён в %s", report)
+    else:
+        sys.stdout.write(format_report(results))
+    return all(r.status is not CheckStatus.ERROR for r in results)
+
+
+def _parser(default_jobs: int, default_output: Path) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="run_batch", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="выгрузить наборы данных")
+    run.add_argument("datasets", nargs="*", help="идентификаторы или имена наборов")
+    run.add_argument("--all", action="store_true", dest="run_all", help="все наборы")
+    run.add_argument("--jobs", type=int, default=default_jobs, help="число параллельных выгрузок")
+    run.add_argument(
+        "--server-jobs", type=int, help="число параллельных выгрузок с одного сервера"
+    )
+    run.add_argument(
+        "--force",
+        action="store_true",
+        help="выгрузить и наборы, у которых не изменились зависимости",
+    )
+    run.add_argument("--output-dir", type=Path, default=default_output)
+    run.add_argument(
+        "--format",
+        type=lambda value: [fmt.strip() for fmt in value.split(",") if fmt.strip()],
+        default=["csv"],
+        dest="formats",
+        help=f"форматы через запятую: {', '.join(FORMATS)}",
+    )
+    run.add_argument(
+        "--compress", choices=sorted(COMPRESSION_SUFFIXES), help="сжатие текстовых форматов"
+    )
+    run.add_argument(
+        "--no-cache",
+        action="store_false",
+        dest="use_cache",
+        help="не использовать кеш результатов, всегда запрашивать сервер",
+    )
+    run.add_argument(
+        "--unordered",
+        action="store_false",
+        dest="ordered",
+        help="не сохранять порядок строк при выгрузке по диапазонам ключа",
+    )
+    run.add_argument("--key-file", help=f"файл ключа (по умолчанию ${KEY_FILE_ENV})")
+
+    key = commands.add_parser("export-key", help="сохранить ключ шифрования в файл")
+    key.add_argument("path", type=Path)
+
+    diag = commands.add_parser("diagnose", help="измерить производительность диска, БД и сети")
+    diag.add_argument("--profile", help="подключение для замера скорости выборки")
+    diag.add_argument("-o", "--output", type=Path, help="файл отчёта (.json или текст)")
+    diag.add_argument("--size-mb", type=int, default=64, help="объём тестовой записи")
+    diag.add_argument("--key-file", help=f"файл ключа (по умолчанию ${KEY_FILE_ENV})")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Точка входа пакетного режима. Возвращает код завершения."""
+
+    context = AppContext()
+    context.ensure_dirs()
+    setup_logging(context.logs_dir, json_lines=bool(os.getenv("APP_LOG_JSON")))
+    container.get("logger")  # настраивает вывод логгера "app" в консоль
+    config = container.get("config")
+    args = _parser(
+        getattr(config, "batch_max_workers", 4), context.data_dir / "exports"
+    ).parse_args(argv)
+
+    try:
+        if args.command == "export-key":
+            write_key_file(args.path, getpass.getpass("Мастер-пароль: "))
+            return 0
+        if args.command == "diagnose":
+            ok = diagnose(
+                args.profile, report=args.output, key_file=args.key_file, size_mb=args.size_mb
+            )
+            return 0 if ok else 1
+        results = run_datasets(
+            args.datasets,
+            run_all=args.run_all,
+            jobs=args.jobs,
+            output_dir=args.output_dir,
+            key_file=args.key_file,
+            formats=args.formats,
+            compression=args.compress,
+            use_cache=args.use_cache,
+            ordered=args.ordered,
+            server_jobs=args.server_jobs,
+            force=args.force,
+        )
+        return 0 if all(r.error is None for r in results) else 1
+    except BatchError as exc:
+        log.error("%s", exc)
+        return 2
+    finally:
+        container.shutdown()
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+#: Блок — кортеж столбцов, каждый столбец — список значений.
+Block = Tuple[List[Any], ...]
+
+
+class ColumnarBuffer:
+    """Буфер строк результата, хранящий данные по столбцам блоками.
+
+    Строки добавляются пачками и раскладываются по столбцам в блоки по
+    ``block_rows`` строк. В памяти держится не более ``max_blocks`` блоков;
+    давно не использованные блоки выгружаются во временный каталог и
+    читаются обратно при обращении. Поэтому занятая память не зависит от
+    числа строк.
+    """
+
+    def __init__(
+        self,
+        columns: Sequence[str],
+        *,
+        block_rows: int = 8192,
+        max_blocks: int = 32,
+        spill_dir: Optional[Path] = None,
+    ) -> None:
+        self.columns = list(columns)
+        self.block_rows = block_rows
+        self.max_blocks = max(2, max_blocks)
+        self.rows = 0
+        self._spill_root = spill_dir
+        self._tmp: Optional[tempfile.TemporaryDirectory] = None
+        self._blocks: "OrderedDict[int, Block]" = OrderedDict()
+        self._spilled: set[int] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.rows
+
+    @property
+    def blocks_in_memory(self) -> int:
+        return len(self._blocks)
+
+    def append(self, rows: Iterable[Sequence[Any]]) -> int:
+        """Добавляет строки и возвращает их количество."""
+
+        rows = list(rows)
+        width = len(self.columns)
+        start = 0
+        with self._lock:
+            while start < len(rows):
+                index, offset = divmod(self.rows, self.block_rows)
+                if offset == 0:
+                    block: Block = tuple([] for _ in range(width))
+                    self._blocks[index] = block
+                    self._evict(keep=index)
+                else:
+                    block = self._block(index)
+                chunk = rows[start : start + self.block_rows - offset]
+                # Транспонирование пачки целиком быстрее поячеечного добавления.
+                for column, values in zip(block, zip(*chunk)):
+                    column.extend(values)
+                self.rows += len(chunk)
+                start += len(chunk)
+        return len(rows)
+
+    def value(self, row: int, column: int) -> Any:
+        """Возвращает значение ячейки."""
+
+        index, offset = divmod(row, self.block_rows)
+        with self._lock:
+            return self._block(index)[column][offset]
+
+    def row(self, row: int) -> Tuple[Any, ...]:
+        """Возвращает строку целиком."""
+
+        index, offset = divmod(row, self.block_rows)
+        with self._lock:
+            return tuple(column[offset] for column in self._block(index))
+
+    def close(self) -> None:
+        """Освобождает память и удаляет выгруженные блоки."""
+
+        with self._lock:
+            self._blocks.clear()
+            self._spilled.clear()
+            self.rows = 0
+            if self._tmp is not None:
+                self._tmp.cleanup()
+                self._tmp = None
+
+    # ------------------------------------------------------------------
+    def _block(self, index: int) -> Block:
+        block = self._blocks.get(index)
+        if block is not None:
+            self._blocks.move_to_end(index)
+            return block
+        if index not in self._spilled:
+            raise IndexError(index)
+        with (self._spill_path() / f"{index}.pkl").open("rb") as fh:
+            block = pickle.load(fh)
+        self._blocks[index] = block
+        self._evict(keep=index)
+        return block
+
+    def _evict(self, keep: int) -> None:
+        # Незаполненный последний блок ещё меняется и не выгружается;
+        # заполненные блоки неизменны, поэтому пишутся на диск один раз.
+        tail = self.rows // self.block_rows if self.rows % self.block_rows else None
+        while len(self._blocks) > self.max_blocks:
+            index = next(i for i in self._blocks if i != keep and i != tail)
+            block = self._blocks.pop(index)
+            if index not in self._spilled:
+                with (self._spill_path() / f"{index}.pkl").open("wb") as fh:
+                    pickle.dump(block, fh, protocol=pickle.HIGHEST_PROTOCOL)
+                self._spilled.add(index)
+
+    def _spill_path(self) -> Path:
+        if self._tmp is None:
+            self._tmp = tempfile.TemporaryDirectory(prefix="result-", dir=self._spill_root)
+        return Path(self._tmp.name)
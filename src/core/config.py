@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 import json
+import logging
+import os
+import threading
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 
 from pydantic import BaseModel
 
@@ -19,17 +22,132 @@ class AppConfig(BaseModel, extra="allow"):
     version: str = "0.1.0"
 
 
-def load_config() -> AppConfig:
+def load_config(
+    default_path: Path = DEFAULT_CONFIG_PATH, user_path: Path = USER_CONFIG_PATH
+) -> AppConfig:
     """Загружает конфигурацию, объединяя пользовательскую и дефолтную."""
 
-    if not DEFAULT_CONFIG_PATH.exists():
+    if not default_path.exists():
         raise FileNotFoundError(
-            f"Не найден файл конфигурации по умолчанию: {DEFAULT_CONFIG_PATH}"
+            f"Не найден файл конфигурации по умолчанию: {default_path}"
         )
-    with DEFAULT_CONFIG_PATH.open(encoding="utf-8") as f:
+    with default_path.open(encoding="utf-8") as f:
         data: Dict[str, Any] = json.load(f)
-    if USER_CONFIG_PATH.exists():
-        with USER_CONFIG_PATH.open(encoding="utf-8") as f:
+    if user_path.exists():
+        with user_path.open(encoding="utf-8") as f:
             user_data = json.load(f)
         data.update(user_data)
     return AppConfig(**data)
+
+
+def _flatten(data: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    flat: Dict[str, Any] = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            flat.update(_flatten(value, f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+
+def diff_configs(old: AppConfig, new: AppConfig) -> Dict[str, Tuple[Any, Any]]:
+    """Возвращает изменённые ключи в виде ``{"a.b": (старое, новое)}``."""
+
+    before = _flatten(old.model_dump())
+    after = _flatten(new.model_dump())
+    return {
+        key: (before.get(key), after.get(key))
+        for key in sorted(before.keys() | after.keys())
+        if before.get(key) != after.get(key)
+    }
+
+
+class ConfigService:
+    """Разобранная конфигурация с перезагрузкой при изменении файлов.
+
+    Файлы читаются и проверяются один раз; :meth:`reload` повторяет разбор
+    только если изменились время модификации или размер одного из файлов.
+    :meth:`start_watching` запускает фоновый опрос файлов. При изменении
+    значений в ``bus`` отправляется событие ``config:changed`` с новой
+    конфигурацией и словарём изменений (см. :func:`diff_configs`).
+    Ошибочная конфигурация записывается в журнал и не заменяет текущую.
+    """
+
+    EVENT = "config:changed"
+
+    def __init__(
+        self,
+        default_path: Path = DEFAULT_CONFIG_PATH,
+        user_path: Path = USER_CONFIG_PATH,
+        bus: Any = None,
+    ) -> None:
+        self.default_path = default_path
+        self.user_path = user_path
+        self.bus = bus
+        self._lock = threading.Lock()
+        self._signature = self._stat()
+        self._config = load_config(default_path, user_path)
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    @property
+    def config(self) -> AppConfig:
+        """Текущая конфигурация."""
+
+        return self._config
+
+    def reload(self, *, force: bool = False) -> Dict[str, Tuple[Any, Any]]:
+        """Перечитывает файлы, если они изменились, и возвращает изменения."""
+
+        with self._lock:
+            signature = self._stat()
+            if signature == self._signature and not force:
+                return {}
+            self._signature = signature
+            try:
+                config = load_config(self.default_path, self.user_path)
+            except Exception:  # noqa: BLE001
+                logging.exception("Ошибка перезагрузки конфигурации")
+                return {}
+            changes = diff_configs(self._config, config)
+            self._config = config
+        if changes:
+            logging.info("Конфигурация изменена: %s", ", ".join(changes))
+            if self.bus is not None:
+                self.bus.emit(self.EVENT, config, changes)
+        return changes
+
+    def start_watching(self, interval: float = 1.0) -> None:
+        """Запускает фоновую проверку файлов раз в ``interval`` секунд."""
+
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval,), name="config-watch", daemon=True
+        )
+        self._watcher.start()
+
+    def close(self) -> None:
+        """Останавливает наблюдение за файлами."""
+
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    def _watch(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self.reload()
+
+    def _stat(self) -> Tuple[Optional[Tuple[int, int]], ...]:
+        result = []
+        for path in (self.default_path, self.user_path):
+            try:
+                st = os.stat(path)
+            except OSError:
+                result.append(None)
+            else:
+                result.append((st.st_mtime_ns, st.st_size))
+        return tuple(result)
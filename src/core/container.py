@@ -1,53 +1,507 @@
 from __future__ import annotations
 
+import asyncio
+import inspect
 import logging
-from typing import Any, Callable, Dict, Optional
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
-from .config import load_config
+from .config import ConfigService
+from .storage import get_connection
 
 
 class ServiceNotRegisteredError(KeyError):
     """Raised when requesting an unregistered service."""
 
 
+class CircularDependencyError(RuntimeError):
+    """Raised when a provider (indirectly) requests the service it builds."""
+
+
+_MISSING = object()
+
+Disposer = Callable[[Any], None]
+
+
+class ServiceScope:
+    """Instances of the services registered under one scope name.
+
+    The container keeps one shared scope per name (``app`` by default) and
+    :meth:`Container.open_scope` creates short-lived ones, e.g. one per
+    mounted module. Services not registered under the scope name are taken
+    from the ``parent`` scope. When a scope is closed its instances are
+    disposed in reverse creation order; a short-lived scope is also closed
+    when its parent is cleared.
+    """
+
+    def __init__(
+        self, container: "Container", name: str, parent: Optional["ServiceScope"] = None
+    ) -> None:
+        self.container = container
+        self.name = name
+        self.parent = parent
+        self.closed = False
+        self._instances: Dict[str, Any] = {}
+        self._order: List[str] = []
+        self._lock = threading.Lock()
+        self._init_locks: Dict[str, threading.Lock] = {}
+        # In-flight async builds. Callers may run different event loops (e.g.
+        # ``warm_up`` threads), so they wait on a thread-safe future.
+        self._pending: Dict[str, Future[Any]] = {}
+        self._building: Set["asyncio.Task[None]"] = set()
+
+    def __enter__(self) -> "ServiceScope":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        state = "closed" if self.closed else f"{len(self._order)} instance(s)"
+        return f"<ServiceScope {self.name!r} {state}>"
+
+    def get(self, name: str) -> Any:
+        """Retrieve a service instance, creating it lazily."""
+
+        instance = self._instances.get(name, _MISSING)
+        if instance is not _MISSING:
+            return instance
+        if self.parent is not None and not self.container.is_registered(name, scope=self.name):
+            return self.parent.get(name)
+
+        provider = self.container._get_provider(name, self.name)
+        if inspect.iscoroutinefunction(provider):
+            raise TypeError(
+                f"Service '{name}' has an async provider; use 'await aget()'"
+            )
+        with self.container._guard(id(self), name), self._init_lock(name):
+            instance = self._instances.get(name, _MISSING)
+            if instance is not _MISSING:
+                return instance
+            self._check_open()
+            start = time.perf_counter()
+            instance = provider()
+            self._store(name, instance, time.perf_counter() - start)
+        return instance
+
+    async def aget(self, name: str) -> Any:
+        """Retrieve a service instance, awaiting async providers.
+
+        Concurrent ``aget`` calls for the same service share one provider
+        call, also when they run on different event loops; the provider runs
+        on the loop of the first caller. Synchronous providers are executed
+        in the default executor so that they do not block the event loop.
+        """
+
+        instance = self._instances.get(name, _MISSING)
+        if instance is not _MISSING:
+            return instance
+        if self.parent is not None and not self.container.is_registered(name, scope=self.name):
+            return await self.parent.aget(name)
+
+        provider = self.container._get_provider(name, self.name)
+        if not inspect.iscoroutinefunction(provider):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.get, name)
+
+        with self._lock:
+            instance = self._instances.get(name, _MISSING)
+            if instance is not _MISSING:
+                return instance
+            self._check_open()
+            future = self._pending.get(name)
+            if future is None:
+                future = Future()
+                self._pending[name] = future
+                task = asyncio.ensure_future(self._build_async(name, provider, future))
+                self._building.add(task)
+                task.add_done_callback(self._building.discard)
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def alive(self) -> List[Tuple[str, Any]]:
+        """Return ``(name, instance)`` pairs in creation order."""
+
+        with self._lock:
+            return [(name, self._instances[name]) for name in self._order]
+
+    def close(self) -> None:
+        """Dispose all instances in reverse creation order.
+
+        Errors raised by disposers are logged and do not prevent the remaining
+        instances from being disposed.
+        """
+
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            alive = [(name, self._instances[name]) for name in self._order]
+            self._instances = {}
+            self._order = []
+        for name, instance in reversed(alive):
+            try:
+                self.container._dispose(self.name, name, instance)
+            except Exception:  # noqa: BLE001
+                logging.getLogger(__name__).exception(
+                    "Failed to dispose service '%s' (%s)", name, self.name
+                )
+        self.container._forget(self)
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+    async def _build_async(
+        self, name: str, provider: Callable[[], Awaitable[Any]], future: Future[Any]
+    ) -> None:
+        start = time.perf_counter()
+        try:
+            instance = await provider()
+        except BaseException as exc:
+            with self._lock:
+                self._pending.pop(name, None)
+            future.set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
+            return
+        self._store(name, instance, time.perf_counter() - start)
+        with self._lock:
+            self._pending.pop(name, None)
+        future.set_result(instance)
+
+    def _check_open(self) -> None:
+        if self.closed:
+            raise RuntimeError(f"Scope '{self.name}' is closed")
+
+    def _init_lock(self, name: str) -> threading.Lock:
+        lock = self._init_locks.get(name)
+        if lock is None:
+            with self._lock:
+                lock = self._init_locks.setdefault(name, threading.Lock())
+        return lock
+
+    def _store(self, name: str, instance: Any, elapsed: float) -> None:
+        with self._lock:
+            # Instances are published as a fresh dict so that lock-free readers
+            # in ``get`` never observe a dict that is being resized.
+            instances = dict(self._instances)
+            instances[name] = instance
+            self._instances = instances
+            self._order.append(name)
+        self.container._record_timing(self.name, name, elapsed)
+
+
 class Container:
-    """Simple service locator with lazy initialization and scopes."""
+    """Thread-safe service locator with lazy initialization and scopes.
+
+    Already created instances are returned without taking any lock. The first
+    request for a service takes a per-service lock so that concurrent callers
+    wait for a single provider call instead of each building their own
+    instance. Providers may be coroutine functions; such services are resolved
+    with :meth:`aget`.
+
+    Services may declare the services their provider depends on and whether
+    they should be created eagerly. :meth:`warm_up` uses this metadata to build
+    independent services concurrently on a thread pool.
+
+    Instances live in :class:`ServiceScope` objects and are disposed when
+    their scope ends: shared scopes on :meth:`clear`, scopes from
+    :meth:`open_scope` on :meth:`ServiceScope.close`, everything on
+    :meth:`shutdown`.
+    """
 
     def __init__(self) -> None:
         self._providers: Dict[str, Dict[str, Callable[[], Any]]] = {}
-        self._instances: Dict[str, Dict[str, Any]] = {}
+        self._dependencies: Dict[str, Dict[str, Tuple[str, ...]]] = {}
+        self._disposers: Dict[str, Dict[str, Optional[Disposer]]] = {}
+        self._eager: Dict[str, Set[str]] = {}
+        self._scopes: Dict[str, ServiceScope] = {}
+        self._open_scopes: List[ServiceScope] = []
+        self._timings: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._resolving = threading.local()
 
     def register(
-        self, name: str, provider: Callable[[], Any], *, scope: str = "app"
+        self,
+        name: str,
+        provider: Callable[[], Any],
+        *,
+        scope: str = "app",
+        depends_on: Iterable[str] = (),
+        eager: bool = False,
+        dispose: Optional[Disposer] = None,
     ) -> None:
-        """Register a provider for a service within a scope."""
+        """Register a provider for a service within a scope.
+
+        ``depends_on`` lists services of the same scope the provider requests
+        from the container. ``eager`` services are built by :meth:`warm_up`
+        when it is called without explicit names. ``dispose`` releases an
+        instance when its scope ends; by default its ``close()`` method is
+        called if it has one.
+        """
+
+        with self._lock:
+            self._providers.setdefault(scope, {})[name] = provider
+            self._dependencies.setdefault(scope, {})[name] = tuple(depends_on)
+            self._disposers.setdefault(scope, {})[name] = dispose
+            eager_names = self._eager.setdefault(scope, set())
+            if eager:
+                eager_names.add(name)
+            else:
+                eager_names.discard(name)
 
-        self._providers.setdefault(scope, {})[name] = provider
+    def is_registered(self, name: str, *, scope: str = "app") -> bool:
+        """Return ``True`` if ``name`` has a provider in ``scope``."""
+
+        return name in self._providers.get(scope, {})
+
+    def dependencies(self, name: str, *, scope: str = "app") -> Tuple[str, ...]:
+        """Return the declared dependencies of a registered service."""
+
+        self._get_provider(name, scope)
+        return self._dependencies.get(scope, {}).get(name, ())
 
     def get(self, name: str, *, scope: str = "app") -> Any:
         """Retrieve a service instance, creating it lazily."""
 
-        if scope not in self._instances:
-            self._instances[scope] = {}
-        if name in self._instances[scope]:
-            return self._instances[scope][name]
+        shared = self._scopes.get(scope)
+        if shared is not None:
+            instance = shared._instances.get(name, _MISSING)
+            if instance is not _MISSING:
+                return instance
+        return self._shared_scope(scope).get(name)
+
+    async def aget(self, name: str, *, scope: str = "app") -> Any:
+        """Retrieve a service instance, awaiting async providers."""
+
+        return await self._shared_scope(scope).aget(name)
+
+    def open_scope(self, name: str, *, parent: str = "app") -> ServiceScope:
+        """Create a short-lived scope for the services registered as ``name``.
+
+        Every call returns a new scope with its own instances, e.g. one per
+        mounted module. Services registered elsewhere are
+        resolved from the shared ``parent`` scope. The scope must be closed,
+        preferably with a ``with`` block; scopes left open are listed by
+        :meth:`leak_report`.
+        """
+
+        scope = ServiceScope(self, name, self._shared_scope(parent))
+        with self._lock:
+            self._open_scopes.append(scope)
+        return scope
+
+    def warm_up(
+        self,
+        names: Optional[Iterable[str]] = None,
+        *,
+        scope: str = "app",
+        max_workers: Optional[int] = None,
+    ) -> Future[Dict[str, BaseException]]:
+        """Create services ahead of time on a background thread pool.
+
+        ``names`` defaults to all eager services of ``scope``; their declared
+        dependencies are included automatically. A service is submitted as
+        soon as all of its dependencies are built, so independent services
+        are constructed concurrently. The returned future resolves to the
+        errors raised by failed providers, keyed by service name.
+        """
+
+        with self._lock:
+            targets = sorted(self._eager.get(scope, ())) if names is None else list(names)
+        order = self._resolve_order(targets, scope)
+        result: Future[Dict[str, BaseException]] = Future()
+        if not order:
+            result.set_result({})
+            return result
+
+        waiting = {name: set(self.dependencies(name, scope=scope)) for name in order}
+        dependents: Dict[str, List[str]] = defaultdict(list)
+        for name, deps in waiting.items():
+            for dep in deps:
+                dependents[dep].append(name)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warm-up")
+        state_lock = threading.Lock()
+        remaining = [len(order)]
+        errors: Dict[str, BaseException] = {}
+
+        def submit(name: str) -> None:
+            future = executor.submit(self._build_sync_or_async, name, scope)
+            future.add_done_callback(lambda f, name=name: on_done(name, f))
+
+        def on_done(name: str, future: Future[Any]) -> None:
+            exc = future.exception()
+            if exc is not None:
+                logging.getLogger(__name__).error(
+                    "Warm-up of service '%s' failed", name, exc_info=exc
+                )
+            ready: List[str] = []
+            with state_lock:
+                if exc is not None:
+                    errors[name] = exc
+                remaining[0] -= 1
+                finished = remaining[0] == 0
+                for dependent in dependents.get(name, ()):
+                    waiting[dependent].discard(name)
+                    if not waiting[dependent]:
+                        ready.append(dependent)
+            for dependent in ready:
+                submit(dependent)
+            if finished:
+                executor.shutdown(wait=False)
+                result.set_result(dict(errors))
+
+        for name in [n for n, deps in waiting.items() if not deps]:
+            submit(name)
+        return result
+
+    def timings(self) -> Dict[str, Dict[str, float]]:
+        """Return provider construction times in seconds per scope."""
+
+        with self._lock:
+            return {scope: dict(values) for scope, values in self._timings.items()}
+
+    def clear(self, *, scope: Optional[str] = None) -> None:
+        """Dispose cached instances of a shared scope or of all scopes.
+
+        Without ``scope`` short-lived scopes are closed first and the ``app``
+        scope last, since other scopes may use its services. Clearing one
+        shared scope first closes the short-lived scopes opened on top of it.
+        """
+
+        with self._lock:
+            if scope is None:
+                scopes = list(reversed(self._open_scopes))
+                shared = sorted(self._scopes.values(), key=lambda s: s.name == "app")
+                scopes.extend(shared)
+                self._scopes.clear()
+            else:
+                parent = self._scopes.pop(scope, None)
+                scopes = []
+                if parent is not None:
+                    scopes = [s for s in reversed(self._open_scopes) if s.parent is parent]
+                    scopes.append(parent)
+        for item in scopes:
+            item.close()
+
+    def leak_report(self) -> List[str]:
+        """Describe instances held by short-lived scopes that are still open."""
+
+        with self._lock:
+            scopes = list(self._open_scopes)
+        return [
+            f"{scope.name}:{name} ({type(instance).__name__})"
+            for scope in scopes
+            for name, instance in scope.alive()
+        ]
+
+    def shutdown(self) -> List[str]:
+        """Log leaked instances, then dispose everything.
+
+        Returns the :meth:`leak_report` taken before disposal.
+        """
+
+        report = self.leak_report()
+        for entry in report:
+            logging.getLogger(__name__).warning("Service still alive at exit: %s", entry)
+        self.clear()
+        return report
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+    def _get_provider(self, name: str, scope: str) -> Callable[[], Any]:
         try:
-            provider = self._providers[scope][name]
+            return self._providers[scope][name]
         except KeyError as exc:
             raise ServiceNotRegisteredError(
                 f"Service '{name}' is not registered in scope '{scope}'"
             ) from exc
-        instance = provider()
-        self._instances[scope][name] = instance
-        return instance
-
-    def clear(self, *, scope: Optional[str] = None) -> None:
-        """Clear cached instances for a specific scope or all scopes."""
 
+    def _shared_scope(self, name: str) -> ServiceScope:
+        scope = self._scopes.get(name)
         if scope is None:
-            self._instances.clear()
-        else:
-            self._instances.pop(scope, None)
+            with self._lock:
+                scope = self._scopes.setdefault(name, ServiceScope(self, name))
+        return scope
+
+    def _forget(self, scope: ServiceScope) -> None:
+        with self._lock:
+            if scope in self._open_scopes:
+                self._open_scopes.remove(scope)
+            if self._scopes.get(scope.name) is scope:
+                del self._scopes[scope.name]
+
+    def _dispose(self, scope: str, name: str, instance: Any) -> None:
+        disposer = self._disposers.get(scope, {}).get(name)
+        if disposer is not None:
+            disposer(instance)
+            return
+        close = getattr(instance, "close", None)
+        if callable(close):
+            close()
+
+    def _record_timing(self, scope: str, name: str, elapsed: float) -> None:
+        with self._lock:
+            self._timings.setdefault(scope, {})[name] = elapsed
+        logging.getLogger(__name__).debug(
+            "Service '%s' (%s) created in %.3f s", name, scope, elapsed
+        )
+
+    def _build_sync_or_async(self, name: str, scope: str) -> Any:
+        if inspect.iscoroutinefunction(self._get_provider(name, scope)):
+            return asyncio.run(self.aget(name, scope=scope))
+        return self.get(name, scope=scope)
+
+    def _resolve_order(self, names: Iterable[str], scope: str) -> List[str]:
+        """Return ``names`` with their dependencies in topological order."""
+
+        order: List[str] = []
+        done: Set[str] = set()
+        visiting: List[str] = []
+
+        def visit(name: str) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                chain = " -> ".join([*visiting, name])
+                raise CircularDependencyError(f"Circular service dependency: {chain}")
+            visiting.append(name)
+            for dep in self.dependencies(name, scope=scope):
+                visit(dep)
+            visiting.pop()
+            done.add(name)
+            order.append(name)
+
+        for name in names:
+            visit(name)
+        return order
+
+    def _guard(self, scope_id: int, name: str) -> "_ResolutionGuard":
+        stack: List[Tuple[int, str]] = getattr(self._resolving, "stack", None) or []
+        self._resolving.stack = stack
+        return _ResolutionGuard(stack, (scope_id, name))
+
+
+class _ResolutionGuard:
+    """Track services being built by the current thread to detect cycles."""
+
+    def __init__(self, stack: List[Tuple[int, str]], key: Tuple[int, str]) -> None:
+        self.stack = stack
+        self.key = key
+
+    def __enter__(self) -> None:
+        if self.key in self.stack:
+            chain = " -> ".join(name for _, name in [*self.stack, self.key])
+            raise CircularDependencyError(f"Circular service dependency: {chain}")
+        self.stack.append(self.key)
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stack.pop()
 
 
 class EncryptionManager:
@@ -68,7 +522,13 @@ class LocalDBManager:
 
 
 def create_logger() -> logging.Logger:
-    """Create and configure application logger."""
+    """Create and configure application logger.
+
+    Records are handed to the shared logging queue; the console handler runs
+    on the background listener thread, so callers never block on stderr.
+    """
+
+    from .logger import add_handler, get_queue_handler
 
     logger = logging.getLogger("app")
     if not logger.handlers:
@@ -77,13 +537,67 @@ def create_logger() -> logging.Logger:
             "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
         )
         handler.setFormatter(formatter)
-        logger.addHandler(handler)
+        handler.addFilter(logging.Filter("app"))
+        add_handler(handler)
+        logger.addHandler(get_queue_handler())
+        # The queue already feeds the file handler; propagating would
+        # enqueue every record twice.
+        logger.propagate = False
         logger.setLevel(logging.INFO)
     return logger
 
 
+def create_db_connection() -> sqlite3.Connection:
+    """Open the shared local database connection.
+
+    The connection may be created by a warm-up thread and used from the GUI
+    thread afterwards.
+    """
+
+    return get_connection(check_same_thread=False)
+
+
+def create_crypto_manager() -> Any:
+    """Create the application :class:`~core.crypto.CryptoManager`."""
+
+    from .crypto import CryptoManager
+
+    return CryptoManager(container.get("db_connection"))
+
+
+def create_task_group() -> Any:
+    """Create the :class:`~core.tasks.TaskGroup` of one mounted module."""
+
+    from .tasks import TaskGroup
+
+    return TaskGroup(container.get("task_runner"))
+
+
+def create_task_runner() -> Any:
+    """Create the shared :class:`~core.tasks.TaskRunner` for slow operations."""
+
+    from .tasks import TaskRunner
+
+    return TaskRunner(getattr(container.get("config"), "task_workers", None))
+
+
 container = Container()
-container.register("config", load_config)
+container.register("config_service", ConfigService, eager=True)
+# ``config`` is the configuration as parsed at startup; use
+# ``config_service.config`` or the ``config:changed`` event for live values.
+container.register(
+    "config",
+    lambda: container.get("config_service").config,
+    depends_on=("config_service",),
+    eager=True,
+)
 container.register("logger", create_logger)
 container.register("encryption_manager", EncryptionManager)
 container.register("local_db_manager", LocalDBManager)
+container.register("db_connection", create_db_connection, eager=True)
+container.register(
+    "crypto_manager", create_crypto_manager, depends_on=("db_connection",), eager=True
+)
+container.register("task_runner", create_task_runner, depends_on=("config",))
+# Background tasks of a mounted module, cancelled when its scope closes.
+container.register("tasks", create_task_group, scope="module")
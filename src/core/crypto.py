@@ -4,14 +4,19 @@ import base64
 import hashlib
 import os
 import sqlite3
-from typing import Optional
-
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from typing import TYPE_CHECKING, Optional
 
 from .storage import get_connection
 
+if TYPE_CHECKING:  # pragma: no cover - imported lazily to keep startup fast
+    from cryptography.fernet import Fernet
+
+
+def _fernet(key: bytes) -> "Fernet":
+    from cryptography.fernet import Fernet
+
+    return Fernet(key)
+
 
 class CryptoManager:
     """Manage encryption of secrets using a master password.
@@ -24,7 +29,7 @@ class CryptoManager:
 
     def __init__(self, conn: Optional[sqlite3.Connection] = None) -> None:
         self.conn = conn or get_connection()
-        self._fernet: Optional[Fernet] = None
+        self._fernet: Optional["Fernet"] = None
         self.salt = self._get_setting("crypto_salt")
         self.version = int(self._get_setting("crypto_key_version") or 0)
         self.verifier = self._get_setting("crypto_verifier")
@@ -52,6 +57,9 @@ class CryptoManager:
     def derive_key(self, password: str, salt: bytes) -> bytes:
         """Derive a Fernet key from the password and salt."""
 
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
         kdf = PBKDF2HMAC(
             algorithm=hashes.SHA256(),
             length=32,
@@ -80,15 +88,48 @@ class CryptoManager:
         digest = hashlib.sha256(key).hexdigest()
         if digest != self.verifier:
             return False
-        self._fernet = Fernet(key)
+        self._fernet = _fernet(key)
+        return True
+
+    def unlock_with_key(self, key: bytes) -> bool:
+        """Unlock with a key previously derived from the master password.
+
+        This skips PBKDF2, so non-interactive jobs can read a key file
+        instead of holding the password itself.
+        """
+
+        if not self.is_configured():
+            return False
+        key = key.strip()
+        if hashlib.sha256(key).hexdigest() != self.verifier:
+            return False
+        self._fernet = _fernet(key)
         return True
 
+    def derive_master_key(self, password: str) -> Optional[bytes]:
+        """Return the key for ``password`` or ``None`` if it is wrong."""
+
+        if not self.is_configured():
+            return None
+        key = self.derive_key(password, base64.b64decode(self.salt))
+        if hashlib.sha256(key).hexdigest() != self.verifier:
+            return None
+        return key
+
     def set_master_password(self, password: str) -> None:
         """Set a new master password and store related metadata."""
 
         salt = os.urandom(16)
-        key = self.derive_key(password, salt)
-        self._fernet = Fernet(key)
+        self.set_master_key(salt, self.derive_key(password, salt))
+
+    def set_master_key(self, salt: bytes, key: bytes) -> None:
+        """Store a key already derived from the new master password and ``salt``.
+
+        Lets the slow derivation run on a worker thread while the settings
+        are written from the thread that owns the connection.
+        """
+
+        self._fernet = _fernet(key)
         self.salt = base64.b64encode(salt).decode("utf-8")
         self.verifier = hashlib.sha256(key).hexdigest()
         self.version += 1
@@ -1,22 +1,477 @@
 from __future__ import annotations
 
-from collections import defaultdict
-from typing import Any, Callable, Dict, List
+import inspect
+import logging
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+
+class QueuedDispatcher:
+    """Очередь вызовов, выполняемых в потоке-получателе.
+
+    Обработчики, подписанные с ``target``, не вызываются в потоке
+    ``emit``: вызов ставится в очередь и выполняется, когда поток-получатель
+    вызывает :meth:`process_pending`. Вызовы с одинаковым ключом
+    объединяются — в очереди остаётся только последний.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Condition()
+        self._queue: Deque[Any] = deque()
+        self._coalesced: Dict[Hashable, Callable[[], None]] = {}
+
+    def post(self, call: Callable[[], None], key: Hashable | None = None) -> None:
+        """Ставит вызов в очередь; ``key`` включает объединение."""
+
+        with self._lock:
+            if key is None:
+                self._queue.append(call)
+            else:
+                if key not in self._coalesced:
+                    self._queue.append(_CoalescedSlot(key))
+                self._coalesced[key] = call
+            self._lock.notify()
+        self._wakeup()
+
+    def process_pending(self, timeout: float | None = 0) -> int:
+        """Выполняет накопленные вызовы и возвращает их количество.
+
+        При ``timeout`` больше нуля (или ``None``) ждёт появления вызовов.
+        """
+
+        with self._lock:
+            if not self._queue and timeout != 0:
+                self._lock.wait(timeout)
+            batch = list(self._queue)
+            self._queue.clear()
+            calls: List[Callable[[], None]] = []
+            for item in batch:
+                if isinstance(item, _CoalescedSlot):
+                    calls.append(self._coalesced.pop(item.key))
+                else:
+                    calls.append(item)
+        for call in calls:
+            try:
+                call()
+            except Exception:  # noqa: BLE001
+                logging.exception("Ошибка в обработчике события")
+        return len(calls)
+
+    def _wakeup(self) -> None:
+        """Сообщает потоку-получателю о новых вызовах."""
+
+
+class _CoalescedSlot:
+    __slots__ = ("key",)
+
+    def __init__(self, key: Hashable) -> None:
+        self.key = key
+
+
+class LatencyHistogram:
+    """Гистограмма длительностей вызовов с логарифмическими корзинами."""
+
+    #: Верхние границы корзин в секундах; последняя корзина — всё, что дольше.
+    BOUNDS: Tuple[float, ...] = (0.0001, 0.0005, 0.001, 0.005, 0.016, 0.05, 0.1, 0.5)
+
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(self.BOUNDS) + 1)
+
+    def add(self, elapsed: float) -> None:
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        self.buckets[bisect_left(self.BOUNDS, elapsed)] += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        labels = [f"<={bound * 1000:g}ms" for bound in self.BOUNDS]
+        labels.append(f">{self.BOUNDS[-1] * 1000:g}ms")
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+class EventStats:
+    """Счётчики и гистограммы задержек по событиям и обработчикам.
+
+    Обработчик, выполнявшийся в GUI-потоке дольше ``budget`` секунд,
+    попадает в журнал с предупреждением.
+    """
+
+    def __init__(self, budget: float = 0.016, gui_thread: threading.Thread | None = None) -> None:
+        self.budget = budget
+        self.gui_thread_id = (gui_thread or threading.main_thread()).ident
+        self.events: Dict[str, LatencyHistogram] = {}
+        self.handlers: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def record_event(self, event: str, elapsed: float) -> None:
+        with self._lock:
+            histogram = self.events.get(event)
+            if histogram is None:
+                histogram = self.events[event] = LatencyHistogram()
+            histogram.add(elapsed)
+
+    def record_handler(self, event: str, handler: Callable[..., Any], elapsed: float) -> None:
+        name = _handler_name(handler)
+        with self._lock:
+            histogram = self.handlers.get(name)
+            if histogram is None:
+                histogram = self.handlers[name] = LatencyHistogram()
+            histogram.add(elapsed)
+        if elapsed > self.budget and threading.get_ident() == self.gui_thread_id:
+            logging.warning(
+                "Медленный обработчик %s события %s: %.1f мс (бюджет %.1f мс)",
+                name,
+                event,
+                elapsed * 1000,
+                self.budget * 1000,
+            )
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        with self._lock:
+            return {
+                "events": {k: v.as_dict() for k, v in self.events.items()},
+                "handlers": {k: v.as_dict() for k, v in self.handlers.items()},
+            }
+
+    def format(self) -> str:
+        """Возвращает текстовую таблицу, отсортированную по суммарному времени."""
+
+        data = self.snapshot()
+        lines: List[str] = []
+        for title, rows in (("Событие", data["events"]), ("Обработчик", data["handlers"])):
+            lines.append(f"{title:<60} {'вызовы':>8} {'сумма, мс':>10} {'ср., мс':>8} {'макс., мс':>9}")
+            for name, row in sorted(rows.items(), key=lambda item: -item[1]["total"]):
+                lines.append(
+                    f"{name:<60} {row['count']:>8} {row['total'] * 1000:>10.2f} "
+                    f"{row['mean'] * 1000:>8.2f} {row['max'] * 1000:>9.2f}"
+                )
+            lines.append("")
+        return "\n".join(lines)
+
+
+def _handler_name(handler: Callable[..., Any]) -> str:
+    func = getattr(handler, "__func__", handler)
+    module = getattr(func, "__module__", None) or "?"
+    return f"{module}.{getattr(func, '__qualname__', repr(func))}"
+
+
+class Subscription:
+    """Подписка обработчика на событие или шаблон событий.
+
+    Связанные методы хранятся по слабой ссылке, поэтому подписка не
+    удерживает удалённые виджеты; такие подписки снимаются автоматически.
+    """
+
+    __slots__ = ("event", "target", "active", "_bus", "_ref", "_seq", "__weakref__")
+
+    def __init__(
+        self,
+        bus: "EventBus",
+        event: str,
+        handler: Callable[..., Any],
+        target: Optional[QueuedDispatcher],
+        weak: bool | None,
+        seq: int,
+    ) -> None:
+        if weak is None:
+            weak = inspect.ismethod(handler)
+        self.event = event
+        self.target = target
+        self.active = True
+        self._bus = bus
+        self._seq = seq
+        if not weak:
+            self._ref: Callable[[], Optional[Callable[..., Any]]] = lambda: handler
+        elif inspect.ismethod(handler):
+            self._ref = weakref.WeakMethod(handler, self._on_collected)
+        else:
+            self._ref = weakref.ref(handler, self._on_collected)
+
+    @property
+    def handler(self) -> Optional[Callable[..., Any]]:
+        """Обработчик или ``None``, если он уже удалён сборщиком мусора."""
+
+        return self._ref()
+
+    def unsubscribe(self) -> None:
+        """Снимает подписку."""
+
+        self._bus._remove(self)
+
+    def _on_collected(self, _ref: Any) -> None:
+        self._bus._remove(self)
+
+
+class _TimedCall:
+    """Вызов обработчика с замером длительности."""
+
+    __slots__ = ("stats", "event", "handler", "args", "kwargs")
+
+    def __init__(
+        self,
+        stats: EventStats,
+        event: str,
+        handler: Callable[..., Any],
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+    ) -> None:
+        self.stats = stats
+        self.event = event
+        self.handler = handler
+        self.args = args
+        self.kwargs = kwargs
+
+    def __call__(self) -> None:
+        started = time.perf_counter()
+        try:
+            self.handler(*self.args, **self.kwargs)
+        finally:
+            self.stats.record_handler(self.event, self.handler, time.perf_counter() - started)
+
+
+class _TopicNode:
+    __slots__ = ("children", "subscriptions")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, _TopicNode] = {}
+        self.subscriptions: Tuple[Subscription, ...] = ()
 
 
 class EventBus:
-    """Простая шина событий."""
+    """Потокобезопасная шина событий с иерархическими темами.
+
+    Имена событий состоят из сегментов через ``:`` (``module:mounted``).
+    При подписке можно использовать шаблоны: ``*`` соответствует ровно
+    одному сегменту, ``**`` — любому числу сегментов, включая ноль
+    (``module:*``, ``query:**``).
+
+    Подписки хранятся в префиксном дереве. Для каждого встреченного события
+    список подходящих подписок вычисляется один раз и кешируется в виде
+    неизменяемого кортежа; кеш сбрасывается только при изменении подписок,
+    поэтому ``emit`` не обходит дерево и не копирует список обработчиков.
+    Обработчики без ``target`` вызываются синхронно в потоке ``emit``,
+    остальные — через очередь получателя.
+    """
+
+    SEPARATOR = ":"
+    #: Максимальное число событий в кеше обработчиков.
+    CACHE_LIMIT = 1024
 
     def __init__(self) -> None:
-        self._subscribers: Dict[str, List[Callable[..., Any]]] = defaultdict(list)
+        # RLock: слабые ссылки могут сниматься сборщиком мусора прямо внутри
+        # заблокированного участка того же потока.
+        self._lock = threading.RLock()
+        self._root = _TopicNode()
+        self._dispatch: Dict[str, Tuple[Subscription, ...]] = {}
+        self._seq = 0
+        self._stats: Optional[EventStats] = None
+
+    # ------------------------------------------------------------------
+    # Инструментирование
+    # ------------------------------------------------------------------
+    def enable_stats(
+        self, budget_ms: float = 16.0, gui_thread: threading.Thread | None = None
+    ) -> EventStats:
+        """Включает сбор статистики вызовов.
+
+        ``budget_ms`` — допустимая длительность обработчика в GUI-потоке
+        (по умолчанию главный поток); более медленные попадают в журнал.
+        """
+
+        self._stats = EventStats(budget_ms / 1000, gui_thread)
+        return self._stats
+
+    def disable_stats(self) -> None:
+        """Отключает сбор статистики."""
+
+        self._stats = None
 
-    def subscribe(self, event: str, handler: Callable[..., Any]) -> None:
-        """Подписывает обработчик на событие."""
+    def stats(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Возвращает статистику по событиям и обработчикам."""
 
-        self._subscribers[event].append(handler)
+        return self._stats.snapshot() if self._stats is not None else {"events": {}, "handlers": {}}
+
+    def dump_stats(self) -> str:
+        """Возвращает статистику в виде текстовой таблицы."""
+
+        return self._stats.format() if self._stats is not None else ""
+
+    def subscribe(
+        self,
+        event: str,
+        handler: Callable[..., Any],
+        *,
+        target: Optional[QueuedDispatcher] = None,
+        weak: bool | None = None,
+    ) -> Subscription:
+        """Подписывает обработчик на событие или шаблон событий.
+
+        ``target`` задаёт очередь потока-получателя. По умолчанию связанные
+        методы хранятся по слабой ссылке, а функции — по сильной (иначе
+        лямбда была бы сразу удалена); ``weak`` переопределяет это.
+        """
+
+        with self._lock:
+            self._seq += 1
+            subscription = Subscription(self, event, handler, target, weak, self._seq)
+            node = self._root
+            for segment in event.split(self.SEPARATOR):
+                node = node.children.setdefault(segment, _TopicNode())
+            node.subscriptions = (*node.subscriptions, subscription)
+            self._dispatch = {}
+        return subscription
+
+    def unsubscribe(self, event: str, handler: Callable[..., Any]) -> None:
+        """Снимает все подписки обработчика на событие (или шаблон)."""
+
+        node = self._find(event)
+        for subscription in node.subscriptions if node is not None else ():
+            if subscription.handler == handler:
+                self._remove(subscription)
+
+    def handlers(self, event: str) -> Tuple[Subscription, ...]:
+        """Возвращает подписки, которые получат событие ``event``."""
+
+        subscriptions = self._dispatch.get(event)
+        if subscriptions is None:
+            subscriptions = self._compile(event)
+        return subscriptions
 
     def emit(self, event: str, *args: Any, **kwargs: Any) -> None:
         """Вызывает все обработчики, подписанные на событие."""
 
-        for handler in list(self._subscribers.get(event, [])):
+        subscriptions = self._dispatch.get(event)
+        if subscriptions is None:
+            subscriptions = self._compile(event)
+        if self._stats is not None:
+            self._emit_instrumented(event, subscriptions, None, args, kwargs)
+            return
+        for subscription in subscriptions:
+            self._deliver(subscription, None, args, kwargs)
+
+    def emit_coalesced(self, event: str, key: Hashable, *args: Any, **kwargs: Any) -> None:
+        """Как :meth:`emit`, но для очередей оставляет только последнее значение.
+
+        Подходит для частых событий (например, прогресса): пока получатель
+        не обработал очередь, новые значения с тем же ``key`` заменяют
+        предыдущие.
+        """
+
+        subscriptions = self.handlers(event)
+        if self._stats is not None:
+            self._emit_instrumented(event, subscriptions, key, args, kwargs)
+            return
+        for subscription in subscriptions:
+            self._deliver(subscription, (id(subscription), key), args, kwargs)
+
+    # ------------------------------------------------------------------
+    # Внутренние методы
+    # ------------------------------------------------------------------
+    def _deliver(
+        self,
+        subscription: Subscription,
+        key: Hashable | None,
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+    ) -> None:
+        handler = subscription.handler
+        if handler is None:
+            self._remove(subscription)
+            return
+        if subscription.target is None:
             handler(*args, **kwargs)
+        else:
+            subscription.target.post(lambda: handler(*args, **kwargs), key)
+
+    def _emit_instrumented(
+        self,
+        event: str,
+        subscriptions: Tuple[Subscription, ...],
+        key: Hashable | None,
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+    ) -> None:
+        stats = self._stats
+        assert stats is not None
+        started = time.perf_counter()
+        for subscription in subscriptions:
+            handler = subscription.handler
+            if handler is None:
+                self._remove(subscription)
+                continue
+            timed = _TimedCall(stats, event, handler, args, kwargs)
+            if subscription.target is None:
+                timed()
+            else:
+                coalesce = None if key is None else (id(subscription), key)
+                subscription.target.post(timed, coalesce)
+        stats.record_event(event, time.perf_counter() - started)
+
+    def _compile(self, event: str) -> Tuple[Subscription, ...]:
+        """Находит подписки для ``event`` в дереве и кеширует результат."""
+
+        segments = event.split(self.SEPARATOR)
+        found: Dict[int, Subscription] = {}
+
+        def walk(node: _TopicNode, index: int) -> None:
+            deep = node.children.get("**")
+            if deep is not None:
+                for rest in range(index, len(segments) + 1):
+                    walk(deep, rest)
+            if index == len(segments):
+                for subscription in node.subscriptions:
+                    found[id(subscription)] = subscription
+                return
+            for segment in (segments[index], "*"):
+                child = node.children.get(segment)
+                if child is not None:
+                    walk(child, index + 1)
+
+        with self._lock:
+            walk(self._root, 0)
+            subscriptions = tuple(sorted(found.values(), key=lambda s: s._seq))
+            if len(self._dispatch) >= self.CACHE_LIMIT:
+                self._dispatch = {}
+            self._dispatch[event] = subscriptions
+        return subscriptions
+
+    def _find(self, event: str) -> Optional[_TopicNode]:
+        node: Optional[_TopicNode] = self._root
+        for segment in event.split(self.SEPARATOR):
+            node = node.children.get(segment) if node is not None else None
+        return node
+
+    def _remove(self, subscription: Subscription) -> None:
+        with self._lock:
+            if not subscription.active:
+                return
+            subscription.active = False
+            path = [self._root]
+            for segment in subscription.event.split(self.SEPARATOR):
+                path.append(path[-1].children[segment])
+            node = path[-1]
+            node.subscriptions = tuple(s for s in node.subscriptions if s is not subscription)
+            # Удаляем опустевшие ветви, чтобы дерево не росло бесконечно.
+            segments = subscription.event.split(self.SEPARATOR)
+            for depth in range(len(segments), 0, -1):
+                child = path[depth]
+                if child.subscriptions or child.children:
+                    break
+                del path[depth - 1].children[segments[depth - 1]]
+            self._dispatch = {}
@@ -1,25 +1,208 @@
 from __future__ import annotations
 
+import atexit
+import copy
+import gzip
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import os
+import queue
+import shutil
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import Any, Dict, List, Optional
 
 from .config import BASE_DIR
 
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
 
-def setup_logging(log_dir: Path | None = None) -> logging.Logger:
-    """Настраивает логирование с ротацией файлов."""
+#: Атрибуты ``LogRecord``, которые не попадают в JSON как пользовательские поля.
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Форматирует записи как JSON-объекты, по одному на строку.
+
+    Кроме времени, уровня, логгера и сообщения в объект попадают поля,
+    переданные через ``extra`` (например, ``query_id`` и ``duration_ms``).
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        elif record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """``RotatingFileHandler``, сжимающий ротированные файлы в ``.gz``."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.namer = lambda name: f"{name}.gz"
+        self.rotator = self._compress
+
+    @staticmethod
+    def _compress(source: str, dest: str) -> None:
+        with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+
+class StructuredQueueHandler(QueueHandler):
+    """``QueueHandler``, не вклеивающий трассировку исключения в сообщение.
+
+    Стандартный ``prepare`` форматирует запись целиком и обнуляет
+    ``exc_info``/``exc_text``, поэтому JSON-формат не видит исключения.
+    Здесь подставляются только аргументы сообщения, а трассировка
+    сохраняется в ``exc_text`` до того, как запись покинет поток.
+
+    Если задан ``direct`` (остановленный ``QueueListener``), записи
+    передаются его обработчикам синхронно, минуя очередь.
+    """
+
+    def __init__(self, queue: "queue.SimpleQueue[logging.LogRecord]") -> None:
+        super().__init__(queue)
+        self.direct: Optional[QueueListener] = None
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        direct = self.direct
+        if direct is not None:
+            direct.handle(record)
+        else:
+            super().enqueue(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        record.message = record.msg
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        return record
+
+
+class _AsyncLogging:
+    """Очередь записей и фоновый поток, выполняющий файловый ввод-вывод."""
+
+    def __init__(self) -> None:
+        self.queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        self.handlers: List[logging.Handler] = []
+        self.retired: List[logging.Handler] = []
+        self.listener: Optional[QueueListener] = None
+        self.queue_handler = StructuredQueueHandler(self.queue)
+        self.log_file: Optional[Path] = None
+        self.file_handler: Optional[logging.Handler] = None
+        self._lock = threading.Lock()
+
+    def add_handler(self, handler: logging.Handler) -> None:
+        self.replace_handler(None, handler)
+
+    def replace_handler(
+        self, old: Optional[logging.Handler], new: logging.Handler
+    ) -> None:
+        # Набор обработчиков ``QueueListener`` фиксирован, поэтому поток
+        # перезапускается; ``stop`` дожидается записи накопленных сообщений.
+        with self._lock:
+            self._stop()
+            self.queue_handler.direct = None
+            for handler in self.retired:
+                handler.close()
+            self.retired = []
+            if old is not None and old in self.handlers:
+                self.handlers.remove(old)
+                old.close()
+            self.handlers.append(new)
+            self.listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+            self.listener.start()
+
+    def shutdown(self) -> None:
+        # ``QueueHandler`` остаётся на логгерах, поэтому записи, сделанные
+        # позже (atexit, закрытие контейнера), пишутся синхронно, а не
+        # оседают в очереди, которую уже никто не читает. Обработчики
+        # закроет ``logging.shutdown`` или следующий ``setup_logging``.
+        with self._lock:
+            listener = self.listener
+            if listener is None:
+                return
+            self._stop()
+            self.queue_handler.direct = listener
+            self.retired, self.handlers = self.handlers, []
+
+    def _stop(self) -> None:
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+
+_async = _AsyncLogging()
+atexit.register(_async.shutdown)
+
+
+def add_handler(handler: logging.Handler) -> None:
+    """Подключает обработчик к фоновому потоку журналирования."""
+
+    _async.add_handler(handler)
+
+
+def get_queue_handler() -> QueueHandler:
+    """Возвращает общий ``QueueHandler``, передающий записи фоновому потоку."""
+
+    return _async.queue_handler
+
+
+def setup_logging(
+    log_dir: Path | None = None,
+    *,
+    json_lines: bool = False,
+    compress: bool = True,
+) -> logging.Logger:
+    """Настраивает логирование с ротацией файлов.
+
+    Корневой логгер получает только ``QueueHandler``: запись в файл,
+    ротация и сжатие выполняются в фоновом потоке ``QueueListener``, поэтому
+    вызовы логирования не блокируют GUI-поток ввода-выводом. ``json_lines``
+    включает формат JSON Lines, ``compress`` — сжатие ротированных файлов.
+    """
 
     log_dir = log_dir or (BASE_DIR / "logs")
     log_dir.mkdir(parents=True, exist_ok=True)
-    log_file = log_dir / "app.log"
+    log_file = log_dir / ("app.jsonl" if json_lines else "app.log")
 
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
 
-    if not any(isinstance(h, RotatingFileHandler) and h.baseFilename == str(log_file) for h in logger.handlers):
-        handler = RotatingFileHandler(log_file, maxBytes=1_000_000, backupCount=5, encoding="utf-8")
-        formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+    if _async.log_file != log_file:
+        handler_cls = CompressingRotatingFileHandler if compress else RotatingFileHandler
+        handler = handler_cls(log_file, maxBytes=1_000_000, backupCount=5, encoding="utf-8")
+        handler.setFormatter(JsonLinesFormatter() if json_lines else logging.Formatter(TEXT_FORMAT))
+        _async.replace_handler(_async.file_handler, handler)
+        _async.log_file = log_file
+        _async.file_handler = handler
+    if _async.queue_handler not in logger.handlers:
+        logger.addHandler(_async.queue_handler)
     return logger
+
+
+def shutdown_logging() -> None:
+    """Дописывает накопленные записи и останавливает фоновый поток.
+
+    Последующие записи обработчики получают напрямую, в вызывающем потоке.
+    """
+
+    _async.shutdown()
+    _async.log_file = None
+    _async.file_handler = None
@@ -93,7 +93,91 @@ def migration_1(conn: sqlite3.Connection) -> None:
     conn.commit()
 
 
-MIGRATIONS: List[Callable[[sqlite3.Connection], None]] = [migration_1]
+def migration_2(conn: sqlite3.Connection) -> None:
+    """Link datasets to connections and record export statistics."""
+
+    cursor = conn.cursor()
+    cursor.execute(
+        "ALTER TABLE datasets ADD COLUMN connection_id INTEGER REFERENCES connections(id)"
+    )
+    cursor.execute("ALTER TABLE exports ADD COLUMN rows INTEGER")
+    cursor.execute("ALTER TABLE exports ADD COLUMN duration_ms REAL")
+    conn.commit()
+
+
+def migration_3(conn: sqlite3.Connection) -> None:
+    """Store how long cached results of a dataset stay valid, in seconds."""
+
+    conn.execute("ALTER TABLE datasets ADD COLUMN cache_ttl INTEGER")
+    conn.commit()
+
+
+def migration_4(conn: sqlite3.Connection) -> None:
+    """Let a dataset name the column used for incremental refreshes."""
+
+    conn.execute("ALTER TABLE datasets ADD COLUMN watermark_column TEXT")
+    conn.commit()
+
+
+def migration_5(conn: sqlite3.Connection) -> None:
+    """Let a dataset be fetched as parallel ranges of a key column."""
+
+    conn.execute("ALTER TABLE datasets ADD COLUMN partition_column TEXT")
+    conn.execute("ALTER TABLE datasets ADD COLUMN partitions INTEGER")
+    conn.commit()
+
+
+def migration_6(conn: sqlite3.Connection) -> None:
+    """Dataset dependencies and per-dataset timing of scheduled runs."""
+
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS dataset_dependencies (
+            dataset_id INTEGER NOT NULL REFERENCES datasets(id),
+            depends_on INTEGER NOT NULL REFERENCES datasets(id),
+            PRIMARY KEY (dataset_id, depends_on)
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS dataset_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT NOT NULL,
+            dataset_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            started_at TEXT NOT NULL,
+            wait_ms REAL,
+            duration_ms REAL,
+            rows INTEGER,
+            fingerprint TEXT,
+            inputs TEXT
+        )
+        """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_dataset_runs_dataset ON dataset_runs (dataset_id, id)"
+    )
+    conn.commit()
+
+
+def migration_7(conn: sqlite3.Connection) -> None:
+    """Let a dataset opt in to being skipped while its dependencies are unchanged."""
+
+    conn.execute("ALTER TABLE datasets ADD COLUMN skip_unchanged INTEGER NOT NULL DEFAULT 0")
+    conn.commit()
+
+
+MIGRATIONS: List[Callable[[sqlite3.Connection], None]] = [
+    migration_1,
+    migration_2,
+    migration_3,
+    migration_4,
+    migration_5,
+    migration_6,
+    migration_7,
+]
 
 
 def apply_migrations(conn: sqlite3.Connection) -> None:
@@ -1,15 +1,34 @@
 from __future__ import annotations
 
+import contextlib
+import json
+import threading
+import time
+import tracemalloc
 from abc import ABC, abstractmethod
-from typing import Any, List
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
 
 
 class Module(ABC):
-    """Контракт для модулей приложения."""
+    """Контракт для модулей приложения.
+
+    Пока модуль смонтирован, в ``scope`` доступна его область сервисов
+    (``container.open_scope("module")``). Ресурсы, полученные через неё,
+    освобождаются автоматически после ``unmount``: например, фоновые задачи
+    из ``scope.get("tasks").submit(...)`` отменяются.
+
+    Модуль с ``keep_alive = True`` при переключении не размонтируется:
+    его виджеты скрываются и сохраняются, а вместо ``unmount``/``mount``
+    вызываются :meth:`suspend`/:meth:`resume`. ``unmount`` будет вызван,
+    когда сохранённый интерфейс будет вытеснен из кеша.
+    """
 
     id: str
     title: str
     icon: str
+    scope: Any = None
+    keep_alive: bool = False
 
     @abstractmethod
     def mount(self, ui: Any, app: Any, bus: Any) -> None:
@@ -31,6 +50,12 @@ class Module(ABC):
     def get_preview_widget(self, ui: Any) -> Any:
         """Создаёт виджет предпросмотра."""
 
+    def suspend(self) -> None:
+        """Вызывается, когда интерфейс модуля скрыт, но сохранён."""
+
+    def resume(self) -> None:
+        """Вызывается, когда сохранённый интерфейс снова показан."""
+
 
 class BaseModule(Module):
     """Базовый модуль с пустыми реализациями по умолчанию."""
@@ -53,3 +78,150 @@ class BaseModule(Module):
 
     def get_preview_widget(self, ui: Any) -> Any:
         return None
+
+
+class _PhaseStats:
+    __slots__ = ("count", "total", "max", "last")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.last = value
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "last": self.last,
+        }
+
+
+class ModuleProfiler:
+    """Профилировщик жизненного цикла модулей.
+
+    Для каждого модуля собирает длительность фаз (``mount``, ``unmount``,
+    ``properties``, ``preview``), изменение выделенной памяти по данным
+    ``tracemalloc`` за ``mount``/``unmount`` и число виджетов, оставшихся
+    после ``unmount``. Рост памяти за полный цикл mount+unmount и
+    оставшиеся виджеты указывают на утечки. В выключенном состоянии
+    :meth:`measure` возвращает пустой контекст.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._phases: Dict[str, Dict[str, _PhaseStats]] = {}
+        self._memory: Dict[str, Dict[str, _PhaseStats]] = {}
+        self._widgets: Dict[str, List[int]] = {}
+        self._started_tracemalloc = False
+
+    def enable(self) -> None:
+        """Включает профилирование и, при необходимости, ``tracemalloc``."""
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Выключает профилирование."""
+
+        self.enabled = False
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def reset(self) -> None:
+        """Удаляет накопленные данные."""
+
+        with self._lock:
+            self._phases.clear()
+            self._memory.clear()
+            self._widgets.clear()
+
+    def measure(
+        self, module: Module, phase: str, *, memory: bool = False
+    ) -> contextlib.AbstractContextManager[None]:
+        """Возвращает контекст, измеряющий фазу ``phase`` модуля."""
+
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._measure(module.id, phase, memory and tracemalloc.is_tracing())
+
+    @contextlib.contextmanager
+    def _measure(self, module_id: str, phase: str, memory: bool) -> Iterator[None]:
+        before = tracemalloc.get_traced_memory()[0] if memory else 0
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            delta = tracemalloc.get_traced_memory()[0] - before if memory else None
+            with self._lock:
+                phases = self._phases.setdefault(module_id, {})
+                phases.setdefault(phase, _PhaseStats()).add(elapsed)
+                if delta is not None:
+                    mem = self._memory.setdefault(module_id, {})
+                    mem.setdefault(phase, _PhaseStats()).add(delta)
+
+    def record_widgets(self, module: Module, alive: int) -> None:
+        """Сохраняет число виджетов модуля, оставшихся после ``unmount``."""
+
+        if not self.enabled:
+            return
+        with self._lock:
+            self._widgets.setdefault(module.id, []).append(alive)
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Возвращает собранные данные по модулям."""
+
+        with self._lock:
+            result: Dict[str, Dict[str, Any]] = {}
+            for module_id in sorted({*self._phases, *self._memory, *self._widgets}):
+                memory = {k: v.as_dict() for k, v in self._memory.get(module_id, {}).items()}
+                widgets = self._widgets.get(module_id, [])
+                result[module_id] = {
+                    "phases": {k: v.as_dict() for k, v in self._phases.get(module_id, {}).items()},
+                    "memory": memory,
+                    "memory_growth": sum(v["total"] for v in memory.values()),
+                    "widgets_alive": widgets[-1] if widgets else 0,
+                    "widgets_alive_max": max(widgets, default=0),
+                }
+            return result
+
+    def format_report(self) -> str:
+        """Возвращает отчёт в виде текста."""
+
+        lines: List[str] = []
+        for module_id, data in self.report().items():
+            lines.append(
+                f"{module_id}: рост памяти {data['memory_growth'] / 1024:.1f} КиБ, "
+                f"виджетов после unmount {data['widgets_alive']}"
+            )
+            for phase, stats in data["phases"].items():
+                lines.append(
+                    f"  {phase:<12} {stats['count']:>5} раз, ср. {stats['mean'] * 1000:.2f} мс, "
+                    f"макс. {stats['max'] * 1000:.2f} мс"
+                )
+        return "\n".join(lines)
+
+    def dump(self, path: Path) -> Path:
+        """Сохраняет отчёт в JSON-файл ``path``."""
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            json.dumps(self.report(), ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        return path
+
+
+profiler = ModuleProfiler()
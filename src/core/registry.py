@@ -1,58 +1,227 @@
 from __future__ import annotations
 
 import importlib
+import json
 import logging
+import threading
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
+from .config import BASE_DIR
 from .module_api import Module
 
+#: Имя пакета с модулями: ``modules`` или ``src.modules`` в зависимости от
+#: того, как импортирован ``core``.
+MODULES_PACKAGE = ".".join([*__name__.split(".")[:-2], "modules"])
+MANIFEST_NAME = "manifest.json"
+DEFAULT_CACHE_PATH = BASE_DIR / "cache" / "modules.json"
+
+
+@dataclass(slots=True)
+class ModuleInfo:
+    """Метаданные модуля, достаточные для навигации без его импорта."""
+
+    id: str
+    title: str
+    icon: str = ""
+    entry: str = ""
+
+    @classmethod
+    def from_module(cls, module: Module, entry: str = "") -> "ModuleInfo":
+        return cls(module.id, module.title, module.icon, entry or type(module).__module__)
+
 
 class ModuleRegistry:
-    """Реестр модулей приложения."""
+    """Реестр модулей приложения.
+
+    Помимо загруженных модулей хранит метаданные ещё не импортированных:
+    такой модуль импортируется при первом обращении через :meth:`get`.
+    """
 
     def __init__(self) -> None:
         self._modules: Dict[str, Module] = {}
+        self._infos: Dict[str, ModuleInfo] = {}
+        # Порядок появления идентификаторов определяет порядок навигации.
+        self._order: Dict[str, None] = {}
+        self._lock = threading.RLock()
 
     def register(self, module: Module) -> None:
         """Регистрирует модуль."""
-        if module.id in self._modules:
-            logging.warning("Модуль %s уже зарегистрирован", module.id)
-            return
-        self._modules[module.id] = module
+        with self._lock:
+            if module.id in self._modules:
+                logging.warning("Модуль %s уже зарегистрирован", module.id)
+                return
+            self._modules[module.id] = module
+            self._order.setdefault(module.id, None)
+
+    def register_info(self, info: ModuleInfo) -> None:
+        """Регистрирует метаданные модуля, не импортируя его."""
+        with self._lock:
+            self._infos.setdefault(info.id, info)
+            self._order.setdefault(info.id, None)
 
     def get(self, module_id: str) -> Optional[Module]:
-        """Возвращает модуль по идентификатору."""
-        return self._modules.get(module_id)
+        """Возвращает модуль по идентификатору, импортируя его при необходимости."""
+        module = self._modules.get(module_id)
+        if module is not None:
+            return module
+        info = self._infos.get(module_id)
+        if info is None or not info.entry:
+            return None
+        return self._load(info)
+
+    def is_loaded(self, module_id: str) -> bool:
+        """Проверяет, импортирован ли модуль."""
+        return module_id in self._modules
+
+    def infos(self) -> List[ModuleInfo]:
+        """Возвращает метаданные всех известных модулей."""
+        result: List[ModuleInfo] = []
+        for module_id in list(self._order):
+            module = self._modules.get(module_id)
+            info = self._infos.get(module_id)
+            if module is not None:
+                result.append(ModuleInfo.from_module(module, info.entry if info else ""))
+            elif info is not None:
+                result.append(info)
+        return result
 
     def all(self) -> List[Module]:
-        """Возвращает все зарегистрированные модули."""
+        """Возвращает все загруженные модули."""
         return list(self._modules.values())
 
+    def _load(self, info: ModuleInfo) -> Optional[Module]:
+        with self._lock:
+            if info.id in self._modules:
+                return self._modules[info.id]
+            try:
+                entry = importlib.import_module(info.entry)
+            except Exception:  # pragma: no cover - логирование исключений
+                logging.exception("Ошибка загрузки модуля %s", info.entry)
+                return None
+            if info.id not in self._modules:
+                # Модуль может не регистрировать себя сам, а лишь объявлять
+                # экземпляр в атрибуте ``module``.
+                module = getattr(entry, "module", None)
+                if isinstance(module, Module) and module.id == info.id:
+                    self._modules[info.id] = module
+            module = self._modules.get(info.id)
+            if module is None:
+                logging.error("Модуль %s не зарегистрировал %s", info.entry, info.id)
+            return module
+
 
 registry = ModuleRegistry()
 
 
-def autodiscover_modules(base_path: Optional[Path] = None) -> List[Module]:
-    """Импортирует модули из каталога ``modules`` и регистрирует их."""
+def _read_cache(path: Path) -> Dict[str, Any]:
+    try:
+        with path.open(encoding="utf-8") as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _write_cache(path: Path, data: Dict[str, Any]) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(path)
+    except OSError:  # pragma: no cover - кеш необязателен
+        logging.warning("Не удалось сохранить кеш модулей %s", path)
+
+
+def _mtime(path: Path) -> Optional[float]:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return None
+
+
+def _discover_info(item: Path) -> Optional[ModuleInfo]:
+    """Читает манифест модуля или, если его нет, импортирует ``module.py``."""
+
+    entry = f"{MODULES_PACKAGE}.{item.name}.module"
+    manifest = item / MANIFEST_NAME
+    if manifest.exists():
+        with manifest.open(encoding="utf-8") as fh:
+            data = json.load(fh)
+        submodule = data.get("entry", "module")
+        return ModuleInfo(
+            id=data["id"],
+            title=data.get("title", data["id"]),
+            icon=data.get("icon", ""),
+            entry=f"{MODULES_PACKAGE}.{item.name}.{submodule}",
+        )
+
+    # Модуль без манифеста: метаданные можно получить только импортом.
+    known = set(registry._modules)
+    importlib.import_module(entry)
+    added = [m for mid, m in registry._modules.items() if mid not in known]
+    if not added:
+        module = getattr(importlib.import_module(entry), "module", None)
+        if isinstance(module, Module):
+            registry.register(module)
+            added = [module]
+    return ModuleInfo.from_module(added[0], entry) if added else None
+
+
+def autodiscover_modules(
+    base_path: Optional[Path] = None, cache_path: Optional[Path] = None
+) -> List[ModuleInfo]:
+    """Находит модули в каталоге ``modules`` и регистрирует их метаданные.
+
+    Метаданные берутся из ``manifest.json`` (``id``, ``title``, ``icon`` и
+    необязательный ``entry``) и кешируются в ``cache/modules.json`` с
+    привязкой ко времени изменения файлов. Сам модуль импортируется при
+    первой активации. Модули без манифеста импортируются один раз, пока их
+    метаданные не попадут в кеш.
+    """
     modules_dir = base_path or Path(__file__).resolve().parent.parent / "modules"
+    cache_path = cache_path or DEFAULT_CACHE_PATH
 
     if not modules_dir.exists():
         logging.info("Каталог модулей %s не найден", modules_dir)
         return []
 
-    for item in modules_dir.iterdir():
+    cache = _read_cache(cache_path)
+    valid = cache.get("dir") == str(modules_dir) and cache.get("package") == MODULES_PACKAGE
+    cached_entries: Dict[str, Any] = cache.get("entries", {}) if valid else {}
+    entries: Dict[str, Any] = {}
+
+    for item in sorted(modules_dir.iterdir()):
         module_file = item / "module.py"
-        if module_file.exists():
-            module_name = f"modules.{item.name}.module"
+        manifest = item / MANIFEST_NAME
+        if not (module_file.exists() or manifest.exists()):
+            continue
+        stamp = [_mtime(manifest), _mtime(module_file)]
+        cached = cached_entries.get(item.name)
+        if cached and cached.get("mtime") == stamp:
+            info = ModuleInfo(**cached["info"])
+        else:
             try:
-                importlib.import_module(module_name)
+                info = _discover_info(item)
             except Exception:  # pragma: no cover - логирование исключений
-                logging.exception("Ошибка загрузки модуля %s", module_name)
+                logging.exception("Ошибка загрузки модуля %s", item.name)
+                continue
+            if info is None:
+                logging.warning("Модуль %s не зарегистрирован", item.name)
+                continue
+        entries[item.name] = {"mtime": stamp, "info": asdict(info)}
+        registry.register_info(info)
+
+    if entries != cached_entries:
+        _write_cache(
+            cache_path,
+            {"dir": str(modules_dir), "package": MODULES_PACKAGE, "entries": entries},
+        )
 
-    modules = registry.all()
-    if modules:
-        logging.info("Обнаруженные модули: %s", ", ".join(m.id for m in modules))
+    infos = registry.infos()
+    if infos:
+        logging.info("Обнаруженные модули: %s", ", ".join(i.id for i in infos))
     else:
         logging.info("Модули не обнаружены")
-    return modules
+    return infos
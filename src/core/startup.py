@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import importlib.abc
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+#: Флаг командной строки, включающий профилирование запуска.
+PROFILE_FLAG = "--profile-startup"
+
+
+class _TimedLoader:
+    """Обёртка загрузчика, измеряющая выполнение модуля."""
+
+    def __init__(self, loader: Any, finder: "_ImportTimer") -> None:
+        self._loader = loader
+        self._finder = finder
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._loader, name)
+
+    def create_module(self, spec: Any) -> Any:
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module: Any) -> None:
+        # После выполнения модулю возвращается исходный загрузчик, чтобы
+        # ``importlib.resources`` и ``inspect`` работали как обычно.
+        module.__loader__ = self._loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self._loader
+        self._finder.profiler._enter()
+        started = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._finder.profiler._leave(module.__name__, time.perf_counter() - started)
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    def __init__(self, profiler: "StartupProfiler") -> None:
+        self.profiler = profiler
+
+    def find_spec(self, fullname: str, path: Any, target: Any = None) -> Any:
+        if threading.get_ident() != self.profiler._thread:
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimedLoader(spec.loader, self)
+            return spec
+        return None
+
+
+class StartupProfiler:
+    """Профилировщик запуска приложения.
+
+    Пока установлен (:meth:`install`), измеряет время выполнения каждого
+    импортируемого модуля в главном потоке: собственное (``self``) и вместе с
+    вложенными импортами (``total``), как ``python -X importtime``. Вехи
+    запуска (создание ``QApplication``, окна, первая отрисовка) отмечаются
+    через :meth:`mark` и отсчитываются от создания профилировщика.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.imports: Dict[str, Dict[str, float]] = {}
+        self.marks: Dict[str, float] = {}
+        self._finder: Optional[_ImportTimer] = None
+        self._thread = threading.get_ident()
+        self._children: List[float] = []
+
+    @property
+    def installed(self) -> bool:
+        return self._finder is not None
+
+    def install(self) -> None:
+        """Начинает измерять импорты текущего потока."""
+
+        if self._finder is None:
+            self._thread = threading.get_ident()
+            self._finder = _ImportTimer(self)
+            sys.meta_path.insert(0, self._finder)
+
+    def uninstall(self) -> None:
+        """Прекращает измерение импортов."""
+
+        if self._finder is not None:
+            if self._finder in sys.meta_path:
+                sys.meta_path.remove(self._finder)
+            self._finder = None
+
+    def mark(self, name: str) -> float:
+        """Отмечает веху запуска и возвращает время от старта, с."""
+
+        elapsed = time.perf_counter() - self.started
+        self.marks.setdefault(name, elapsed)
+        return self.marks[name]
+
+    def _enter(self) -> None:
+        self._children.append(0.0)
+
+    def _leave(self, name: str, total: float) -> None:
+        nested = self._children.pop()
+        if self._children:
+            self._children[-1] += total
+        self.imports[name] = {"self": total - nested, "total": total}
+
+    def report(self, top: int = 25) -> Dict[str, Any]:
+        """Возвращает вехи и самые медленные импорты."""
+
+        slowest = sorted(self.imports.items(), key=lambda item: item[1]["self"], reverse=True)
+        roots = sum(v["total"] for k, v in self.imports.items() if "." not in k)
+        return {
+            "marks": dict(self.marks),
+            "imports_total": roots,
+            "imports_count": len(self.imports),
+            "imports": [{"module": name, **times} for name, times in slowest[:top]],
+        }
+
+    def format_report(self, top: int = 25) -> str:
+        """Возвращает отчёт в виде текста."""
+
+        data = self.report(top)
+        lines = [f"{name:<24} {value * 1000:9.1f} мс" for name, value in data["marks"].items()]
+        lines.append(
+            f"Импорты: {data['imports_count']} модулей, "
+            f"{data['imports_total'] * 1000:.1f} мс"
+        )
+        lines.append(f"{'модуль':<48} {'self, мс':>10} {'total, мс':>10}")
+        for row in data["imports"]:
+            lines.append(
+                f"{row['module']:<48} {row['self'] * 1000:10.1f} {row['total'] * 1000:10.1f}"
+            )
+        return "\n".join(lines)
+
+    def dump(self, path: Path) -> Path:
+        """Сохраняет полный отчёт в JSON."""
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            json.dumps(self.report(top=len(self.imports)), ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+        return path
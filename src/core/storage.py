@@ -9,11 +9,15 @@ from .migrations import apply_migrations
 DB_PATH = BASE_DIR / "data" / "app.db"
 
 
-def get_connection() -> sqlite3.Connection:
-    """Return a connection to the local SQLite database, applying migrations."""
+def get_connection(*, check_same_thread: bool = True) -> sqlite3.Connection:
+    """Return a connection to the local SQLite database, applying migrations.
+
+    Pass ``check_same_thread=False`` for connections that are created on a
+    background thread and handed over to another one.
+    """
 
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=check_same_thread)
     apply_migrations(conn)
     return conn
 
@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from .events import EventBus, QueuedDispatcher
+
+
+class TaskCancelled(Exception):
+    """Задача отменена; выбрасывается из :meth:`TaskHandle.check`."""
+
+
+_current = threading.local()
+
+
+def current_task() -> Optional["TaskHandle"]:
+    """Возвращает задачу, выполняемую в текущем потоке пула."""
+
+    return getattr(_current, "task", None)
+
+
+class TaskHandle:
+    """Описатель задачи :class:`TaskRunner`.
+
+    ``future`` — обычный ``concurrent.futures.Future``. Отмена кооперативная:
+    ожидающая задача снимается с очереди, а выполняющаяся должна сама
+    проверять :attr:`cancelled` или вызывать :meth:`check`.
+    """
+
+    def __init__(self, runner: "TaskRunner", task_id: int, name: str, key: Hashable | None) -> None:
+        self.id = task_id
+        self.name = name
+        self.key = key
+        self.future: Future = Future()
+        self._runner = runner
+        self._cancelled = threading.Event()
+        self._callbacks: List[Tuple[Any, Optional[Callable], Optional[Callable], Any]] = []
+        self._owners: List[Any] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Отменяет задачу для всех владельцев; колбэки не вызываются."""
+
+        self._cancelled.set()
+        if self.future.cancel():
+            self._runner._finish(self)
+
+    def release(self, owner: Any = None) -> None:
+        """Снимает подписку ``owner`` вместе с его колбэками.
+
+        Задача с общим ``key`` отменяется, только когда уходит последний
+        владелец; остальные по-прежнему получают результат.
+        """
+
+        with self._runner._lock:
+            if owner in self._owners:
+                self._owners.remove(owner)
+            if owner not in self._owners:
+                self._callbacks = [cb for cb in self._callbacks if cb[0] is not owner]
+            last = not self._owners
+        if last:
+            self.cancel()
+
+    def check(self) -> None:
+        """Выбрасывает :class:`TaskCancelled`, если задача отменена."""
+
+        if self.cancelled:
+            raise TaskCancelled(self.name)
+
+    def progress(self, fraction: float, message: str = "") -> None:
+        """Сообщает о прогрессе событием ``task:progress``."""
+
+        self._runner._emit_progress(self, fraction, message)
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout: float | None = None) -> Any:
+        return self.future.result(timeout)
+
+    def __repr__(self) -> str:
+        return f"<TaskHandle {self.id} {self.name}>"
+
+
+class TaskRunner:
+    """Пул фоновых потоков с приоритетами для медленных операций.
+
+    * задачи с большим ``priority`` запускаются раньше, при равном — в
+      порядке поступления;
+    * задача с тем же ``key``, что у ещё не завершённой, не запускается
+      повторно: вызывающий получает существующий описатель и становится
+      ещё одним его владельцем (см. :meth:`TaskHandle.release`);
+    * прогресс, запуск и завершение публикуются в ``bus`` событиями
+      ``task:progress``, ``task:started`` и ``task:finished``;
+    * ``on_done``/``on_error`` выполняются через ``dispatcher`` (например,
+      ``QtDispatcher`` в GUI-потоке), без него — в потоке пула.
+    """
+
+    EVENT_STARTED = "task:started"
+    EVENT_PROGRESS = "task:progress"
+    EVENT_FINISHED = "task:finished"
+
+    def __init__(self, max_workers: int | None = None, *, bus: EventBus | None = None) -> None:
+        self.max_workers = max_workers or min(8, (os.cpu_count() or 1) + 2)
+        self.bus = bus
+        self._lock = threading.Condition()
+        self._queue: List[Tuple[int, int, TaskHandle, Callable[[], Any]]] = []
+        self._by_key: Dict[Hashable, TaskHandle] = {}
+        self._ids = itertools.count(1)
+        self._workers: List[threading.Thread] = []
+        self._idle = 0
+        self._closed = False
+
+    def submit(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        key: Hashable | None = None,
+        priority: int = 0,
+        name: str | None = None,
+        on_done: Callable[[Any], None] | None = None,
+        on_error: Callable[[BaseException], None] | None = None,
+        dispatcher: QueuedDispatcher | None = None,
+        owner: Any = None,
+        **kwargs: Any,
+    ) -> TaskHandle:
+        """Ставит ``fn(*args, **kwargs)`` в очередь и возвращает описатель.
+
+        ``owner`` помечает подписку и колбэки вызывающего, чтобы
+        :meth:`TaskHandle.release` снял только их.
+        """
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("TaskRunner is shut down")
+            handle = self._by_key.get(key) if key is not None else None
+            if handle is None or handle.cancelled:
+                handle = TaskHandle(self, next(self._ids), name or _task_name(fn), key)
+                if key is not None:
+                    self._by_key[key] = handle
+                call = lambda: fn(*args, **kwargs)  # noqa: E731
+                heapq.heappush(self._queue, (-priority, handle.id, handle, call))
+                self._spawn_worker()
+                self._lock.notify()
+            handle._owners.append(owner)
+            if on_done is not None or on_error is not None:
+                handle._callbacks.append((owner, on_done, on_error, dispatcher))
+        return handle
+
+    def pending(self) -> int:
+        """Возвращает число задач в очереди."""
+
+        with self._lock:
+            return sum(1 for *_, handle, _ in self._queue if not handle.future.done())
+
+    def shutdown(self, wait: bool = True, timeout: float | None = 5.0) -> None:
+        """Отменяет ожидающие задачи и останавливает потоки."""
+
+        with self._lock:
+            self._closed = True
+            queued = [handle for _, _, handle, _ in self._queue]
+            self._queue.clear()
+            self._lock.notify_all()
+            workers = list(self._workers)
+        for handle in queued:
+            handle.cancel()
+        for handle in list(self._by_key.values()):
+            handle._cancelled.set()
+        if wait:
+            for worker in workers:
+                worker.join(timeout)
+
+    close = shutdown
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _spawn_worker(self) -> None:
+        if self._idle == 0 and len(self._workers) < self.max_workers:
+            worker = threading.Thread(
+                target=self._work, name=f"task-{len(self._workers) + 1}", daemon=True
+            )
+            self._workers.append(worker)
+            worker.start()
+
+    def _work(self) -> None:
+        while True:
+            with self._lock:
+                self._idle += 1
+                while not self._queue and not self._closed:
+                    self._lock.wait()
+                self._idle -= 1
+                if not self._queue:
+                    return
+                _, _, handle, call = heapq.heappop(self._queue)
+            if not handle.future.set_running_or_notify_cancel():
+                continue
+            try:
+                self._run(handle, call)
+            except Exception:  # noqa: BLE001 - поток пула не должен завершаться
+                logging.exception("Ошибка при завершении задачи %s", handle.name)
+
+    def _run(self, handle: TaskHandle, call: Callable[[], Any]) -> None:
+        _current.task = handle
+        try:
+            self._emit(self.EVENT_STARTED, handle)
+            if handle.cancelled:
+                raise TaskCancelled(handle.name)
+            result = call()
+        except BaseException as exc:  # noqa: BLE001 - передаётся в Future
+            handle.future.set_exception(exc)
+        else:
+            handle.future.set_result(result)
+        finally:
+            _current.task = None
+        self._finish(handle)
+
+    def _finish(self, handle: TaskHandle) -> None:
+        with self._lock:
+            if handle.key is not None and self._by_key.get(handle.key) is handle:
+                del self._by_key[handle.key]
+            callbacks = list(handle._callbacks)
+        self._emit(self.EVENT_FINISHED, handle)
+        if handle.cancelled:
+            return
+        exc = handle.future.exception()
+        if isinstance(exc, TaskCancelled):
+            return
+        for _, on_done, on_error, dispatcher in callbacks:
+            if exc is None:
+                if on_done is None:
+                    continue
+                deliver = _bind(on_done, handle.future.result())
+            elif on_error is not None:
+                deliver = _bind(on_error, exc)
+            else:
+                logging.error("Ошибка задачи %s", handle.name, exc_info=exc)
+                continue
+            try:
+                if dispatcher is not None:
+                    # Например, QtDispatcher, чей владелец уже удалён.
+                    dispatcher.post(deliver)
+                else:
+                    deliver()
+            except Exception:  # noqa: BLE001
+                logging.exception("Ошибка в обработчике задачи %s", handle.name)
+
+    def _emit(self, event: str, handle: TaskHandle) -> None:
+        if self.bus is not None:
+            self.bus.emit(event, handle)
+
+    def _emit_progress(self, handle: TaskHandle, fraction: float, message: str) -> None:
+        if self.bus is not None:
+            self.bus.emit_coalesced(self.EVENT_PROGRESS, handle.id, handle, fraction, message)
+
+
+class TaskGroup:
+    """Задачи одного владельца в общем :class:`TaskRunner`.
+
+    :meth:`submit` передаёт задачу в ``runner`` от имени группы и запоминает
+    описатель; :meth:`close` снимает подписки группы, так что отменяются
+    только задачи, которых больше никто не ждёт. В контейнере
+    зарегистрирована как сервис ``tasks`` области ``module``: задачи модуля
+    отменяются, когда его область закрывается после ``unmount``.
+    """
+
+    def __init__(self, runner: TaskRunner) -> None:
+        self.runner = runner
+        self.closed = False
+        self._handles: List[TaskHandle] = []
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> TaskHandle:
+        """Как :meth:`TaskRunner.submit`; после :meth:`close` — ``RuntimeError``."""
+
+        with self._lock:
+            if self.closed:
+                raise RuntimeError("TaskGroup is closed")
+            handle = self.runner.submit(fn, *args, owner=self, **kwargs)
+            self._handles = [h for h in self._handles if not h.done()]
+            self._handles.append(handle)
+        return handle
+
+    def close(self) -> None:
+        """Снимает подписки группы на незавершённые задачи."""
+
+        with self._lock:
+            self.closed = True
+            handles, self._handles = self._handles, []
+        for handle in handles:
+            if not handle.done():
+                handle.release(self)
+
+
+def _bind(callback: Callable[[Any], None], value: Any) -> Callable[[], None]:
+    return lambda: callback(value)
+
+
+def _task_name(fn: Callable[..., Any]) -> str:
+    return getattr(fn, "__qualname__", None) or repr(fn)
@@ -0,0 +1,72 @@
+"""Dataset definitions and their exports."""
+
+from .dag import CycleError, NodeRun, critical_path, run_graph, topological_order
+from .export import (
+    COMPRESSION_SUFFIXES,
+    FORMATS,
+    DigestSink,
+    Sink,
+    TextSink,
+    XlsxSink,
+    open_sink,
+    tee,
+    write_csv,
+    write_xlsx,
+)
+from .manager import Dataset, DatasetManager, ExportRecord, RunRecord
+from .partition import (
+    PartitionedCursor,
+    fetch_partitioned,
+    partition_bounds,
+    range_queries,
+    referenced_tables,
+    split_range,
+)
+from .result_cache import (
+    CacheStats,
+    CachedResult,
+    ResultCache,
+    ResultCacheSink,
+    cache_key,
+    derived_table,
+    normalize_sql,
+    quote_name,
+    watermark_query,
+)
+
+__all__ = [
+    "COMPRESSION_SUFFIXES",
+    "FORMATS",
+    "CycleError",
+    "Dataset",
+    "DatasetManager",
+    "DigestSink",
+    "ExportRecord",
+    "NodeRun",
+    "PartitionedCursor",
+    "CacheStats",
+    "CachedResult",
+    "ResultCache",
+    "ResultCacheSink",
+    "RunRecord",
+    "Sink",
+    "TextSink",
+    "XlsxSink",
+    "cache_key",
+    "critical_path",
+    "derived_table",
+    "fetch_partitioned",
+    "normalize_sql",
+    "open_sink",
+    "partition_bounds",
+    "quote_name",
+    "range_queries",
+    "referenced_tables",
+    "run_graph",
+    "split_range",
+    "tee",
+    "topological_order",
+    "watermark_query",
+    "write_csv",
+    "write_xlsx",
+]
@@ -0,0 +1,228 @@
+"""Running dependent jobs as a directed acyclic graph.
+
+:func:`run_graph` starts every node as soon as all of its dependencies have
+finished, so independent branches overlap and the whole graph takes about
+as long as its critical path instead of the sum of all nodes. Ready nodes
+that head the longest remaining chains (by ``weights``, e.g. durations of
+the previous run) are started first.
+"""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+Graph = Mapping[Hashable, Iterable[Hashable]]
+
+
+class CycleError(ValueError):
+    """Dependencies form a cycle; ``cycle`` lists its nodes in order."""
+
+    def __init__(self, cycle: Sequence[Hashable]) -> None:
+        super().__init__("dependency cycle: " + " -> ".join(map(str, cycle)))
+        self.cycle = list(cycle)
+
+
+def _normalize(graph: Graph) -> Dict[Hashable, List[Hashable]]:
+    # Nodes that only appear as dependencies have no dependencies themselves.
+    nodes: Dict[Hashable, List[Hashable]] = {}
+    for node, deps in graph.items():
+        nodes[node] = list(dict.fromkeys(deps))
+        for dep in nodes[node]:
+            nodes.setdefault(dep, [])
+    return nodes
+
+
+def topological_order(graph: Graph) -> List[Hashable]:
+    """Nodes of ``graph`` (node -> dependencies) with dependencies first.
+
+    Raises :class:`CycleError` naming one cycle if there is any.
+    """
+
+    nodes = _normalize(graph)
+    order: List[Hashable] = []
+    state: Dict[Hashable, int] = {}  # 1 - on the current path, 2 - done
+    for root in nodes:
+        if root in state:
+            continue
+        path = [root]
+        stack = [iter(nodes[root])]
+        state[root] = 1
+        while stack:
+            dep = next(stack[-1], None)
+            if dep is None:
+                stack.pop()
+                node = path.pop()
+                state[node] = 2
+                order.append(node)
+            elif state.get(dep) == 1:
+                raise CycleError(path[path.index(dep) :] + [dep])
+            elif dep not in state:
+                state[dep] = 1
+                path.append(dep)
+                stack.append(iter(nodes[dep]))
+    return order
+
+
+def _ranks(
+    nodes: Mapping[Hashable, List[Hashable]], weights: Mapping[Hashable, float]
+) -> Dict[Hashable, Tuple[float, Optional[Hashable]]]:
+    # Longest weighted chain starting at each node and the next node on it.
+    dependents: Dict[Hashable, List[Hashable]] = {node: [] for node in nodes}
+    for node, deps in nodes.items():
+        for dep in deps:
+            dependents[dep].append(node)
+    ranks: Dict[Hashable, Tuple[float, Optional[Hashable]]] = {}
+    for node in reversed(topological_order(nodes)):
+        best = max(dependents[node], key=lambda d: ranks[d][0], default=None)
+        tail = ranks[best][0] if best is not None else 0.0
+        ranks[node] = (weights.get(node, 1.0) + tail, best)
+    return ranks
+
+
+def critical_path(graph: Graph, weights: Mapping[Hashable, float]) -> Tuple[float, List[Hashable]]:
+    """Length and nodes of the heaviest dependency chain of ``graph``.
+
+    ``weights`` gives the cost of each node; missing nodes weigh 1.
+    """
+
+    ranks = _ranks(_normalize(graph), weights)
+    if not ranks:
+        return 0.0, []
+    node: Optional[Hashable] = max(ranks, key=lambda n: ranks[n][0])
+    length = ranks[node][0]
+    path = []
+    while node is not None:
+        path.append(node)
+        node = ranks[node][1]
+    return length, path
+
+
+@dataclass
+class NodeRun:
+    """Outcome and timing of one node; times are seconds from the graph start."""
+
+    #: ``done``, ``failed`` (the job raised or was not ``ok``) or ``blocked``
+    #: (a dependency did not succeed, the job was not started).
+    status: str = "pending"
+    result: Any = None
+    error: Optional[BaseException] = None
+    ready_at: Optional[float] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def wait_ms(self) -> float:
+        if self.ready_at is None or self.started_at is None:
+            return 0.0
+        return (self.started_at - self.ready_at) * 1000
+
+    @property
+    def duration_ms(self) -> float:
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return (self.finished_at - self.started_at) * 1000
+
+
+def run_graph(
+    graph: Graph,
+    work: Callable[[Hashable, Dict[Hashable, NodeRun]], Any],
+    *,
+    jobs: int = 4,
+    group: Optional[Callable[[Hashable], Hashable]] = None,
+    group_limit: Optional[int] = None,
+    weights: Optional[Mapping[Hashable, float]] = None,
+    ok: Callable[[Any], bool] = lambda result: True,
+    on_done: Optional[Callable[[Hashable, NodeRun], None]] = None,
+) -> Dict[Hashable, NodeRun]:
+    """Run ``work(node, upstream)`` for every node once its dependencies succeed.
+
+    ``graph`` maps a node to its dependencies; ``upstream`` holds their
+    :class:`NodeRun`. At most ``jobs`` nodes run at once, and at most
+    ``group_limit`` of those share the same ``group(node)`` (e.g. the
+    server a dataset is fetched from). A node fails if ``work`` raises or
+    ``ok(result)`` is false; its dependents are then blocked. ``on_done``
+    is called on the calling thread for every finished or blocked node.
+    """
+
+    nodes = _normalize(graph)
+    ranks = _ranks(nodes, weights or {})
+    runs = {node: NodeRun() for node in nodes}
+    waiting: Dict[Hashable, Set[Hashable]] = {node: set(deps) for node, deps in nodes.items()}
+    dependents: Dict[Hashable, List[Hashable]] = {node: [] for node in nodes}
+    for node, deps in nodes.items():
+        for dep in deps:
+            dependents[dep].append(node)
+    busy: Dict[Hashable, int] = {}
+    started = time.perf_counter()
+
+    def now() -> float:
+        return time.perf_counter() - started
+
+    def finish(node: Hashable) -> None:
+        if on_done is not None:
+            on_done(node, runs[node])
+
+    def block(node: Hashable) -> None:
+        for dependent in dependents[node]:
+            if runs[dependent].status == "pending":
+                runs[dependent].status = "blocked"
+                finish(dependent)
+                block(dependent)
+
+    ready = [node for node, deps in waiting.items() if not deps]
+    for node in ready:
+        runs[node].ready_at = 0.0
+    running: Dict[Future, Hashable] = {}
+    with ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="graph") as pool:
+        while ready or running:
+            ready.sort(key=lambda n: ranks[n][0], reverse=True)
+            for node in list(ready):
+                if len(running) >= max(1, jobs):
+                    break
+                key = group(node) if group is not None else None
+                if group_limit and busy.get(key, 0) >= group_limit:
+                    continue
+                ready.remove(node)
+                busy[key] = busy.get(key, 0) + 1
+                runs[node].status = "running"
+                runs[node].started_at = now()
+                upstream = {dep: runs[dep] for dep in nodes[node]}
+                running[pool.submit(work, node, upstream)] = node
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                node = running.pop(future)
+                run = runs[node]
+                run.finished_at = now()
+                key = group(node) if group is not None else None
+                busy[key] -= 1
+                try:
+                    run.result = future.result()
+                    run.status = "done" if ok(run.result) else "failed"
+                except Exception as exc:  # noqa: BLE001 - reported through NodeRun
+                    run.error = exc
+                    run.status = "failed"
+                finish(node)
+                if run.status != "done":
+                    block(node)
+                    continue
+                for dependent in dependents[node]:
+                    waiting[dependent].discard(node)
+                    if not waiting[dependent] and runs[dependent].status == "pending":
+                        runs[dependent].ready_at = run.finished_at
+                        ready.append(dependent)
+    return runs
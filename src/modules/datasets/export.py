@@ -0,0 +1,404 @@
+from __future__ import annotations
+
+import csv
+import datetime as dt
+import gzip
+import hashlib
+import io
+import lzma
+import queue
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Sequence
+
+#: Rows fetched from the driver per round trip.
+FETCH_SIZE = 5000
+#: Rows per worksheet in Excel, including the header row.
+EXCEL_MAX_ROWS = 1_048_576
+#: Output formats understood by :func:`open_sink`.
+FORMATS = ("csv", "tsv", "xlsx")
+#: File suffixes of the supported compression methods.
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "lzma": ".xz"}
+
+Converter = Optional[Callable[[Any], Any]]
+Description = Sequence[Sequence[Any]]
+
+
+class Sink(ABC):
+    """Destination for batches of rows produced by one query.
+
+    :func:`tee` calls :meth:`open` with the cursor description, :meth:`write`
+    for every fetched batch and finally :meth:`close`; on failure it calls
+    :meth:`abort`, which must remove partial output. Batches are shared
+    between sinks and must not be modified.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.rows = 0
+        self.duration_ms = 0.0
+        self._started = 0.0
+
+    def open(self, description: Description) -> None:
+        self._started = time.perf_counter()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._open(description)
+
+    def write(self, batch: Sequence[Sequence[Any]]) -> None:
+        self._write(batch)
+        self.rows += len(batch)
+
+    def close(self) -> None:
+        self._close()
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+
+    def abort(self) -> None:
+        try:
+            self._abort()
+        finally:
+            self.path.unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    @abstractmethod
+    def _open(self, description: Description) -> None:
+        """Create the output for a result with columns ``description``."""
+
+    @abstractmethod
+    def _write(self, batch: Sequence[Sequence[Any]]) -> None:
+        """Write one batch of rows."""
+
+    @abstractmethod
+    def _close(self) -> None:
+        """Finish the output; it must be complete once this returns."""
+
+    def _abort(self) -> None:
+        pass
+
+
+_END = object()
+
+
+class TextSink(Sink):
+    """Delimited text output, optionally compressed with gzip or lzma.
+
+    Formatting, compression and disk writes happen on a dedicated thread fed
+    through a bounded queue, so they overlap with fetching from the server
+    while memory stays bounded by ``queue_size`` batches.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        delimiter: str = ",",
+        compression: str | None = None,
+        encoding: str = "utf-8",
+        buffer_size: int = 1 << 20,
+        queue_size: int = 8,
+    ) -> None:
+        if compression not in (None, *COMPRESSION_SUFFIXES):
+            raise ValueError(f"Unsupported compression: {compression}")
+        super().__init__(path)
+        self.delimiter = delimiter
+        self.compression = compression
+        self.encoding = encoding
+        self.buffer_size = buffer_size
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: threading.Thread | None = None
+        self._error: BaseException | None = None
+        self._cancelled = False
+
+    def _open(self, description: Description) -> None:
+        columns = [column[0] for column in description]
+        self._thread = threading.Thread(
+            target=self._run, args=(columns,), name=f"sink-{self.path.name}", daemon=True
+        )
+        self._thread.start()
+
+    def _write(self, batch: Sequence[Sequence[Any]]) -> None:
+        self._raise_error()
+        self._queue.put(batch)
+
+    def _close(self) -> None:
+        self._stop()
+        self._raise_error()
+
+    def _abort(self) -> None:
+        self._cancelled = True
+        self._stop()
+
+    # ------------------------------------------------------------------
+    def _stop(self) -> None:
+        if self._thread is not None:
+            self._queue.put(_END)
+            self._thread.join()
+            self._thread = None
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def _binary(self) -> BinaryIO:
+        if self.compression == "gzip":
+            raw: BinaryIO = gzip.open(self.path, "wb", compresslevel=6)
+        elif self.compression == "lzma":
+            raw = lzma.open(self.path, "wb")
+        else:
+            return open(self.path, "wb", buffering=self.buffer_size)
+        # Compressors work best on large chunks rather than one call per row.
+        return io.BufferedWriter(raw, self.buffer_size)
+
+    def _run(self, columns: List[str]) -> None:
+        batch: Any = None
+        try:
+            with io.TextIOWrapper(self._binary(), encoding=self.encoding, newline="") as fh:
+                writer = csv.writer(fh, delimiter=self.delimiter)
+                writer.writerow(columns)
+                while True:
+                    batch = self._queue.get()
+                    if batch is _END or self._cancelled:
+                        break
+                    writer.writerows(batch)
+        except BaseException as exc:  # noqa: BLE001 - reported on the fetching thread
+            self._error = exc
+        # Keep draining so that a producer blocked on a full queue wakes up.
+        while batch is not _END:
+            batch = self._queue.get()
+
+
+class DigestSink(Sink):
+    """Computes a digest of the column names and rows instead of writing a file.
+
+    Two runs that return the same rows in the same order produce the same
+    :attr:`digest`, which tells dependent jobs whether their input changed.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(Path())
+        self.digest: str | None = None
+
+    def open(self, description: Description) -> None:
+        self._started = time.perf_counter()
+        self._open(description)
+
+    def abort(self) -> None:
+        self._abort()
+
+    def _open(self, description: Description) -> None:
+        self._hash = hashlib.blake2b(digest_size=16)
+        self._hash.update(repr([column[0] for column in description]).encode("utf-8"))
+
+    def _write(self, batch: Sequence[Sequence[Any]]) -> None:
+        self._hash.update(repr(batch).encode("utf-8"))
+
+    def _close(self) -> None:
+        self.digest = self._hash.hexdigest()
+
+
+def _hex(value: Any) -> Any:
+    return None if value is None else "0x" + bytes(value).hex().upper()
+
+
+def _text(value: Any) -> Any:
+    return None if value is None else str(value)
+
+
+def _naive(value: Any) -> Any:
+    # Excel has no time zones; keep the wall-clock time.
+    if value is not None and value.tzinfo is not None:
+        return value.replace(tzinfo=None)
+    return value
+
+
+def _column_converters(description: Description, sheet: Any) -> List[Converter]:
+    """Pick one converter per column from the cursor description.
+
+    ``None`` means the driver value is written as is. Types are decided once
+    per column, not per cell, so the hot loop does no type dispatch.
+    """
+
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE, WriteOnlyCell
+
+    def string(value: Any) -> Any:
+        if value is None:
+            return None
+        value = ILLEGAL_CHARACTERS_RE.sub("", value)
+        if value.startswith("="):
+            # openpyxl would store the text as a formula.
+            cell = WriteOnlyCell(sheet, value)
+            cell.data_type = "s"
+            return cell
+        return value
+
+    def generic(value: Any) -> Any:
+        if isinstance(value, str):
+            return string(value)
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return _hex(value)
+        if isinstance(value, (dt.datetime, dt.time)):
+            return _naive(value)
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        return value
+
+    by_type: Dict[Any, Converter] = {
+        str: string,
+        bytes: _hex,
+        bytearray: _hex,
+        uuid.UUID: _text,
+        dt.datetime: _naive,
+        dt.time: _naive,
+        int: None,
+        float: None,
+        bool: None,
+        dt.date: None,
+        Decimal: None,
+    }
+    converters: List[Converter] = []
+    for column in description:
+        type_code = column[1] if len(column) > 1 else None
+        converters.append(by_type.get(type_code, generic))
+    return converters
+
+
+class XlsxSink(Sink):
+    """XLSX output through an openpyxl write-only workbook.
+
+    Write-only sheets are streamed to temporary files as rows are appended,
+    so memory use does not depend on the size of the result. When a sheet
+    reaches ``sheet_rows`` (Excel's limit by default) the output continues
+    on a new sheet with the same header.
+    """
+
+    def __init__(self, path: Path, *, sheet_rows: int = EXCEL_MAX_ROWS, title: str = "Data") -> None:
+        super().__init__(path)
+        self.per_sheet = max(1, sheet_rows - 1)
+        self.title = title
+
+    def _open(self, description: Description) -> None:
+        from openpyxl import Workbook  # loaded on first use: slow to import
+
+        self._description = description
+        self._columns = [column[0] for column in description]
+        self._workbook = Workbook(write_only=True)
+        self._sheets = 0
+        self._new_sheet()
+
+    def _new_sheet(self) -> None:
+        self._sheets += 1
+        number = self._sheets
+        self._sheet = self._workbook.create_sheet(
+            self.title if number == 1 else f"{self.title} ({number})"
+        )
+        self._sheet.append(self._columns)
+        converters = _column_converters(self._description, self._sheet)
+        self._convert = [(i, fn) for i, fn in enumerate(converters) if fn is not None]
+        self._in_sheet = 0
+
+    def _write(self, batch: Sequence[Sequence[Any]]) -> None:
+        for row in batch:
+            if self._in_sheet == self.per_sheet:
+                self._new_sheet()
+            if self._convert:
+                row = list(row)
+                for i, fn in self._convert:
+                    row[i] = fn(row[i])
+            self._sheet.append(row)
+            self._in_sheet += 1
+
+    def _close(self) -> None:
+        self._workbook.save(self.path)
+
+    def _abort(self) -> None:
+        # Write-only sheets keep their rows in temporary files that openpyxl
+        # removes only on save or at interpreter exit.
+        for sheet in self._workbook.worksheets:
+            if not sheet.closed:
+                sheet.close()
+            sheet._writer.cleanup()
+        self._workbook = None
+
+
+def open_sink(path: Path, **options: Any) -> Sink:
+    """Create a sink for ``path`` chosen by its suffix.
+
+    ``.csv`` and ``.tsv`` may be followed by ``.gz`` or ``.xz`` to compress
+    the output; ``.xlsx`` produces a workbook.
+    """
+
+    suffixes = [suffix.lower() for suffix in path.suffixes]
+    compression = None
+    for method, suffix in COMPRESSION_SUFFIXES.items():
+        if suffixes and suffixes[-1] == suffix:
+            compression = method
+            suffixes.pop()
+    fmt = suffixes[-1].lstrip(".") if suffixes else ""
+    if fmt == "xlsx" and compression is None:
+        return XlsxSink(path, **options)
+    if fmt in ("csv", "tsv"):
+        delimiter = "\t" if fmt == "tsv" else ","
+        return TextSink(path, delimiter=delimiter, compression=compression, **options)
+    raise ValueError(f"Unsupported export file: {path.name}")
+
+
+def tee(cursor: Any, sinks: Sequence[Sink], *, fetch_size: int = FETCH_SIZE) -> int:
+    """Stream the result set of an executed ``cursor`` into every sink.
+
+    The query is fetched once, in batches of ``fetch_size``, and each batch
+    goes to all ``sinks``. If anything fails, every sink that is not closed
+    yet is aborted so no partial files are left behind; sinks that already
+    closed keep their complete output. Returns the number of data rows.
+    """
+
+    description = cursor.description or ()
+    opened: List[Sink] = []
+    rows = 0
+    try:
+        for sink in sinks:
+            sink.open(description)
+            opened.append(sink)
+        while True:
+            batch = cursor.fetchmany(fetch_size)
+            if not batch:
+                break
+            for sink in sinks:
+                sink.write(batch)
+            rows += len(batch)
+        for sink in sinks:
+            sink.close()
+            opened.remove(sink)
+    except BaseException:
+        for sink in opened:
+            sink.abort()
+        raise
+    return rows
+
+
+def write_csv(cursor: Any, path: Path, *, fetch_size: int = FETCH_SIZE, delimiter: str = ",") -> int:
+    """Stream the result set of an executed ``cursor`` into a CSV file.
+
+    Rows are fetched in batches of ``fetch_size``, so memory use does not
+    depend on the size of the result. Returns the number of data rows.
+    """
+
+    return tee(cursor, [TextSink(path, delimiter=delimiter)], fetch_size=fetch_size)
+
+
+def write_xlsx(
+    cursor: Any,
+    path: Path,
+    *,
+    fetch_size: int = FETCH_SIZE,
+    sheet_rows: int = EXCEL_MAX_ROWS,
+    title: str = "Data",
+) -> int:
+    """Stream the result set of an executed ``cursor`` into an XLSX workbook.
+
+    See :class:`XlsxSink`. Returns the number of data rows.
+    """
+
+    return tee(cursor, [XlsxSink(path, sheet_rows=sheet_rows, title=title)], fetch_size=fetch_size)
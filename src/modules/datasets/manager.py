@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from pydantic import BaseModel
+
+try:
+    from core.storage import get_connection
+except ImportError:  # pragma: no cover - fallback when running from source
+    from ...core.storage import get_connection
+
+from .dag import topological_order
+from .result_cache import derived_table
+
+
+class Dataset(BaseModel):
+    """A named query bound to a connection profile."""
+
+    id: int | None = None
+    name: str
+    query: str
+    connection_id: int | None = None
+    #: Seconds a cached result stays valid; ``None`` disables caching.
+    cache_ttl: int | None = None
+    #: Unique column that only grows on insert (an identity primary key);
+    #: when set, refreshes append only rows above the last value seen. It
+    #: must be the primary key in the cached schema. Updated rows are not
+    #: re-fetched.
+    watermark_column: str | None = None
+    #: With ``partitions`` > 1, full fetches are split into that many ranges
+    #: of a key column fetched on parallel connections. The key must lead the
+    #: primary key or an index in the cached schema; when unset it is picked
+    #: from there.
+    partition_column: str | None = None
+    partitions: int | None = None
+    #: Skip scheduled runs while the query and the fingerprints of all
+    #: dependencies are unchanged. Only for datasets that read nothing but
+    #: what their dependencies load: changes to other sources go unnoticed.
+    skip_unchanged: bool = False
+
+
+class ExportRecord(BaseModel):
+    """A row of the ``exports`` table."""
+
+    id: int | None = None
+    dataset_id: int | None
+    path: str
+    created_at: str
+    rows: int | None = None
+    duration_ms: float | None = None
+
+
+class RunRecord(BaseModel):
+    """A row of the ``dataset_runs`` table: one dataset in a scheduled run."""
+
+    id: int | None = None
+    run_id: str
+    dataset_id: int
+    #: ``done``, ``skipped`` (inputs unchanged), ``failed`` or ``blocked``
+    #: (a dependency failed).
+    status: str
+    started_at: str
+    #: Time spent ready but waiting for a free job, ms.
+    wait_ms: float | None = None
+    duration_ms: float | None = None
+    rows: int | None = None
+    #: Digest of the exported rows, compared by dependent datasets.
+    fingerprint: str | None = None
+    #: Digest of the query and the fingerprints of the dependencies.
+    inputs: str | None = None
+
+
+class DatasetManager:
+    """CRUD operations for datasets and their export history.
+
+    With a ``bus``, edits and deletions are announced as ``dataset:changed``
+    and ``dataset:deleted`` events carrying the dataset id.
+    """
+
+    COLUMNS = (
+        "id, name, query, connection_id, cache_ttl, watermark_column, "
+        "partition_column, partitions, skip_unchanged"
+    )
+    RUN_COLUMNS = (
+        "id, run_id, dataset_id, status, started_at, wait_ms, duration_ms, "
+        "rows, fingerprint, inputs"
+    )
+
+    def __init__(self, conn: sqlite3.Connection | None = None, bus: Any = None) -> None:
+        self.conn = conn or get_connection()
+        self.bus = bus
+
+    # ------------------------------------------------------------------
+    # Datasets
+    # ------------------------------------------------------------------
+    def create(self, dataset: Dataset) -> Dataset:
+        self._check(dataset)
+        cur = self.conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO datasets (
+                name, query, connection_id, cache_ttl, watermark_column,
+                partition_column, partitions, skip_unchanged
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                dataset.name,
+                dataset.query,
+                dataset.connection_id,
+                dataset.cache_ttl,
+                dataset.watermark_column,
+                dataset.partition_column,
+                dataset.partitions,
+                int(dataset.skip_unchanged),
+            ),
+        )
+        dataset.id = cur.lastrowid
+        self.conn.commit()
+        return dataset
+
+    def update(self, dataset: Dataset) -> None:
+        if dataset.id is None:
+            raise ValueError("dataset id required for update")
+        self._check(dataset)
+        self.conn.execute(
+            """
+            UPDATE datasets
+            SET name=?, query=?, connection_id=?, cache_ttl=?, watermark_column=?,
+                partition_column=?, partitions=?, skip_unchanged=?
+            WHERE id=?
+            """,
+            (
+                dataset.name,
+                dataset.query,
+                dataset.connection_id,
+                dataset.cache_ttl,
+                dataset.watermark_column,
+                dataset.partition_column,
+                dataset.partitions,
+                int(dataset.skip_unchanged),
+                dataset.id,
+            ),
+        )
+        self.conn.commit()
+        self._emit("dataset:changed", dataset.id)
+
+    def list(self) -> List[Dataset]:
+        cur = self.conn.cursor()
+        cur.execute(f"SELECT {self.COLUMNS} FROM datasets ORDER BY id")
+        return [self._dataset(row) for row in cur.fetchall()]
+
+    def get(self, dataset_id: int) -> Optional[Dataset]:
+        cur = self.conn.cursor()
+        cur.execute(f"SELECT {self.COLUMNS} FROM datasets WHERE id=?", (dataset_id,))
+        row = cur.fetchone()
+        return self._dataset(row) if row else None
+
+    def find(self, ref: str) -> Optional[Dataset]:
+        """Return the dataset with id or name ``ref``."""
+
+        if ref.isdigit():
+            dataset = self.get(int(ref))
+            if dataset is not None:
+                return dataset
+        cur = self.conn.cursor()
+        cur.execute(f"SELECT {self.COLUMNS} FROM datasets WHERE name=? ORDER BY id", (ref,))
+        row = cur.fetchone()
+        return self._dataset(row) if row else None
+
+    def delete(self, dataset_id: int) -> None:
+        self.conn.execute("DELETE FROM datasets WHERE id=?", (dataset_id,))
+        self.conn.execute(
+            "DELETE FROM dataset_dependencies WHERE dataset_id=? OR depends_on=?",
+            (dataset_id, dataset_id),
+        )
+        self.conn.commit()
+        self._emit("dataset:deleted", dataset_id)
+
+    # ------------------------------------------------------------------
+    # Dependencies
+    # ------------------------------------------------------------------
+    def dependencies(self) -> Dict[int, List[int]]:
+        """Map each dataset id to the ids of the datasets it depends on."""
+
+        graph: Dict[int, List[int]] = {}
+        cur = self.conn.cursor()
+        cur.execute(
+            "SELECT dataset_id, depends_on FROM dataset_dependencies ORDER BY dataset_id, depends_on"
+        )
+        for dataset_id, depends_on in cur.fetchall():
+            graph.setdefault(dataset_id, []).append(depends_on)
+        return graph
+
+    def set_dependencies(self, dataset_id: int, depends_on: Iterable[int]) -> None:
+        """Replace the dependencies of a dataset.
+
+        Raises :class:`~.dag.CycleError` if the new edges would close a cycle.
+        """
+
+        ids = sorted(set(depends_on))
+        graph = self.dependencies()
+        graph[dataset_id] = ids
+        topological_order(graph)
+        self.conn.execute("DELETE FROM dataset_dependencies WHERE dataset_id=?", (dataset_id,))
+        self.conn.executemany(
+            "INSERT INTO dataset_dependencies (dataset_id, depends_on) VALUES (?, ?)",
+            [(dataset_id, dep) for dep in ids],
+        )
+        self.conn.commit()
+        self._emit("dataset:changed", dataset_id)
+
+    # ------------------------------------------------------------------
+    # Scheduled runs
+    # ------------------------------------------------------------------
+    def record_run(self, record: RunRecord) -> RunRecord:
+        cur = self.conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO dataset_runs (
+                run_id, dataset_id, status, started_at, wait_ms, duration_ms,
+                rows, fingerprint, inputs
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                record.run_id,
+                record.dataset_id,
+                record.status,
+                record.started_at,
+                record.wait_ms,
+                record.duration_ms,
+                record.rows,
+                record.fingerprint,
+                record.inputs,
+            ),
+        )
+        record.id = cur.lastrowid
+        self.conn.commit()
+        return record
+
+    def runs(self, dataset_id: int | None = None) -> List[RunRecord]:
+        query = f"SELECT {self.RUN_COLUMNS} FROM dataset_runs"
+        cur = self.conn.cursor()
+        if dataset_id is None:
+            cur.execute(query + " ORDER BY id")
+        else:
+            cur.execute(query + " WHERE dataset_id=? ORDER BY id", (dataset_id,))
+        return [self._run(row) for row in cur.fetchall()]
+
+    def last_runs(self) -> Dict[int, RunRecord]:
+        """Latest successful (``done`` or ``skipped``) run of every dataset."""
+
+        cur = self.conn.cursor()
+        cur.execute(
+            f"""
+            SELECT {self.RUN_COLUMNS} FROM dataset_runs WHERE id IN (
+                SELECT MAX(id) FROM dataset_runs
+                WHERE status IN ('done', 'skipped') GROUP BY dataset_id
+            )
+            """
+        )
+        return {record.dataset_id: record for record in map(self._run, cur.fetchall())}
+
+    # ------------------------------------------------------------------
+    # Exports
+    # ------------------------------------------------------------------
+    def record_export(
+        self,
+        dataset_id: int | None,
+        path: str,
+        *,
+        rows: int | None = None,
+        duration_ms: float | None = None,
+    ) -> ExportRecord:
+        record = ExportRecord(
+            dataset_id=dataset_id,
+            path=path,
+            created_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            rows=rows,
+            duration_ms=duration_ms,
+        )
+        cur = self.conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO exports (dataset_id, path, created_at, rows, duration_ms)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (record.dataset_id, record.path, record.created_at, record.rows, record.duration_ms),
+        )
+        record.id = cur.lastrowid
+        self.conn.commit()
+        return record
+
+    def exports(self, dataset_id: int | None = None) -> List[ExportRecord]:
+        cur = self.conn.cursor()
+        query = "SELECT id, dataset_id, path, created_at, rows, duration_ms FROM exports"
+        if dataset_id is None:
+            cur.execute(query + " ORDER BY id")
+        else:
+            cur.execute(query + " WHERE dataset_id=? ORDER BY id", (dataset_id,))
+        return [
+            ExportRecord(
+                id=eid, dataset_id=did, path=path, created_at=created, rows=rows, duration_ms=ms
+            )
+            for eid, did, path, created, rows, ms in cur.fetchall()
+        ]
+
+    @staticmethod
+    def _check(dataset: Dataset) -> None:
+        # Incremental and partitioned fetches wrap the query in a derived table.
+        if dataset.watermark_column or (dataset.partitions or 1) > 1:
+            try:
+                derived_table(dataset.query)
+            except ValueError as exc:
+                raise ValueError(f"dataset {dataset.name!r}: {exc}") from exc
+
+    def _emit(self, event: str, dataset_id: int) -> None:
+        if self.bus is not None:
+            self.bus.emit(event, dataset_id)
+
+    @staticmethod
+    def _run(row) -> RunRecord:
+        return RunRecord(**dict(zip(DatasetManager.RUN_COLUMNS.split(", "), row)))
+
+    @staticmethod
+    def _dataset(row) -> Dataset:
+        (
+            did,
+            name,
+            query,
+            connection_id,
+            cache_ttl,
+            watermark_column,
+            partition_column,
+            partitions,
+            skip_unchanged,
+        ) = row
+        return Dataset(
+            id=did,
+            name=name,
+            query=query,
+            connection_id=connection_id,
+            cache_ttl=cache_ttl,
+            watermark_column=watermark_column,
+            partition_column=partition_column,
+            partitions=partitions,
+            skip_unchanged=bool(skip_unchanged),
+        )
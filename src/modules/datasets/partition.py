@@ -0,0 +1,380 @@
+"""Parallel extraction of one query split into key ranges.
+
+A single cursor is limited to one connection and one core on the client.
+:func:`fetch_partitioned` splits a query into ``parts`` ranges of an indexed
+key column, fetches the ranges concurrently on separate connections and
+merges them into one cursor-like object that :func:`~.export.tee` can
+stream into any sinks.
+
+The ranges are of equal width between ``MIN`` and ``MAX`` of the key, which
+the server reads from the ends of the key's index instead of scanning the
+result. Row counts per range are balanced only as far as the key values are
+evenly spread (identities, timestamps). Statistics histograms would balance
+skewed keys better, but they describe base tables, not the result of an
+arbitrary dataset query.
+
+With ``ordered=True`` the rows come out in key order: ranges are disjoint
+and sorted, so the parts are concatenated in range order. Parts that are
+not being consumed yet keep a few batches in memory and spill the rest to
+a temporary file, so the servers are never paused by a slow consumer.
+With ``ordered=False`` batches are passed on as they arrive.
+"""
+
+from __future__ import annotations
+
+import pickle
+import re
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import IO, Any, Callable, ContextManager, Deque, List, Optional, Sequence, Tuple
+
+from .export import FETCH_SIZE, Description
+from .result_cache import derived_table, quote_name
+
+#: Batches a part keeps in memory before spilling to disk (ordered mode) or
+#: batches waiting for the consumer in total (unordered mode).
+MEMORY_BATCHES = 8
+
+BOUNDS_QUERY = "SELECT MIN(src.{column}), MAX(src.{column}) FROM ({query}) AS src"
+
+_NAME = r"(?:\[(?:[^\]]|\]\])+\]|[\w@#$]+)"
+_TABLE = re.compile(rf"\b(?:from|join)\s+({_NAME}(?:\s*\.\s*{_NAME})*)", re.IGNORECASE)
+
+
+def referenced_tables(sql: str) -> List[Tuple[Optional[str], str]]:
+    """``(schema, table)`` of the tables after ``FROM`` and ``JOIN`` in ``sql``.
+
+    ``schema`` is ``None`` when the name is not qualified.
+    """
+
+    tables: List[Tuple[Optional[str], str]] = []
+    for match in _TABLE.finditer(derived_table(sql)):
+        parts = [
+            part[1:-1].replace("]]", "]") if part.startswith("[") else part
+            for part in re.findall(_NAME, match.group(1))
+        ]
+        table = (parts[-2] if len(parts) > 1 else None, parts[-1])
+        if table not in tables:
+            tables.append(table)
+    return tables
+
+
+def split_range(low: Any, high: Any, parts: int) -> List[Any]:
+    """Upper bounds of the first ``parts - 1`` equal-width ranges of ``[low, high]``.
+
+    Works for numbers, dates and datetimes; bounds that coincide (a narrow
+    integer range) are merged, so fewer ranges may come back. Returns an
+    empty list for other types or an empty or single-valued range.
+    """
+
+    if parts < 2 or low is None or high is None:
+        return []
+    try:
+        if not low < high:
+            return []
+        width = high - low
+        if isinstance(width, int):
+            steps = [low + width * i // parts for i in range(1, parts)]
+        else:
+            steps = [low + width * i / parts for i in range(1, parts)]
+    except TypeError:
+        return []
+    bounds: List[Any] = []
+    for bound in steps:
+        if (not bounds or bound > bounds[-1]) and bound < high:
+            bounds.append(bound)
+    return bounds
+
+
+def partition_bounds(cursor: Any, sql: str, column: str, parts: int) -> List[Any]:
+    """Upper bounds of the first ``parts - 1`` ranges of ``column``.
+
+    One ``MIN``/``MAX`` query; see :func:`split_range`.
+    """
+
+    if parts < 2:
+        return []
+    cursor.execute(BOUNDS_QUERY.format(column=quote_name(column), query=derived_table(sql)))
+    row = cursor.fetchone()
+    return split_range(row[0], row[1], parts) if row else []
+
+
+def range_queries(
+    sql: str, column: str, bounds: Sequence[Any], *, ordered: bool = True
+) -> List[Tuple[str, Tuple[Any, ...]]]:
+    """One ``(query, params)`` per range; NULL keys go to the first range."""
+
+    quoted = f"src.{quote_name(column)}"
+    base = f"SELECT * FROM ({derived_table(sql)}) AS src"
+    order = f" ORDER BY {quoted}" if ordered else ""
+    if not bounds:
+        return [(base + order, ())]
+    queries = [(f"{base} WHERE ({quoted} <= ? OR {quoted} IS NULL){order}", (bounds[0],))]
+    for low, high in zip(bounds, bounds[1:]):
+        queries.append((f"{base} WHERE {quoted} > ? AND {quoted} <= ?{order}", (low, high)))
+    queries.append((f"{base} WHERE {quoted} > ?{order}", (bounds[-1],)))
+    return queries
+
+
+class _Spool:
+    """FIFO of batches: the first ``limit`` in memory, the rest in a temporary file.
+
+    The in-memory part and the counters belong to the cursor's condition;
+    the file has its own lock, so :meth:`write` and :meth:`read` run outside
+    the condition and do not stall the other partitions. Each spool has one
+    writer (its partition) and one reader (the consumer).
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.done = False
+        self._memory: Deque[Any] = deque()
+        self._file: Optional[IO[bytes]] = None
+        self._io = threading.Lock()
+        self._written = 0
+        self._read = 0
+        self._position = 0
+
+    def __bool__(self) -> bool:
+        return bool(self._memory) or self._read < self._written
+
+    def needs_spill(self) -> bool:
+        # Once spilling started, later batches must follow the earlier ones.
+        return self._written > 0 or len(self._memory) >= self.limit
+
+    def put(self, batch: Any) -> None:
+        self._memory.append(batch)
+
+    def write(self, data: bytes) -> None:
+        """Append a pickled batch to the file; publish it with :meth:`wrote`."""
+
+        with self._io:
+            if self._file is None:
+                self._file = tempfile.TemporaryFile(prefix="part-")
+            self._file.seek(0, 2)
+            self._file.write(len(data).to_bytes(8, "little"))
+            self._file.write(data)
+
+    def wrote(self) -> None:
+        self._written += 1
+
+    def take(self) -> Tuple[Any, bool]:
+        """Next batch from memory, or ``(None, True)`` to :meth:`read` one from the file."""
+
+        if self._memory:
+            return self._memory.popleft(), False
+        self._read += 1
+        return None, True
+
+    def read(self) -> bytes:
+        with self._io:
+            assert self._file is not None
+            self._file.seek(self._position)
+            size = int.from_bytes(self._file.read(8), "little")
+            data = self._file.read(size)
+            self._position += 8 + size
+        return data
+
+    def close(self) -> None:
+        self._memory.clear()
+        with self._io:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class PartitionedCursor:
+    """Cursor-like merge of range queries fetched on parallel connections.
+
+    Provides ``description``, ``fetchmany`` and ``close``. ``slot`` is
+    entered around each connection, e.g. a :class:`ServerSlots` reservation
+    that caps the connections per server.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        queries: Sequence[Tuple[str, Sequence[Any]]],
+        *,
+        ordered: bool = True,
+        fetch_size: int = FETCH_SIZE,
+        timeout: int | None = None,
+        slot: Callable[[], ContextManager[Any]] = nullcontext,
+        memory_batches: int = MEMORY_BATCHES,
+    ) -> None:
+        self.ordered = ordered
+        self.fetch_size = fetch_size
+        self.timeout = timeout
+        self.parts = len(queries)
+        self._connect = connect
+        self._slot = slot
+        self._cond = threading.Condition()
+        self._description: Optional[Description] = None
+        self._error: Optional[BaseException] = None
+        self._cancelled = False
+        self._running = self.parts
+        self._memory_batches = memory_batches
+        self._spools = [_Spool(memory_batches) for _ in queries] if ordered else []
+        self._ready: Deque[Any] = deque()
+        self._current = 0
+        self._pool = ThreadPoolExecutor(max_workers=max(1, self.parts), thread_name_prefix="partition")
+        for index, (sql, params) in enumerate(queries):
+            self._pool.submit(self._run, index, sql, tuple(params))
+
+    # ------------------------------------------------------------------
+    # Cursor interface
+    # ------------------------------------------------------------------
+    @property
+    def description(self) -> Optional[Description]:
+        with self._cond:
+            while self._description is None and self._error is None and self._running:
+                self._cond.wait()
+            self._raise_error()
+            return self._description
+
+    def fetchmany(self, size: int = FETCH_SIZE) -> List[Any]:
+        """Return the next batch; its size is the ``fetch_size`` of the parts."""
+
+        return self._next_ordered() if self.ordered else self._next_unordered()
+
+    def close(self) -> None:
+        with self._cond:
+            self._cancelled = True
+            self._cond.notify_all()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        for spool in self._spools:
+            spool.close()
+        self._ready.clear()
+
+    # ------------------------------------------------------------------
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def _next_ordered(self) -> List[Any]:
+        with self._cond:
+            while self._current < self.parts:
+                spool = self._spools[self._current]
+                if spool:
+                    batch, spilled = spool.take()
+                    self._cond.notify_all()
+                    break
+                self._raise_error()
+                if spool.done:
+                    spool.close()
+                    self._current += 1
+                    continue
+                self._cond.wait()
+            else:
+                self._raise_error()
+                return []
+        return pickle.loads(spool.read()) if spilled else batch
+
+    def _next_unordered(self) -> List[Any]:
+        with self._cond:
+            while not self._ready:
+                self._raise_error()
+                if not self._running:
+                    return []
+                self._cond.wait()
+            batch = self._ready.popleft()
+            self._cond.notify_all()
+            return batch
+
+    def _put(self, index: int, batch: Any) -> bool:
+        """Hand a batch to the consumer; ``False`` once the cursor is closed."""
+
+        if not self.ordered:
+            with self._cond:
+                while len(self._ready) >= self._memory_batches and not self._cancelled:
+                    self._cond.wait()
+                if self._cancelled:
+                    return False
+                self._ready.append(batch)
+                self._cond.notify_all()
+            return True
+        spool = self._spools[index]
+        with self._cond:
+            if self._cancelled:
+                return False
+            if not spool.needs_spill():
+                spool.put(batch)
+                self._cond.notify_all()
+                return True
+        # Pickling and file I/O happen outside the shared condition.
+        spool.write(pickle.dumps(batch, protocol=pickle.HIGHEST_PROTOCOL))
+        with self._cond:
+            if self._cancelled:
+                return False
+            spool.wrote()
+            self._cond.notify_all()
+        return True
+
+    def _run(self, index: int, sql: str, params: Tuple[Any, ...]) -> None:
+        try:
+            with self._slot():
+                if self._cancelled:
+                    return
+                connection = self._connect()
+                try:
+                    cursor = connection.cursor()
+                    if self.timeout is not None:
+                        cursor.timeout = self.timeout
+                    cursor.execute(sql, *params)
+                    with self._cond:
+                        if self._description is None:
+                            self._description = cursor.description
+                            self._cond.notify_all()
+                    while not self._cancelled:
+                        batch = cursor.fetchmany(self.fetch_size)
+                        if not batch or not self._put(index, batch):
+                            break
+                finally:
+                    connection.close()
+        except BaseException as exc:  # noqa: BLE001 - re-raised on the consuming thread
+            with self._cond:
+                if self._error is None:
+                    self._error = exc
+                self._cancelled = True
+        finally:
+            with self._cond:
+                self._running -= 1
+                if self.ordered:
+                    self._spools[index].done = True
+                self._cond.notify_all()
+
+
+def fetch_partitioned(
+    connect: Callable[[], Any],
+    sql: str,
+    column: str,
+    parts: int,
+    *,
+    ordered: bool = True,
+    fetch_size: int = FETCH_SIZE,
+    timeout: int | None = None,
+    slot: Callable[[], ContextManager[Any]] = nullcontext,
+) -> PartitionedCursor:
+    """Split ``sql`` into ``parts`` ranges of ``column`` and fetch them in parallel.
+
+    ``connect`` opens a new connection; pyodbc reuses pooled ones. The
+    range bounds are computed first on one connection, then each range runs
+    on its own connection inside ``slot``.
+    """
+
+    with slot():
+        connection = connect()
+        try:
+            cursor = connection.cursor()
+            if timeout is not None:
+                cursor.timeout = timeout
+            bounds = partition_bounds(cursor, sql, column, parts)
+        finally:
+            connection.close()
+    queries = range_queries(sql, column, bounds, ordered=ordered)
+    return PartitionedCursor(
+        connect, queries, ordered=ordered, fetch_size=fetch_size, timeout=timeout, slot=slot
+    )
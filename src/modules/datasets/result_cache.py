@@ -0,0 +1,1115 @@
+"""On-disk columnar cache of query results.
+
+Each result is a directory under ``cache/results/<key>/`` holding one raw
+NumPy array per column, read back with ``numpy.memmap``:
+
+* numbers, booleans, dates and times are stored as fixed-width arrays;
+* decimals with precision up to 18 are stored as scaled ``int64``;
+* strings and binary values are dictionary-encoded (``int32`` codes plus a
+  UTF-8 dictionary); columns whose dictionary grows past
+  ``max_dictionary`` entries switch to plain offsets plus a byte blob;
+* NULLs are kept in a packed bitmap, present only for columns that have
+  NULLs.
+
+Opening a cached result maps the files without reading them, so reopening,
+sorting and re-exporting do not depend on the result size or on the server.
+
+:class:`ResultCache` adds the policy on top: entries older than the
+caller's TTL are misses, the total size is kept under ``max_bytes`` by
+evicting the least recently used entries, and entries can be dropped by
+the profile or dataset they were produced from. Results of append-only
+queries can be extended with new rows (see :class:`ResultCacheSink`) rather
+than fetched again.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import uuid
+from dataclasses import asdict, dataclass
+from decimal import Context, Decimal
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .export import FETCH_SIZE, Description, Sink
+
+try:
+    from ...core.config import BASE_DIR
+    from ...core.container import container
+except ImportError:  # pragma: no cover - ``modules`` imported as a top-level package
+    from core.config import BASE_DIR
+    from core.container import container
+
+#: Default location of cached results.
+DEFAULT_CACHE_DIR = BASE_DIR / "cache" / "results"
+#: Distinct values after which a string column stops being dictionary-encoded.
+MAX_DICTIONARY = 1_000_000
+#: Default size budget of the whole cache.
+MAX_CACHE_BYTES = 2 << 30
+
+META_FILE = "meta.json"
+FORMAT_VERSION = 1
+
+_EPOCH = dt.datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+_MICROSECOND = dt.timedelta(microseconds=1)
+_EXACT = Context(prec=80)
+
+# Column kinds and their storage dtypes.
+_FIXED = {
+    "int": np.int64,
+    "float": np.float64,
+    "bool": np.bool_,
+    "datetime": np.dtype("datetime64[us]"),
+    "date": np.dtype("datetime64[D]"),
+    "time": np.int64,  # microseconds since midnight
+    "decimal": np.int64,  # value * 10**scale
+}
+_TEXT = {"str", "bytes", "decimal_text"}
+# Placeholders stored for NULLs; the null bitmap is authoritative.
+_ZEROS = {
+    "int": 0,
+    "float": 0.0,
+    "bool": False,
+    "datetime": _EPOCH,
+    "date": _EPOCH.date(),
+    "time": dt.time(),
+    "decimal": Decimal(0),
+}
+# Bytes of a blob value compared per pass when ranking; see ``_blob_ranks``.
+_PREFIX = 8
+
+# ORDER BY at the end of a statement, outside parentheses and literals.
+_ORDER_BY = re.compile(r"\border\s+by\s+[^()']*$", re.IGNORECASE)
+# With TOP or OFFSET the ORDER BY is allowed in a derived table and changes
+# the result.
+_TOP = re.compile(r"^select\s+(distinct\s+)?top\b", re.IGNORECASE)
+_OFFSET = re.compile(r"\boffset\b", re.IGNORECASE)
+# Statements that cannot appear inside ``FROM (...)``: CTEs, EXEC and the like.
+_WRAPPABLE = re.compile(r"^\(*\s*select\b", re.IGNORECASE)
+
+_SQL_TOKEN = re.compile(
+    r"""
+    (?P<literal>'(?:[^']|'')*'|"(?:[^"]|"")*"|\[(?:[^\]]|\]\])*\])
+    | (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<space>\s+)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+def normalize_sql(sql: str) -> str:
+    """Strip comments and collapse whitespace outside literals and identifiers."""
+
+    parts: List[str] = []
+    pos = 0
+    for match in _SQL_TOKEN.finditer(sql):
+        if match.start() > pos:
+            parts.append(sql[pos : match.start()])
+        if match.lastgroup == "literal":
+            parts.append(match.group())
+        elif parts and parts[-1] != " ":
+            parts.append(" ")
+        pos = match.end()
+    parts.append(sql[pos:])
+    return "".join(parts).strip().rstrip(";").rstrip()
+
+
+def cache_key(profile_id: Any, sql: str, params: Sequence[Any] = ()) -> str:
+    """Return the cache key for ``sql`` run with ``params`` on a profile."""
+
+    payload = json.dumps([profile_id, normalize_sql(sql), list(params)], default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def derived_table(sql: str) -> str:
+    """Normalized ``sql`` ready to be wrapped as ``SELECT ... FROM (sql) AS src``.
+
+    A trailing ``ORDER BY`` is dropped, since SQL Server does not allow it in
+    a derived table; rows then come in the order of the wrapping query. With
+    ``TOP`` or ``OFFSET ... FETCH`` it selects the rows and is kept. Raises
+    ``ValueError`` for statements that cannot be wrapped, such as a query
+    starting with a CTE (``WITH``).
+    """
+
+    inner = normalize_sql(sql)
+    if not _WRAPPABLE.match(inner):
+        raise ValueError("only a plain SELECT can be wrapped; WITH and other statements cannot")
+    match = _ORDER_BY.search(inner)
+    if match is not None and not _TOP.search(inner) and not _OFFSET.search(match.group()):
+        inner = inner[: match.start()].rstrip()
+    return inner
+
+
+def quote_name(name: str) -> str:
+    """Quote a column name as a SQL Server identifier."""
+
+    return "[" + name.replace("]", "]]") + "]"
+
+
+def watermark_query(sql: str, column: str) -> str:
+    """Wrap ``sql`` to return only rows whose ``column`` is above a parameter.
+
+    The rows come ordered by ``column``; see :func:`derived_table`.
+    """
+
+    quoted = quote_name(column)
+    return (
+        f"SELECT * FROM ({derived_table(sql)}) AS src "
+        f"WHERE src.{quoted} > ? ORDER BY src.{quoted}"
+    )
+
+
+def _dump_value(value: Any) -> Any:
+    """JSON form of a watermark value that keeps its type."""
+
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"bytes": bytes(value).hex()}
+    if isinstance(value, dt.datetime):
+        return {"datetime": value.isoformat()}
+    if isinstance(value, dt.date):
+        return {"date": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"decimal": str(value)}
+    return value
+
+
+def _load_value(data: Any) -> Any:
+    if not isinstance(data, dict):
+        return data
+    ((tag, text),) = data.items()
+    if tag == "bytes":
+        return bytes.fromhex(text)
+    if tag == "datetime":
+        return dt.datetime.fromisoformat(text)
+    if tag == "date":
+        return dt.date.fromisoformat(text)
+    return Decimal(text)
+
+
+def _kind_of_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, Decimal):
+        return "decimal"
+    if isinstance(value, dt.datetime):
+        return "datetime"
+    if isinstance(value, dt.date):
+        return "date"
+    if isinstance(value, dt.time):
+        return "time"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "bytes"
+    return "str"
+
+
+_KIND_BY_TYPE = {
+    bool: "bool",
+    int: "int",
+    float: "float",
+    Decimal: "decimal",
+    dt.datetime: "datetime",
+    dt.date: "date",
+    dt.time: "time",
+    str: "str",
+    bytes: "bytes",
+    bytearray: "bytes",
+    uuid.UUID: "str",
+}
+
+
+class _ColumnWriter:
+    """Appends the values of one column to its files."""
+
+    def __init__(self, directory: Path, index: int, column: Sequence[Any], max_dictionary: int) -> None:
+        self.directory = directory
+        self.index = index
+        self.name = column[0]
+        self.max_dictionary = max_dictionary
+        self.kind: Optional[str] = _KIND_BY_TYPE.get(column[1] if len(column) > 1 else None)
+        precision = column[4] if len(column) > 4 else None
+        self.scale: Optional[int] = column[5] if len(column) > 5 else None
+        if self.kind == "decimal" and not (
+            isinstance(precision, int) and precision <= 18 and isinstance(self.scale, int)
+        ):
+            self.kind = "decimal_text"
+        self.rows = 0
+        self.has_nulls = False
+        self._pending = 0  # leading NULLs written before the kind is known
+        self._values: Optional[BinaryIO] = None
+        self._nulls: BinaryIO = self._file("nulls.raw")
+        self._lookup: Optional[Dict[Any, int]] = None
+        self._blob: Optional[BinaryIO] = None
+        self._blob_size = 0
+        self._configured = False
+        self._aware = False
+        self._plain_str = False
+        # Rows of a resumed column whose null bits are already in the packed
+        # ``.nulls`` file (``_base_packed``) or known to be all non-NULL.
+        self._base_rows = 0
+        self._base_packed = False
+
+    @classmethod
+    def resume(
+        cls, directory: Path, index: int, meta: Dict[str, Any], rows: int, max_dictionary: int
+    ) -> "_ColumnWriter":
+        """Continue a column of a cached result linked by :func:`_link_entry`.
+
+        New values are appended to the value files in place; they are first
+        cut back to ``rows``, dropping what a failed append left behind.
+        Only the null bits of the new rows are buffered.
+        """
+
+        kind = meta["kind"]
+        column = (meta["name"], None, None, None, None, meta.get("scale"))
+        writer = cls(directory, index, column, max_dictionary)
+        writer.kind = None if kind == "null" else kind
+        writer.rows = rows
+        writer.has_nulls = meta["nulls"]
+        base = directory / str(index)
+        if kind == "null":
+            # Values start with the first non-NULL row, so every row is pending.
+            Path(f"{base}.nulls").unlink(missing_ok=True)
+            np.ones(rows, dtype=np.bool_).tofile(writer._nulls)
+            writer._pending = rows
+            return writer
+        writer._base_rows = rows
+        writer._base_packed = meta["nulls"]
+        encoding = meta["encoding"]
+        if encoding == "dictionary":
+            offsets = np.fromfile(f"{base}.dict.offsets", dtype=np.int64)
+            data = Path(f"{base}.dict").read_bytes()
+            entries = [data[offsets[i] : offsets[i + 1]] for i in range(len(offsets) - 1)]
+            if kind != "bytes":
+                entries = [entry.decode("utf-8") for entry in entries]
+            writer._lookup = {entry: code for code, entry in enumerate(entries)}
+            os.unlink(f"{base}.dict")
+            os.unlink(f"{base}.dict.offsets")
+            os.truncate(f"{base}.codes", rows * 4)
+            writer._values = writer._file("codes", "ab")
+        elif encoding == "blob":
+            os.truncate(f"{base}.offsets", (rows + 1) * 8)
+            with open(f"{base}.offsets", "rb") as fh:
+                fh.seek(rows * 8)
+                writer._blob_size = int.from_bytes(fh.read(8), "little", signed=True)
+            os.truncate(f"{base}.blob", writer._blob_size)
+            writer._values = writer._file("offsets", "ab")
+            writer._blob = writer._file("blob", "ab")
+        else:
+            os.truncate(f"{base}.values", rows * np.dtype(_FIXED[kind]).itemsize)
+            writer._values = writer._file("values", "ab")
+            if kind == "decimal":
+                writer._factor = Decimal(10) ** writer.scale
+        return writer
+
+    def _file(self, suffix: str, mode: str = "wb") -> BinaryIO:
+        return open(self.directory / f"{self.index}.{suffix}", mode)
+
+    # ------------------------------------------------------------------
+    def append(self, values: Sequence[Any]) -> None:
+        count = len(values)
+        objects = np.empty(count, dtype=object)
+        objects[:] = values
+        nulls = objects == None  # noqa: E711 - element-wise comparison
+        has_nulls = bool(nulls.any())
+        self.has_nulls = self.has_nulls or has_nulls
+        nulls.tofile(self._nulls)
+
+        if not self._configured:
+            first = next((v for v in values if v is not None), None)
+            if first is None and self._values is None:
+                self._pending += count
+                self.rows += count
+                return
+            if first is not None:
+                self._configure(first)
+        self._write(values, count, has_nulls)
+        self.rows += count
+
+    def _configure(self, first: Any) -> None:
+        if self.kind is None:
+            self.kind = _kind_of_value(first)
+            if self.kind == "decimal":
+                self.kind = "decimal_text"  # the scale is unknown
+        # Conversions are chosen once per column; the per-cell code below
+        # only does arithmetic.
+        self._aware = self.kind in ("datetime", "time") and first.tzinfo is not None
+        self._plain_str = self.kind == "str" and isinstance(first, str)
+        self._configured = True
+        if self._values is None:
+            self._start()
+
+    def _start(self) -> None:
+        if self.kind in _TEXT:
+            self._lookup = {}
+            self._values = self._file("codes")
+        else:
+            if self.kind == "decimal":
+                assert self.scale is not None
+                self._factor = Decimal(10) ** self.scale
+            self._values = self._file("values")
+        if self._pending:
+            self._write([None] * self._pending, self._pending, True)
+
+    def _write(self, values: Sequence[Any], count: int, has_nulls: bool) -> None:
+        kind = self.kind
+        assert self._values is not None
+        if kind in _TEXT:
+            self._write_text(values, count)
+            return
+        if has_nulls or self._aware:
+            values = [self._zero(v) for v in values] if has_nulls else values
+            if self._aware:
+                values = [v.replace(tzinfo=None) for v in values]
+        if kind == "datetime":
+            array = np.fromiter(
+                ((v - _EPOCH) // _MICROSECOND for v in values), dtype=np.int64, count=count
+            )
+        elif kind == "date":
+            array = np.fromiter(
+                (v.toordinal() - _EPOCH_ORDINAL for v in values), dtype=np.int64, count=count
+            )
+        elif kind == "time":
+            array = np.fromiter(
+                (
+                    ((v.hour * 60 + v.minute) * 60 + v.second) * 1_000_000 + v.microsecond
+                    for v in values
+                ),
+                dtype=np.int64,
+                count=count,
+            )
+        elif kind == "decimal":
+            array = np.fromiter(map(self._scaled, values), dtype=np.int64, count=count)
+        else:
+            array = np.fromiter(values, dtype=_FIXED[kind], count=count)
+        array.tofile(self._values)
+
+    def _zero(self, value: Any) -> Any:
+        if value is not None:
+            return value
+        return _ZEROS[self.kind]
+
+    def _scaled(self, value: Decimal) -> int:
+        # Exact multiplication, then make sure no fractional digits were lost.
+        scaled = _EXACT.multiply(value, self._factor)
+        integer = int(scaled)
+        if integer != scaled:
+            raise ValueError(f"Column {self.name!r}: {value} does not fit scale {self.scale}")
+        return integer
+
+    def _encode(self, value: Any) -> Any:
+        if self.kind == "bytes":
+            return bytes(value)
+        return str(value)
+
+    def _write_text(self, values: Sequence[Any], count: int) -> None:
+        if self._lookup is not None:
+            lookup = self._lookup
+            if not self._plain_str:
+                values = [None if v is None else self._encode(v) for v in values]
+            codes = np.fromiter(
+                (0 if v is None else lookup.setdefault(v, len(lookup)) for v in values),
+                dtype=np.int32,
+                count=count,
+            )
+            codes.tofile(self._values)
+            if len(lookup) > self.max_dictionary:
+                self._to_plain()
+            return
+        self._append_plain(values)
+
+    def _to_plain(self) -> None:
+        """Rewrite the codes written so far as offsets into a byte blob."""
+
+        assert self._lookup is not None and self._values is not None
+        entries = list(self._lookup)
+        self._lookup = None
+        self._values.close()
+        codes_path = self.directory / f"{self.index}.codes"
+        codes = np.fromfile(codes_path, dtype=np.int32)
+        nulls = self._null_bits()
+        codes_path.unlink()
+        self._values = self._file("offsets")
+        self._blob = self._file("blob")
+        np.zeros(1, dtype=np.int64).tofile(self._values)
+        for start in range(0, len(codes), FETCH_SIZE):
+            chunk = codes[start : start + FETCH_SIZE]
+            is_null = nulls[start : start + FETCH_SIZE]
+            self._append_plain([None if n else entries[c] for c, n in zip(chunk, is_null)])
+
+    def _append_plain(self, values: Sequence[Any]) -> None:
+        assert self._blob is not None and self._values is not None
+        offsets = np.empty(len(values), dtype=np.int64)
+        for i, value in enumerate(values):
+            if value is not None:
+                data = self._encode(value)
+                if isinstance(data, str):
+                    data = data.encode("utf-8")
+                self._blob.write(data)
+                self._blob_size += len(data)
+            offsets[i] = self._blob_size
+        offsets.tofile(self._values)
+
+    # ------------------------------------------------------------------
+    def _null_bits(self) -> np.ndarray:
+        """Null flags of all rows, including those of a resumed column."""
+
+        self._nulls.flush()
+        new = np.fromfile(self.directory / f"{self.index}.nulls.raw", dtype=np.bool_)
+        if not self._base_rows:
+            return new
+        if self._base_packed:
+            packed = np.fromfile(self.directory / f"{self.index}.nulls", dtype=np.uint8)
+            old = np.unpackbits(packed, count=self._base_rows, bitorder="little").astype(np.bool_)
+        else:
+            old = np.zeros(self._base_rows, dtype=np.bool_)
+        return np.concatenate([old, new])
+
+    def _pack_nulls(self, new: np.ndarray) -> None:
+        path = self.directory / f"{self.index}.nulls"
+        base = self._base_rows
+        if not self._base_packed:
+            path.unlink(missing_ok=True)
+            bits = np.concatenate([np.zeros(base, dtype=np.bool_), new]) if base else new
+            np.packbits(bits, bitorder="little").tofile(path)
+            return
+        # Extend the existing bitmap: only its last, partial byte is rewritten.
+        with open(path, "r+b") as fh:
+            fh.seek(base // 8)
+            if base % 8:
+                last = np.frombuffer(fh.read(1), dtype=np.uint8)
+                head = np.unpackbits(last, count=base % 8, bitorder="little").astype(np.bool_)
+                new = np.concatenate([head, new])
+                fh.seek(base // 8)
+            fh.write(np.packbits(new, bitorder="little").tobytes())
+
+    def finish(self) -> Dict[str, Any]:
+        self._nulls.close()
+        raw = self.directory / f"{self.index}.nulls.raw"
+        if self.has_nulls:
+            self._pack_nulls(np.fromfile(raw, dtype=np.bool_))
+        raw.unlink()
+        if self._values is not None:
+            self._values.close()
+        if self._blob is not None:
+            self._blob.close()
+
+        meta: Dict[str, Any] = {
+            "name": self.name,
+            "kind": self.kind if self._values is not None else "null",
+            "nulls": self.has_nulls,
+            "encoding": "plain",
+        }
+        if self.kind in ("decimal",):
+            meta["scale"] = self.scale
+        if self._lookup is not None:
+            meta["encoding"] = "dictionary"
+            meta["dictionary"] = len(self._lookup)
+            self._write_dictionary(list(self._lookup))
+        elif self.kind in _TEXT:
+            meta["encoding"] = "blob"
+        return meta
+
+    def _write_dictionary(self, entries: List[Any]) -> None:
+        offsets = np.zeros(len(entries) + 1, dtype=np.int64)
+        with self._file("dict") as fh:
+            size = 0
+            for i, entry in enumerate(entries):
+                data = entry.encode("utf-8") if isinstance(entry, str) else entry
+                fh.write(data)
+                size += len(data)
+                offsets[i + 1] = size
+        offsets.tofile(self.directory / f"{self.index}.dict.offsets")
+
+    def close(self) -> None:
+        for fh in (self._values, self._nulls, self._blob):
+            if fh is not None:
+                fh.close()
+
+
+#: Column files that are only appended to and can be shared with a new version.
+_APPENDABLE = {"codes", "values", "offsets", "blob", "nulls"}
+
+
+def _link_entry(source: Path, target: Path) -> None:
+    """Fill ``target`` with the column files of the cache entry ``source``.
+
+    Appendable files are hard links (copies where the file system has none),
+    files that are rewritten on finish are copies.
+    """
+
+    for item in source.iterdir():
+        if item.name == META_FILE:
+            continue
+        if item.name.split(".", 1)[1] in _APPENDABLE:
+            try:
+                os.link(item, target / item.name)
+                continue
+            except OSError:
+                pass
+        shutil.copyfile(item, target / item.name)
+
+
+class ResultCacheSink(Sink):
+    """Writes a result into the cache while it is being fetched.
+
+    Data goes to a temporary directory that replaces the cached entry only
+    when the result is complete, so readers never see partial results.
+
+    With ``append`` the rows are added to the existing entry instead. Its
+    value files are hard-linked into the temporary directory and appended to
+    in place; readers of the entry map only the rows in its ``meta.json``,
+    so they do not see the new rows, and a failed append leaves the entry
+    as it was. Only the small dictionary files are copied, so a refresh
+    costs about as much as the rows it adds. With ``watermark`` the largest non-NULL
+    value of that column is stored in the metadata (see
+    :attr:`CachedResult.watermark`).
+    """
+
+    def __init__(
+        self,
+        cache: "ResultCache",
+        key: str,
+        info: Optional[Dict[str, Any]] = None,
+        *,
+        append: bool = False,
+        watermark: str | None = None,
+    ) -> None:
+        super().__init__(cache.root / f".{key}")
+        self.cache = cache
+        self.key = key
+        self.info = dict(info or {})
+        self.append = append
+        self.watermark_column = watermark
+        self.watermark: Any = None
+        self._watermark_index: Optional[int] = None
+        self._base: Dict[str, Any] = {}
+        self._columns: List[_ColumnWriter] = []
+        self._committed = False
+
+    def _open(self, description: Description) -> None:
+        self.path = Path(tempfile.mkdtemp(prefix=f".{self.key}-", dir=self.cache.root))
+        names = [column[0] for column in description]
+        if self.watermark_column is not None:
+            if self.watermark_column not in names:
+                raise ValueError(f"Watermark column {self.watermark_column!r} is not in the result")
+            self._watermark_index = names.index(self.watermark_column)
+        if not self.append:
+            self._columns = [
+                _ColumnWriter(self.path, i, column, self.cache.max_dictionary)
+                for i, column in enumerate(description)
+            ]
+            return
+        source = self.cache.path(self.key)
+        meta = json.loads((source / META_FILE).read_text(encoding="utf-8"))
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Cached result {self.key} has an old format")
+        if [column["name"] for column in meta["columns"]] != names:
+            raise ValueError(f"Columns of cached result {self.key} do not match the query")
+        _link_entry(source, self.path)
+        self._base = meta
+        if self.watermark_column is not None and meta.get("watermark", {}).get("column") == (
+            self.watermark_column
+        ):
+            self.watermark = _load_value(meta["watermark"]["value"])
+        self._columns = [
+            _ColumnWriter.resume(self.path, i, column, meta["rows"], self.cache.max_dictionary)
+            for i, column in enumerate(meta["columns"])
+        ]
+
+    def _write(self, batch: Sequence[Sequence[Any]]) -> None:
+        for writer, values in zip(self._columns, zip(*batch)):
+            writer.append(values)
+        index = self._watermark_index
+        if index is not None:
+            values = [row[index] for row in batch if row[index] is not None]
+            if values:
+                top = max(values)
+                if self.watermark is None or top > self.watermark:
+                    self.watermark = top
+
+    def _close(self) -> None:
+        base = {k: v for k, v in self._base.items() if k not in ("columns", "size")}
+        meta = {
+            **base,
+            "version": FORMAT_VERSION,
+            "key": self.key,
+            "rows": base.get("rows", 0) + self.rows,
+            "created_at": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+            "columns": [writer.finish() for writer in self._columns],
+            **self.info,
+        }
+        if self.watermark_column is not None:
+            meta["watermark"] = {
+                "column": self.watermark_column,
+                "value": _dump_value(self.watermark),
+            }
+        meta["size"] = sum(f.stat().st_size for f in self.path.iterdir())
+        (self.path / META_FILE).write_text(json.dumps(meta, default=str), encoding="utf-8")
+        target = self.cache.path(self.key)
+        # The old entry is renamed aside rather than deleted first, so a
+        # failed replace restores it instead of losing the cached result.
+        retired = Path(f"{self.path}-old")
+        with self.cache._lock:
+            if target.exists():
+                os.replace(target, retired)
+            try:
+                os.replace(self.path, target)
+            except OSError:
+                if retired.exists():
+                    os.replace(retired, target)
+                raise
+            self.cache.stats.stores += 1
+            self._committed = True
+        self.path = target
+        shutil.rmtree(retired, ignore_errors=True)
+        self.cache.evict(keep=self.key)
+
+    def abort(self) -> None:
+        # Once committed, ``path`` is the live entry and must not be removed,
+        # e.g. when eviction after the commit fails.
+        if not self._committed:
+            super().abort()
+
+    def _abort(self) -> None:
+        for writer in self._columns:
+            writer.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def _map(path: Path, dtype: Any, count: int) -> np.ndarray:
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+class CachedColumn:
+    """Read-only view of one cached column."""
+
+    def __init__(self, directory: Path, index: int, meta: Dict[str, Any], rows: int) -> None:
+        self.name: str = meta["name"]
+        self.kind: str = meta["kind"]
+        self.encoding: str = meta["encoding"]
+        self.scale: int = meta.get("scale") or 0
+        self.rows = rows
+        base = directory / str(index)
+        self._nullmap = (
+            _map(Path(f"{base}.nulls"), np.uint8, (rows + 7) // 8) if meta["nulls"] else None
+        )
+        self.values: Optional[np.ndarray] = None
+        self._dictionary: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._blob: Optional[np.ndarray] = None
+        if self.encoding == "dictionary":
+            self.values = _map(Path(f"{base}.codes"), np.int32, rows)
+            offsets = _map(Path(f"{base}.dict.offsets"), np.int64, meta["dictionary"] + 1)
+            self._dictionary = (offsets, _map(Path(f"{base}.dict"), np.uint8, int(offsets[-1])))
+        elif self.encoding == "blob":
+            self.values = _map(Path(f"{base}.offsets"), np.int64, rows + 1)
+            self._blob = _map(Path(f"{base}.blob"), np.uint8, int(self.values[-1]))
+        elif self.kind != "null":
+            self.values = _map(Path(f"{base}.values"), _FIXED[self.kind], rows)
+
+    def is_null(self, row: int) -> bool:
+        if self.kind == "null":
+            return True
+        if self._nullmap is None:
+            return False
+        return bool((self._nullmap[row >> 3] >> (row & 7)) & 1)
+
+    def nulls(self) -> np.ndarray:
+        """Boolean array, ``True`` where the value is NULL."""
+
+        if self.kind == "null":
+            return np.ones(self.rows, dtype=np.bool_)
+        if self._nullmap is None:
+            return np.zeros(self.rows, dtype=np.bool_)
+        return np.unpackbits(self._nullmap, count=self.rows, bitorder="little").astype(np.bool_)
+
+    def value(self, row: int) -> Any:
+        if self.is_null(row):
+            return None
+        assert self.values is not None
+        if self.encoding == "dictionary":
+            return self._entry(int(self.values[row]))
+        if self.encoding == "blob":
+            assert self._blob is not None
+            start, end = int(self.values[row]), int(self.values[row + 1])
+            return self._decode(self._blob[start:end].tobytes())
+        raw = self.values[row]
+        kind = self.kind
+        if kind == "int":
+            return int(raw)
+        if kind == "float":
+            return float(raw)
+        if kind == "bool":
+            return bool(raw)
+        if kind == "datetime":
+            return raw.astype(dt.datetime)
+        if kind == "date":
+            return raw.astype(dt.date)
+        if kind == "time":
+            seconds, micro = divmod(int(raw), 1_000_000)
+            minutes, second = divmod(seconds, 60)
+            hour, minute = divmod(minutes, 60)
+            return dt.time(hour, minute, second, micro)
+        return Decimal(int(raw)).scaleb(-self.scale)
+
+    def _entry(self, code: int) -> Any:
+        assert self._dictionary is not None
+        offsets, data = self._dictionary
+        return self._decode(data[int(offsets[code]) : int(offsets[code + 1])].tobytes())
+
+    def _decode(self, data: bytes) -> Any:
+        if self.kind == "bytes":
+            return data
+        text = data.decode("utf-8")
+        return Decimal(text) if self.kind == "decimal_text" else text
+
+    def sort_key(self) -> np.ndarray:
+        """Array whose order matches the order of the column values."""
+
+        if self.kind == "null":
+            return np.zeros(self.rows, dtype=np.int8)
+        assert self.values is not None
+        if self.encoding == "dictionary":
+            assert self._dictionary is not None
+            count = len(self._dictionary[0]) - 1
+            # Only the dictionary is sorted; rows are ranked through codes.
+            order = sorted(range(count), key=self._entry)
+            ranks = np.empty(count, dtype=np.int32)
+            ranks[order] = np.arange(count, dtype=np.int32)
+            return ranks[self.values] if count else np.zeros(self.rows, dtype=np.int32)
+        if self.encoding == "blob" and self.kind == "decimal_text":
+            # Numeric order differs from the order of the text.
+            return np.array([self.value(r) or Decimal(0) for r in range(self.rows)], dtype=object)
+        if self.encoding == "blob":
+            # UTF-8 bytes sort in code point order, i.e. like ``str``.
+            assert self._blob is not None
+            return _blob_ranks(np.asarray(self.values), np.asarray(self._blob))
+        return self.values
+
+
+def _blob_ranks(offsets: np.ndarray, blob: np.ndarray) -> np.ndarray:
+    """Ranks of the byte strings ``blob[offsets[i]:offsets[i + 1]]``.
+
+    Rows are sorted by their first ``_PREFIX`` bytes packed into a big-endian
+    ``uint64`` plus the number of bytes packed; only rows still tied over a
+    full prefix take another pass over the next bytes. Equal values get
+    equal ranks.
+    """
+
+    starts = offsets[:-1]
+    lengths = np.diff(offsets)
+    ranks = np.zeros(len(lengths), dtype=np.int64)
+    active = np.arange(len(lengths))
+    skip = 0
+    while active.size > 1:
+        start = starts[active] + skip
+        width = np.clip(lengths[active] - skip, 0, _PREFIX)
+        prefix = np.zeros(active.size, dtype=np.uint64)
+        for step in range(_PREFIX):
+            byte = np.zeros(active.size, dtype=np.uint64)
+            has = width > step
+            byte[has] = blob[start[has] + step]
+            prefix = (prefix << np.uint64(8)) | byte
+        group = ranks[active]
+        order = np.lexsort((width, prefix, group))
+        active, group, prefix, width = active[order], group[order], prefix[order], width[order]
+        # A rank is the position of the first row of its tie group, so a
+        # group splits in place without touching the ranks of other rows.
+        old = np.ones(active.size, dtype=np.bool_)
+        old[1:] = group[1:] != group[:-1]
+        new = old.copy()
+        new[1:] |= (prefix[1:] != prefix[:-1]) | (width[1:] != width[:-1])
+        old_first = np.flatnonzero(old)[np.cumsum(old) - 1]
+        first = np.flatnonzero(new)
+        ranks[active] = group + first[np.cumsum(new) - 1] - old_first
+        sizes = np.diff(np.append(first, active.size))
+        tied = (sizes > 1) & (width[first] == _PREFIX)
+        active = active[np.repeat(tied, sizes)]
+        skip += _PREFIX
+    return ranks
+
+
+class CachedResult:
+    """A cached result opened through memory maps.
+
+    Provides the buffer interface of the result grid (``columns``,
+    ``len()``, :meth:`value`, :meth:`row`) plus :meth:`argsort` and
+    :meth:`cursor` for sorting and re-exporting without the server.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.meta: Dict[str, Any] = json.loads((directory / META_FILE).read_text(encoding="utf-8"))
+        self.rows: int = self.meta["rows"]
+        self.columns: List[str] = [column["name"] for column in self.meta["columns"]]
+        self._columns = [
+            CachedColumn(directory, i, column, self.rows) for i, column in enumerate(self.meta["columns"])
+        ]
+
+    def __len__(self) -> int:
+        return self.rows
+
+    @property
+    def age(self) -> float:
+        """Seconds since the result was fetched or last appended to."""
+
+        created = dt.datetime.fromisoformat(self.meta["created_at"])
+        if created.tzinfo is None:  # entries written with local naive times
+            created = created.astimezone()
+        return (dt.datetime.now(dt.timezone.utc) - created).total_seconds()
+
+    @property
+    def watermark(self) -> Any:
+        """Largest value of the watermark column, if one was recorded."""
+
+        data = self.meta.get("watermark")
+        return _load_value(data["value"]) if data else None
+
+    @property
+    def description(self) -> List[Tuple[Any, ...]]:
+        types = {v: k for k, v in _KIND_BY_TYPE.items() if k not in (bytearray, uuid.UUID)}
+        types["decimal_text"] = Decimal
+        return [
+            (column.name, types.get(column.kind), None, None, None, column.scale or None, True)
+            for column in self._columns
+        ]
+
+    def column(self, index: int) -> CachedColumn:
+        return self._columns[index]
+
+    def value(self, row: int, column: int) -> Any:
+        return self._columns[column].value(row)
+
+    def row(self, row: int) -> Tuple[Any, ...]:
+        return tuple(column.value(row) for column in self._columns)
+
+    def argsort(self, column: int, descending: bool = False) -> np.ndarray:
+        """Row order sorted by ``column``.
+
+        NULLs come first in ascending order and last in descending order;
+        equal values keep their original order either way.
+        """
+
+        col = self._columns[column]
+        key = col.sort_key()
+        if descending:
+            # A stable sort of the reversed column, read backwards, orders
+            # values descending while ties stay in ascending row order.
+            order = (self.rows - 1 - np.argsort(key[::-1], kind="stable"))[::-1]
+        else:
+            order = np.argsort(key, kind="stable")
+        nulls = col.nulls()[order]
+        if not nulls.any():
+            return order
+        parts = (order[~nulls], order[nulls]) if descending else (order[nulls], order[~nulls])
+        return np.concatenate(parts)
+
+    def iter_rows(self, order: Optional[np.ndarray] = None) -> Iterator[Tuple[Any, ...]]:
+        rows = range(self.rows) if order is None else order
+        for row in rows:
+            yield self.row(int(row))
+
+    def cursor(self, order: Optional[np.ndarray] = None) -> "_ResultCursor":
+        """A DB-API-like cursor over the cached rows, for :func:`tee`."""
+
+        return _ResultCursor(self, order)
+
+    def close(self) -> None:
+        self._columns = []
+
+
+class _ResultCursor:
+    def __init__(self, result: CachedResult, order: Optional[np.ndarray]) -> None:
+        self.description = result.description
+        self._rows = result.iter_rows(order)
+
+    def fetchmany(self, size: int = FETCH_SIZE) -> List[Tuple[Any, ...]]:
+        return [row for _, row in zip(range(size), self._rows)]
+
+    def close(self) -> None:
+        self._rows = iter(())
+
+
+@dataclass
+class CacheStats:
+    """Hit and miss counters of a :class:`ResultCache`."""
+
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "hit_rate": self.hit_rate}
+
+
+class ResultCache:
+    """Columnar result cache in ``cache/results``.
+
+    The last access time of an entry is the modification time of its
+    ``meta.json``, touched on every hit; when a new entry pushes the total
+    size over ``max_bytes``, the entries accessed longest ago are removed.
+    """
+
+    def __init__(
+        self,
+        root: Path | None = None,
+        *,
+        max_dictionary: int = MAX_DICTIONARY,
+        max_bytes: int | None = MAX_CACHE_BYTES,
+    ) -> None:
+        self.root = root or DEFAULT_CACHE_DIR
+        self.max_dictionary = max_dictionary
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._lock = threading.RLock()
+
+    key = staticmethod(cache_key)
+
+    def path(self, key: str) -> Path:
+        return self.root / key
+
+    def get(self, key: str, *, max_age: float | None = None) -> Optional[CachedResult]:
+        """Open a cached result, or return ``None`` if there is none.
+
+        Entries created more than ``max_age`` seconds ago are removed and
+        reported as misses.
+        """
+
+        directory = self.path(key)
+        with self._lock:
+            try:
+                result = CachedResult(directory)
+            except (OSError, ValueError, KeyError):
+                result = None
+            if result is not None and result.meta.get("version") != FORMAT_VERSION:
+                result = None
+            if result is not None and max_age is not None:
+                if result.age > max_age:
+                    result.close()
+                    result = None
+                    self.stats.expired += 1
+                    shutil.rmtree(directory, ignore_errors=True)
+            if result is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            try:
+                os.utime(directory / META_FILE)
+            except OSError:  # pragma: no cover - removed concurrently
+                pass
+            return result
+
+    def sink(
+        self, key: str, *, append: bool = False, watermark: str | None = None, **info: Any
+    ) -> ResultCacheSink:
+        """Sink that stores a result under ``key``; ``info`` goes to the metadata.
+
+        See :class:`ResultCacheSink` for ``append`` and ``watermark``.
+        """
+
+        return ResultCacheSink(self, key, info, append=append, watermark=watermark)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Metadata of all cached results, least recently used first.
+
+        Each entry also gets ``accessed_at`` (a timestamp) from ``meta.json``.
+        """
+
+        entries = []
+        for directory in self.root.iterdir() if self.root.is_dir() else ():
+            if directory.name.startswith("."):
+                continue  # a result that is still being written
+            meta_path = directory / META_FILE
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+                meta["accessed_at"] = meta_path.stat().st_mtime
+            except (OSError, ValueError):
+                continue
+            meta.setdefault("key", directory.name)
+            entries.append(meta)
+        entries.sort(key=lambda meta: meta["accessed_at"])
+        return entries
+
+    def size(self) -> int:
+        """Total size of the cached results in bytes."""
+
+        return sum(meta.get("size", 0) for meta in self.entries())
+
+    def evict(self, keep: str | None = None) -> int:
+        """Remove least recently used entries until the cache fits ``max_bytes``.
+
+        ``keep`` is never removed, even if it alone exceeds the budget.
+        Returns the number of removed entries.
+        """
+
+        if self.max_bytes is None:
+            return 0
+        with self._lock:
+            entries = self.entries()
+            total = sum(meta.get("size", 0) for meta in entries)
+            removed = 0
+            for meta in entries:
+                if total <= self.max_bytes:
+                    break
+                if meta["key"] == keep:
+                    continue
+                shutil.rmtree(self.path(meta["key"]), ignore_errors=True)
+                total -= meta.get("size", 0)
+                removed += 1
+            self.stats.evictions += removed
+        return removed
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            shutil.rmtree(self.path(key), ignore_errors=True)
+
+    def invalidate_where(self, **info: Any) -> int:
+        """Remove entries whose metadata matches all of ``info``.
+
+        For example ``invalidate_where(profile_id=3)`` drops every result
+        fetched through that profile. Returns the number of removed entries.
+        """
+
+        with self._lock:
+            removed = 0
+            for meta in self.entries():
+                if all(meta.get(name) == value for name, value in info.items()):
+                    shutil.rmtree(self.path(meta["key"]), ignore_errors=True)
+                    removed += 1
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+
+def create_result_cache() -> ResultCache:
+    """Create the shared cache; ``result_cache_mb`` in the config sets the budget."""
+
+    budget = getattr(container.get("config"), "result_cache_mb", None)
+    return ResultCache(max_bytes=int(budget) << 20 if budget is not None else MAX_CACHE_BYTES)
+
+
+container.register("result_cache", create_result_cache, depends_on=("config",))
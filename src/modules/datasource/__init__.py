@@ -1,5 +1,6 @@
 """Data source management."""
 
 from .connection_manager import ConnectionManager, ConnectionProfile
+from .slots import ServerSlots
 
-__all__ = ["ConnectionManager", "ConnectionProfile"]
+__all__ = ["ConnectionManager", "ConnectionProfile", "ServerSlots"]
@@ -1,9 +1,8 @@
 from __future__ import annotations
 
 import sqlite3
-from typing import List, Optional, Tuple
+from typing import Any, List, Optional, Tuple
 
-import pyodbc
 from pydantic import BaseModel, field_validator
 
 # Import ``core`` in a way that works whether the project is installed or run
@@ -19,6 +18,13 @@ except ImportError:  # pragma: no cover - fallback for running from source
     from ...core.crypto import CryptoManager
     from ...core.storage import get_connection
 
+# The container must be the one the app and the batch runner use
+# (``src.core``), so the relative import comes first here.
+try:
+    from ...core.container import container
+except ImportError:  # pragma: no cover - ``modules`` imported as a top-level package
+    from core.container import container
+
 
 class ConnectionProfile(BaseModel):
     """Model representing a single connection profile."""
@@ -44,11 +50,22 @@ class ConnectionProfile(BaseModel):
 
 
 class ConnectionManager:
-    """CRUD operations and connection testing for MSSQL profiles."""
-
-    def __init__(self, conn: sqlite3.Connection | None = None, crypto: CryptoManager | None = None) -> None:
+    """CRUD operations and connection testing for MSSQL profiles.
+
+    With a ``bus``, edits and deletions are announced as
+    ``connection:changed`` and ``connection:deleted`` events carrying the
+    profile id.
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection | None = None,
+        crypto: CryptoManager | None = None,
+        bus: Any = None,
+    ) -> None:
         self.conn = conn or get_connection()
         self.crypto = crypto or CryptoManager(self.conn)
+        self.bus = bus
 
     # ------------------------------------------------------------------
     # CRUD operations
@@ -150,6 +167,7 @@ class ConnectionManager:
         )
         self.conn.commit()
         self._store_secrets(profile)
+        self._emit("connection:changed", profile.id)
 
     def delete(self, profile_id: int) -> None:
         cur = self.conn.cursor()
@@ -157,6 +175,11 @@ class ConnectionManager:
         for key in [f"connection:{profile_id}:username", f"connection:{profile_id}:password"]:
             cur.execute("DELETE FROM secrets WHERE key=?", (key,))
         self.conn.commit()
+        self._emit("connection:deleted", profile_id)
+
+    def _emit(self, event: str, profile_id: int) -> None:
+        if self.bus is not None:
+            self.bus.emit(event, profile_id)
 
     # ------------------------------------------------------------------
     # Secret handling
@@ -182,10 +205,18 @@ class ConnectionManager:
             return base + "Trusted_Connection=yes;"
         return base + f"UID={profile.username};PWD={profile.password};"
 
+    def connect(self, profile: ConnectionProfile):
+        """Open a ``pyodbc`` connection for ``profile``."""
+
+        import pyodbc  # loaded on first use: the driver is slow to import
+
+        return pyodbc.connect(self._build_conn_string(profile), timeout=profile.connect_timeout)
+
     def test_connection(self, profile: ConnectionProfile) -> Tuple[bool, Optional[str]]:
-        conn_str = self._build_conn_string(profile)
+        import pyodbc
+
         try:
-            connection = pyodbc.connect(conn_str, timeout=profile.connect_timeout)
+            connection = self.connect(profile)
             cursor = connection.cursor()
             cursor.timeout = profile.query_timeout
             cursor.execute("SELECT 1")
@@ -195,3 +226,17 @@ class ConnectionManager:
             return True, None
         except pyodbc.Error as exc:  # pragma: no cover - error path
             return False, str(exc)
+
+
+def create_connection_manager() -> ConnectionManager:
+    """Create the shared manager on top of the container services."""
+
+    return ConnectionManager(container.get("db_connection"), container.get("crypto_manager"))
+
+
+container.register(
+    "connection_manager",
+    create_connection_manager,
+    depends_on=("db_connection", "crypto_manager"),
+    eager=True,
+)
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+try:
+    from ...core.container import container
+except ImportError:  # pragma: no cover - ``modules`` imported as a top-level package
+    from core.container import container
+
+#: Concurrent connections to one server when the config does not say otherwise.
+DEFAULT_SERVER_CONNECTIONS = 4
+
+
+class ServerSlots:
+    """Caps the number of concurrent connections per SQL Server.
+
+    Every piece of code that opens a connection for a long query takes a
+    slot of the profile's server first, so parallel exports and partitioned
+    fetches together never hold more than ``limit`` connections to one
+    production server. Server names are compared case-insensitively.
+    """
+
+    def __init__(self, limit: int = DEFAULT_SERVER_CONNECTIONS) -> None:
+        self.limit = max(1, limit)
+        self._lock = threading.Lock()
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._busy: Dict[str, int] = {}
+
+    def _semaphore(self, server: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._slots.get(server)
+            if semaphore is None:
+                semaphore = self._slots[server] = threading.BoundedSemaphore(self.limit)
+            return semaphore
+
+    @contextmanager
+    def acquire(self, server: str) -> Iterator[None]:
+        """Hold a slot of ``server`` for the duration of the ``with`` block."""
+
+        server = server.lower()
+        semaphore = self._semaphore(server)
+        semaphore.acquire()
+        with self._lock:
+            self._busy[server] = self._busy.get(server, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._busy[server] -= 1
+            semaphore.release()
+
+    def busy(self, server: str) -> int:
+        """Number of slots of ``server`` currently held."""
+
+        with self._lock:
+            return self._busy.get(server.lower(), 0)
+
+
+def create_server_slots() -> ServerSlots:
+    """Create the shared limiter; ``server_connections`` in the config sets the cap."""
+
+    limit = getattr(container.get("config"), "server_connections", None)
+    return ServerSlots(int(limit) if limit else DEFAULT_SERVER_CONNECTIONS)
+
+
+container.register("server_slots", create_server_slots, depends_on=("config",))
@@ -6,20 +6,40 @@ from .checks import (
     check_directory_writable,
     check_odbc_driver,
     check_python_version,
+    clear_cache,
+    probe_connection,
+    probe_connections,
     run_checks,
 )
+from .diagnostics import Measurement, format_report, run_diagnostics, write_report
+
+
+def __getattr__(name: str):
+    # The widget pulls in Qt; import it on first access so that headless
+    # callers (the batch runner, diagnostics) stay Qt-free.
+    if name == "EnvCheckWidget":
+        try:  # pragma: no cover - optional GUI dependency
+            from .widget import EnvCheckWidget
+        except Exception:  # noqa: BLE001
+            EnvCheckWidget = None  # type: ignore[assignment]
+        globals()[name] = EnvCheckWidget
+        return EnvCheckWidget
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-try:  # pragma: no cover - optional GUI dependency
-    from .widget import EnvCheckWidget
-except Exception:  # noqa: BLE001
-    EnvCheckWidget = None  # type: ignore[assignment]
 
 __all__ = [
     "CheckResult",
     "CheckStatus",
+    "Measurement",
     "check_directory_writable",
     "check_odbc_driver",
     "check_python_version",
+    "clear_cache",
+    "format_report",
+    "probe_connection",
+    "probe_connections",
     "run_checks",
+    "run_diagnostics",
+    "write_report",
     "EnvCheckWidget",
 ]
@@ -1,11 +1,26 @@
 from __future__ import annotations
 
+import math
 import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
+from functools import partial
 from pathlib import Path
-from typing import Iterable
+from typing import TYPE_CHECKING, Callable, Iterable, Sequence
+
+if TYPE_CHECKING:  # pragma: no cover - avoids importing the datasource module
+    from ..datasource import ConnectionManager, ConnectionProfile
+
+#: Seconds for which :func:`run_checks` results are reused.
+CHECKS_TTL = 300.0
+#: Upper bound for a single connection probe, seconds.
+PROBE_TIMEOUT = 5.0
+#: Connect plus round-trip time above which a server is reported as slow.
+SLOW_CONNECTION_MS = 1000.0
 
 
 class CheckStatus(Enum):
@@ -23,6 +38,7 @@ class CheckResult:
     name: str
     status: CheckStatus
     message: str
+    duration_ms: float | None = None
 
 
 def _run_odbcinst(args: Iterable[str]) -> subprocess.CompletedProcess[str]:
@@ -80,14 +96,106 @@ def check_python_version(min_version: tuple[int, int] = (3, 10)) -> CheckResult:
     return CheckResult(name, CheckStatus.ERROR, f"{version_str} (требуется {required})")
 
 
-def run_checks() -> list[CheckResult]:
-    """Run all environment checks and return their results."""
+_cache_lock = threading.Lock()
+_cached: tuple[float, list[CheckResult]] | None = None
+
+
+def run_checks(*, max_age: float = CHECKS_TTL, refresh: bool = False) -> list[CheckResult]:
+    """Run all environment checks and return their results.
+
+    The checks run concurrently. Results are cached for ``max_age`` seconds,
+    since spawning ``odbcinst`` on every call is slow and the driver list
+    rarely changes; ``refresh`` forces a new run.
+    """
+
+    global _cached
+    with _cache_lock:
+        if not refresh and _cached is not None and time.monotonic() - _cached[0] < max_age:
+            return list(_cached[1])
 
     base_dir = Path(__file__).resolve().parents[3]
-    checks = [
-        check_odbc_driver(),
-        check_directory_writable(base_dir / "data"),
-        check_directory_writable(base_dir / "logs"),
-        check_python_version(),
+    checks: list[Callable[[], CheckResult]] = [
+        check_odbc_driver,
+        partial(check_directory_writable, base_dir / "data"),
+        partial(check_directory_writable, base_dir / "logs"),
+        check_python_version,
+    ]
+    with ThreadPoolExecutor(max_workers=len(checks), thread_name_prefix="envcheck") as pool:
+        results = list(pool.map(lambda check: check(), checks))
+
+    with _cache_lock:
+        _cached = (time.monotonic(), results)
+    return list(results)
+
+
+def clear_cache() -> None:
+    """Forget cached :func:`run_checks` results."""
+
+    global _cached
+    with _cache_lock:
+        _cached = None
+
+
+def probe_connection(
+    manager: ConnectionManager, profile: ConnectionProfile, timeout: float = PROBE_TIMEOUT
+) -> CheckResult:
+    """Measure connect and ``SELECT 1`` round-trip time for ``profile``."""
+
+    name = f"Сервер {profile.name}"
+    limit = max(1, math.ceil(min(timeout, profile.connect_timeout)))
+    started = time.perf_counter()
+    try:
+        connection = manager.connect(profile.model_copy(update={"connect_timeout": limit}))
+        connected = time.perf_counter()
+        try:
+            cursor = connection.cursor()
+            cursor.timeout = limit
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+        finally:
+            connection.close()
+    except Exception as exc:  # noqa: BLE001 - any driver error means unreachable
+        return CheckResult(name, CheckStatus.ERROR, f"Нет соединения: {exc}")
+    finished = time.perf_counter()
+
+    connect_ms = (connected - started) * 1000
+    query_ms = (finished - connected) * 1000
+    total = connect_ms + query_ms
+    status = CheckStatus.WARNING if total > SLOW_CONNECTION_MS else CheckStatus.OK
+    message = f"подключение {connect_ms:.0f} мс, запрос {query_ms:.0f} мс"
+    return CheckResult(name, status, message, duration_ms=total)
+
+
+def probe_connections(
+    manager: ConnectionManager,
+    profiles: Sequence[ConnectionProfile],
+    timeout: float = PROBE_TIMEOUT,
+) -> list[CheckResult]:
+    """Probe all ``profiles`` in parallel.
+
+    The call returns after at most ``timeout`` seconds: a driver call cannot
+    be interrupted, so probes still running by then are left to finish in
+    daemon threads and reported as errors.
+    """
+
+    results: list[CheckResult | None] = [None] * len(profiles)
+
+    def probe(index: int, profile: ConnectionProfile) -> None:
+        results[index] = probe_connection(manager, profile, timeout)
+
+    threads = [
+        threading.Thread(target=probe, args=(i, profile), name=f"probe-{profile.name}", daemon=True)
+        for i, profile in enumerate(profiles)
+    ]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+
+    return [
+        result
+        if result is not None
+        else CheckResult(f"Сервер {profile.name}", CheckStatus.ERROR, f"Нет ответа за {timeout:g} с")
+        for result, profile in zip(list(results), profiles)
     ]
-    return checks
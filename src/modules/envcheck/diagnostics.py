@@ -0,0 +1,265 @@
+"""Performance diagnostics: disk, SQLite, ODBC driver and fetch throughput.
+
+Unlike :mod:`.checks`, which only verifies that things exist, these
+measurements produce numbers that can be attached to a bug report about
+slow exports. The module does not import Qt.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Sequence
+
+from . import checks
+from .checks import CheckStatus
+
+if TYPE_CHECKING:  # pragma: no cover - avoids importing the datasource module
+    from ..datasource import ConnectionManager, ConnectionProfile
+
+#: Below these values a measurement is reported as a warning.
+MIN_WRITE_MB_S = 50.0
+MAX_FSYNC_MS = 20.0
+MAX_COMMIT_MS = 20.0
+MIN_FETCH_ROWS_S = 20_000.0
+
+#: Generates rows on SQL Server without touching user tables.
+FETCH_QUERY = (
+    "SELECT TOP ({rows}) a.object_id, a.name, b.create_date "
+    "FROM sys.all_objects AS a CROSS JOIN sys.all_objects AS b"
+)
+
+
+@dataclass(slots=True)
+class Measurement:
+    """A single diagnostic measurement."""
+
+    name: str
+    value: float | None
+    unit: str
+    status: CheckStatus
+    message: str = ""
+
+
+def _base_dir() -> Path:
+    return Path(__file__).resolve().parents[3]
+
+
+def measure_write_throughput(path: Path, size_mb: int = 64, block_kb: int = 1024) -> Measurement:
+    """Write ``size_mb`` sequentially into ``path`` and fsync once at the end."""
+
+    name = f"Последовательная запись: {path}"
+    block = os.urandom(block_kb * 1024)
+    count = max(1, size_mb * 1024 // block_kb)
+    try:
+        path.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path, prefix=".diag-", delete=True) as fh:
+            started = time.perf_counter()
+            for _ in range(count):
+                fh.write(block)
+            fh.flush()
+            os.fsync(fh.fileno())
+            elapsed = time.perf_counter() - started
+    except OSError as exc:
+        return Measurement(name, None, "МБ/с", CheckStatus.ERROR, str(exc))
+    rate = count * block_kb / 1024 / elapsed
+    status = CheckStatus.OK if rate >= MIN_WRITE_MB_S else CheckStatus.WARNING
+    return Measurement(name, rate, "МБ/с", status, f"{count * block_kb // 1024} МБ за {elapsed:.2f} с")
+
+
+def measure_fsync_latency(path: Path, count: int = 50, block_size: int = 4096) -> Measurement:
+    """Average time of a small write followed by ``fsync`` in ``path``."""
+
+    name = f"Запись с fsync: {path}"
+    block = os.urandom(block_size)
+    try:
+        path.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path, prefix=".diag-", delete=True) as fh:
+            started = time.perf_counter()
+            for _ in range(count):
+                fh.write(block)
+                fh.flush()
+                os.fsync(fh.fileno())
+            elapsed = time.perf_counter() - started
+    except OSError as exc:
+        return Measurement(name, None, "мс", CheckStatus.ERROR, str(exc))
+    latency = elapsed / count * 1000
+    status = CheckStatus.OK if latency <= MAX_FSYNC_MS else CheckStatus.WARNING
+    return Measurement(name, latency, "мс", status, f"{count / elapsed:.0f} fsync/с")
+
+
+def measure_sqlite_commit(path: Path, count: int = 50) -> Measurement:
+    """Average latency of a one-row transaction in a scratch database in ``path``.
+
+    The database is a temporary file next to the application database, so
+    the live ``app.db`` is never written to.
+    """
+
+    name = f"Фиксация транзакции SQLite: {path}"
+    try:
+        path.mkdir(parents=True, exist_ok=True)
+        fd, db_name = tempfile.mkstemp(dir=path, prefix=".diag-", suffix=".db")
+        os.close(fd)
+    except OSError as exc:
+        return Measurement(name, None, "мс", CheckStatus.ERROR, str(exc))
+    db_path = Path(db_name)
+    try:
+        conn = sqlite3.connect(db_path, timeout=5)
+    except sqlite3.Error as exc:
+        db_path.unlink(missing_ok=True)
+        return Measurement(name, None, "мс", CheckStatus.ERROR, str(exc))
+    try:
+        conn.execute("CREATE TABLE _diagnostics (value BLOB)")
+        conn.commit()
+        started = time.perf_counter()
+        for i in range(count):
+            conn.execute("INSERT INTO _diagnostics VALUES (?)", (os.urandom(64),))
+            conn.commit()
+        elapsed = time.perf_counter() - started
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    except sqlite3.Error as exc:
+        return Measurement(name, None, "мс", CheckStatus.ERROR, str(exc))
+    finally:
+        conn.close()
+        db_path.unlink(missing_ok=True)
+    latency = elapsed / count * 1000
+    status = CheckStatus.OK if latency <= MAX_COMMIT_MS else CheckStatus.WARNING
+    return Measurement(name, latency, "мс", status, f"journal_mode={mode}")
+
+
+def detect_odbc_drivers() -> Measurement:
+    """Report which MS ODBC drivers for SQL Server are installed."""
+
+    name = "MS ODBC драйверы"
+    try:
+        proc = checks._run_odbcinst(["-q", "-d"])
+    except FileNotFoundError:
+        return Measurement(name, None, "", CheckStatus.ERROR, "Команда odbcinst не найдена")
+    except subprocess.CalledProcessError:
+        return Measurement(name, None, "", CheckStatus.ERROR, "Не удалось выполнить проверку драйвера")
+
+    versions = [
+        version
+        for version in ("17", "18")
+        if f"odbc driver {version} for sql server" in proc.stdout.lower()
+    ]
+    if not versions:
+        return Measurement(name, None, "", CheckStatus.ERROR, "Драйвер MS ODBC 17/18 не найден")
+    # Connection strings name Driver 17; with only 18 installed they fail.
+    status = CheckStatus.OK if "17" in versions else CheckStatus.WARNING
+    return Measurement(name, None, "", status, "Установлены: " + ", ".join(versions))
+
+
+def check_pyodbc_pooling() -> Measurement:
+    """Report the ``pyodbc`` version and whether connection pooling is on."""
+
+    name = "Пул соединений pyodbc"
+    try:
+        import pyodbc
+    except ImportError as exc:
+        return Measurement(name, None, "", CheckStatus.ERROR, f"pyodbc недоступен: {exc}")
+    enabled = bool(getattr(pyodbc, "pooling", False))
+    version = getattr(pyodbc, "version", "?")
+    status = CheckStatus.OK if enabled else CheckStatus.WARNING
+    state = "включён" if enabled else "выключен"
+    return Measurement(name, None, "", status, f"{state}, pyodbc {version}")
+
+
+def measure_fetch_rate(
+    manager: ConnectionManager,
+    profile: ConnectionProfile,
+    rows: int = 100_000,
+    fetch_size: int = 5000,
+) -> Measurement:
+    """Fetch ``rows`` generated rows from ``profile`` and report rows per second."""
+
+    name = f"Скорость выборки: {profile.name}"
+    try:
+        connection = manager.connect(profile)
+        try:
+            cursor = connection.cursor()
+            cursor.timeout = profile.query_timeout
+            started = time.perf_counter()
+            cursor.execute(FETCH_QUERY.format(rows=int(rows)))
+            first = None
+            fetched = 0
+            while True:
+                batch = cursor.fetchmany(fetch_size)
+                if not batch:
+                    break
+                if first is None:
+                    first = time.perf_counter() - started
+                fetched += len(batch)
+            elapsed = time.perf_counter() - started
+        finally:
+            connection.close()
+    except Exception as exc:  # noqa: BLE001 - any driver error is reported
+        return Measurement(name, None, "строк/с", CheckStatus.ERROR, str(exc))
+    rate = fetched / elapsed if elapsed else 0.0
+    status = CheckStatus.OK if rate >= MIN_FETCH_ROWS_S else CheckStatus.WARNING
+    message = f"{fetched} строк за {elapsed:.2f} с, первая пачка через {(first or 0) * 1000:.0f} мс"
+    return Measurement(name, rate, "строк/с", status, message)
+
+
+def run_diagnostics(
+    base_dir: Path | None = None,
+    *,
+    manager: ConnectionManager | None = None,
+    profile: ConnectionProfile | None = None,
+    size_mb: int = 64,
+) -> list[Measurement]:
+    """Run the whole suite; the fetch rate is measured only with a ``profile``."""
+
+    base_dir = base_dir or _base_dir()
+    results: list[Measurement] = []
+    for directory in (base_dir / "data", base_dir / "cache"):
+        results.append(measure_write_throughput(directory, size_mb=size_mb))
+        results.append(measure_fsync_latency(directory))
+    results.append(measure_sqlite_commit(base_dir / "data"))
+    results.append(detect_odbc_drivers())
+    results.append(check_pyodbc_pooling())
+    if manager is not None and profile is not None:
+        results.append(measure_fetch_rate(manager, profile))
+    return results
+
+
+def format_report(results: Sequence[Measurement]) -> str:
+    """Render measurements as plain text suitable for pasting into a ticket."""
+
+    lines = [
+        f"Диагностика: {datetime.now().isoformat(timespec='seconds')}",
+        f"Система: {platform.platform()}, Python {platform.python_version()}",
+        "",
+    ]
+    for result in results:
+        value = f"{result.value:.1f} {result.unit}" if result.value is not None else "-"
+        lines.append(f"[{result.status.value:>7}] {result.name}: {value}  {result.message}".rstrip())
+    return "\n".join(lines) + "\n"
+
+
+def write_report(results: Sequence[Measurement], path: Path) -> Path:
+    """Save a report; ``.json`` files get machine-readable output, others text."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix.lower() == ".json":
+        payload = {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "platform": platform.platform(),
+            "python": sys.version,
+            "results": [
+                {**asdict(result), "status": result.status.value} for result in results
+            ],
+        }
+        path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    else:
+        path.write_text(format_report(results), encoding="utf-8")
+    return path
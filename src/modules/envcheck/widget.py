@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from typing import Dict
+from typing import TYPE_CHECKING, Dict, List
 
+from PySide6.QtCore import Signal
 from PySide6.QtWidgets import (
     QHBoxLayout,
     QLabel,
@@ -10,14 +11,42 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
-from .checks import CheckResult, CheckStatus, run_checks
+from .checks import CheckResult, CheckStatus, probe_connections, run_checks
 
+try:
+    from ...core.container import container
+except ImportError:  # pragma: no cover - ``modules`` imported as a top-level package
+    from core.container import container
+
+if TYPE_CHECKING:  # pragma: no cover
+    from core.tasks import TaskRunner
+
+    from ..datasource import ConnectionManager
 
-class EnvCheckWidget(QWidget):
-    """Widget displaying environment check results."""
 
-    def __init__(self, parent: QWidget | None = None) -> None:
+class EnvCheckWidget(QWidget):
+    """Widget displaying environment check results.
+
+    Checks and connection probes run on the task runner; results are passed
+    back through queued signals, so the GUI thread never waits for
+    ``odbcinst`` or a slow server.
+    """
+
+    checks_finished = Signal(object)
+    probes_finished = Signal(object)
+
+    def __init__(
+        self,
+        parent: QWidget | None = None,
+        *,
+        runner: TaskRunner | None = None,
+        connections: ConnectionManager | None = None,
+    ) -> None:
         super().__init__(parent)
+        self.runner = runner or container.get("task_runner")
+        self.connections = connections
+        self.checks_finished.connect(self._on_checks)
+        self.probes_finished.connect(self._on_probes)
         self._create_ui()
         self.run_checks()
 
@@ -40,6 +69,10 @@ class EnvCheckWidget(QWidget):
             self.layout.addWidget(label)
             self.status_labels[key] = label
 
+        self.servers_layout = QVBoxLayout()
+        self.layout.addLayout(self.servers_layout)
+        self.server_labels: List[QLabel] = []
+
         btn_layout = QHBoxLayout()
         self.repeat_btn = QPushButton("Повторить проверку")
         self.continue_btn = QPushButton("Продолжить")
@@ -48,15 +81,60 @@ class EnvCheckWidget(QWidget):
         btn_layout.addWidget(self.continue_btn)
         self.layout.addLayout(btn_layout)
 
-        self.repeat_btn.clicked.connect(self.run_checks)
+        self.repeat_btn.clicked.connect(lambda: self.run_checks(refresh=True))
 
     # ------------------------------------------------------------------
     # Checks
     # ------------------------------------------------------------------
-    def run_checks(self) -> None:
-        """Execute all checks and update UI."""
+    def run_checks(self, refresh: bool = False) -> None:
+        """Start all checks in the background; the UI updates as they finish."""
 
-        results = run_checks()
+        self.repeat_btn.setEnabled(False)
+        self.continue_btn.setEnabled(False)
+        for label in self.status_labels.values():
+            label.setText(f"{label.text().split(':')[0]}: ...")
+            label.setStyleSheet("")
+        self.runner.submit(
+            run_checks,
+            refresh=refresh,
+            key="envcheck",
+            priority=5,
+            on_done=lambda results: self.checks_finished.emit(results),
+        )
+        self._start_probes()
+
+    def _start_probes(self) -> None:
+        for label in self.server_labels:
+            self.servers_layout.removeWidget(label)
+            label.deleteLater()
+        self.server_labels = []
+
+        manager = self.connections
+        if manager is None:
+            try:
+                manager = container.get("connection_manager")
+            except Exception:  # noqa: BLE001 - the module is optional here
+                return
+        try:
+            # Profiles are read on the GUI thread, which owns the SQLite
+            # connection; only the network round-trips run in the pool.
+            profiles = manager.list()
+        except Exception:  # noqa: BLE001 - e.g. secrets are still locked
+            return
+        for profile in profiles:
+            label = QLabel(f"Сервер {profile.name}: ...")
+            self.servers_layout.addWidget(label)
+            self.server_labels.append(label)
+        if profiles:
+            labels = self.server_labels
+            self.runner.submit(
+                probe_connections,
+                manager,
+                profiles,
+                on_done=lambda results: self.probes_finished.emit((labels, results)),
+            )
+
+    def _on_checks(self, results: List[CheckResult]) -> None:
         mapping = {
             "odbc": results[0],
             "data": results[1],
@@ -66,15 +144,25 @@ class EnvCheckWidget(QWidget):
 
         all_ok = True
         for key, result in mapping.items():
-            self._apply_result(key, result)
+            self._apply_result(self.status_labels[key], result)
             if result.status is not CheckStatus.OK:
                 all_ok = False
 
+        self.repeat_btn.setEnabled(True)
         self.continue_btn.setEnabled(all_ok)
 
-    def _apply_result(self, key: str, result: CheckResult) -> None:
-        label = self.status_labels[key]
-        label.setText(f"{label.text().split(':')[0]}: {result.message}")
+    def _on_probes(self, payload) -> None:
+        labels, results = payload
+        if labels is not self.server_labels:
+            return  # superseded by a newer run
+        # Slow or unreachable servers are informational: they do not block
+        # the "Продолжить" button.
+        for label, result in zip(labels, results):
+            self._apply_result(label, result, title=result.name)
+
+    def _apply_result(self, label: QLabel, result: CheckResult, title: str | None = None) -> None:
+        title = title or label.text().split(":")[0]
+        label.setText(f"{title}: {result.message}")
         color = {
             CheckStatus.OK: "green",
             CheckStatus.WARNING: "orange",
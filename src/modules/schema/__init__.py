@@ -1,3 +1,3 @@
-from .cache import SchemaCache
+from .cache import PARTITION_TYPES, WATERMARK_TYPES, SchemaCache
 
-__all__ = ["SchemaCache"]
+__all__ = ["SchemaCache", "PARTITION_TYPES", "WATERMARK_TYPES"]
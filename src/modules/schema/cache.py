@@ -2,10 +2,11 @@ from __future__ import annotations
 
 import json
 import sqlite3
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
 
-import pyodbc
+if TYPE_CHECKING:  # pragma: no cover - the driver is only needed by callers
+    import pyodbc
 
 try:
     from core.storage import get_connection
@@ -13,6 +14,25 @@ except ImportError:  # pragma: no cover - fallback when running from source
     from ...core.storage import get_connection
 
 
+#: Types of a unique key usable as an append-only watermark.
+WATERMARK_TYPES = frozenset({"datetime", "datetime2", "datetimeoffset", "bigint", "int"})
+#: Key types whose ranges can be split from their minimum and maximum.
+PARTITION_TYPES = frozenset(
+    {
+        "tinyint",
+        "smallint",
+        "int",
+        "bigint",
+        "decimal",
+        "numeric",
+        "date",
+        "smalldatetime",
+        "datetime",
+        "datetime2",
+    }
+)
+
+
 class SchemaCache:
     """Cache for database schema information with TTL support."""
 
@@ -34,16 +54,93 @@ class SchemaCache:
         if not ts:
             return None
         cached_at = datetime.fromisoformat(ts)
-        if datetime.utcnow() - cached_at > self.ttl:
+        if cached_at.tzinfo is None:  # written before times carried a zone
+            cached_at = cached_at.replace(tzinfo=timezone.utc)
+        if datetime.now(timezone.utc) - cached_at > self.ttl:
             return None
         return payload.get("data")
 
+    def watermark_columns(self, name: str, table: str, schema: str = "dbo") -> List[str]:
+        """Columns of ``table`` in the cached schema usable as a watermark.
+
+        Incremental refreshes fetch rows strictly above the last value seen,
+        so the column must be unique, grow on insert and never change: a
+        single-column primary key (identity) of a type in
+        :data:`WATERMARK_TYPES`. A created-at column is not offered, since a
+        row committed later with the same time as the last one would be
+        missed, and ``rowversion`` would re-append updated rows. Returns an
+        empty list when there is no fresh snapshot for ``name``.
+        """
+
+        data = self.get(name) or {}
+        keys = [
+            key["column"]
+            for key in data.get("primary_keys", [])
+            if key["schema"] == schema and key["table"] == table
+        ]
+        if len(keys) != 1:
+            return []
+        return [
+            column["name"]
+            for column in data.get("columns", [])
+            if column["schema"] == schema
+            and column["table"] == table
+            and column["name"] == keys[0]
+            and column["type"].lower() in WATERMARK_TYPES
+        ]
+
+    def partition_columns(self, name: str, table: str, schema: str = "dbo") -> List[str]:
+        """Columns of ``table`` in the cached schema usable as a partition key.
+
+        These are the leading columns of the primary key and the indexes, so
+        that each range and the ``MIN``/``MAX`` bounds are index seeks, with
+        a type that ranges can be split on. Returns an empty list when there
+        is no fresh snapshot for ``name``.
+        """
+
+        data = self.get(name) or {}
+        types = {
+            column["name"]: column["type"].lower()
+            for column in data.get("columns", [])
+            if column["schema"] == schema and column["table"] == table
+        }
+        primary = [
+            key["column"]
+            for key in data.get("primary_keys", [])
+            if key["schema"] == schema and key["table"] == table
+        ]
+        # The key query carries no ordinal, so only a single-column primary
+        # key is known to lead; composite keys come through their index.
+        leading = primary if len(primary) == 1 else []
+        leading += [
+            index["columns"][0]
+            for index in data.get("indexes", [])
+            if index["schema"] == schema and index["table"] == table and index["columns"]
+        ]
+        columns: List[str] = []
+        for column in leading:
+            if column not in columns and types.get(column) in PARTITION_TYPES:
+                columns.append(column)
+        return columns
+
     # ------------------------------------------------------------------
     def update(self, name: str, sql_conn: pyodbc.Connection) -> Dict[str, Any]:
         """Collect schema from ``sql_conn`` and cache under ``name``."""
 
-        data = self._collect_schema(sql_conn)
-        payload = {"cached_at": datetime.utcnow().isoformat(), "data": data}
+        return self.store(name, self.collect(sql_conn))
+
+    def collect(self, sql_conn: pyodbc.Connection) -> Dict[str, Any]:
+        """Collect schema from ``sql_conn`` without touching the local cache.
+
+        Safe to call from a worker thread; pass the result to :meth:`store`.
+        """
+
+        return self._collect_schema(sql_conn)
+
+    def store(self, name: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Cache collected schema ``data`` under ``name``."""
+
+        payload = {"cached_at": datetime.now(timezone.utc).isoformat(), "data": data}
         cur = self.conn.cursor()
         cur.execute("DELETE FROM schema_cache WHERE name=?", (name,))
         cur.execute(
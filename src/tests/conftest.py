@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+
+
+class FakeCursor:
+    """DB-API cursor over rows held in memory.
+
+    ``fetchmany`` and ``fetchone`` serve ``rows`` in order. With ``respond``,
+    every ``execute`` replaces them with ``respond(sql, params)``, which may
+    also raise like a failing server; ``delay`` makes ``execute`` slow.
+    Executed statements are kept in ``executed``.
+    """
+
+    timeout = 0
+
+    def __init__(
+        self,
+        description: Optional[Sequence[Tuple[Any, ...]]] = None,
+        rows: Iterable[Tuple[Any, ...]] = (),
+        *,
+        respond: Optional[Callable[[str, Tuple[Any, ...]], Iterable[Tuple[Any, ...]]]] = None,
+        delay: float = 0.0,
+    ) -> None:
+        self.description = description
+        self.respond = respond
+        self.delay = delay
+        self.executed: List[Tuple[str, Tuple[Any, ...]]] = []
+        self.fetches = 0
+        self.closed = False
+        self._rows = list(rows)
+
+    def execute(self, sql: str, *params: Any) -> "FakeCursor":
+        self.executed.append((sql, params))
+        if self.delay:
+            time.sleep(self.delay)
+        if self.respond is not None:
+            self._rows = list(self.respond(sql, params))
+        return self
+
+    def fetchone(self) -> Optional[Tuple[Any, ...]]:
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchmany(self, size: int = 1) -> List[Tuple[Any, ...]]:
+        self.fetches += 1
+        batch, self._rows = self._rows[:size], self._rows[size:]
+        return batch
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeConnection:
+    """Connection whose every ``cursor()`` is a new :class:`FakeCursor`.
+
+    The constructor arguments are passed on to each cursor; the cursors
+    handed out are kept in ``cursors``.
+    """
+
+    cursor_class = FakeCursor
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self.cursors: List[FakeCursor] = []
+        self.closed = False
+        self._args = args
+        self._kwargs = kwargs
+
+    @property
+    def executed(self) -> List[Tuple[str, Tuple[Any, ...]]]:
+        """Statements executed on all cursors of the connection."""
+
+        return [statement for cursor in self.cursors for statement in cursor.executed]
+
+    def cursor(self) -> FakeCursor:
+        cursor = self.cursor_class(*self._args, **self._kwargs)
+        self.cursors.append(cursor)
+        return cursor
+
+    def close(self) -> None:
+        self.closed = True
@@ -0,0 +1,359 @@
+from __future__ import annotations
+
+import csv
+import datetime as dt
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(ROOT))
+
+from conftest import FakeConnection
+from src.app.batch import BatchError, run_datasets, write_key_file
+from src.core.container import container
+from src.core.crypto import CryptoManager
+from src.core.events import EventBus
+from src.core.storage import DB_PATH, get_connection
+from src.modules.datasets import CycleError, Dataset, DatasetManager, ResultCache
+from src.modules.datasource import ConnectionManager, ConnectionProfile
+from src.modules.schema import SchemaCache
+
+
+@pytest.fixture(autouse=True)
+def clean_db():
+    container.clear()
+    if DB_PATH.exists():
+        DB_PATH.unlink()
+    yield
+    container.clear()
+    if DB_PATH.exists():
+        DB_PATH.unlink()
+
+
+SALES = [("id",), ("name",)]
+ROWS = [(1, "alpha"), (2, "beta")]
+
+
+def _connect(monkeypatch, **cursor) -> FakeConnection:
+    """Make every ``connect`` return one fake connection to the ``sales`` table."""
+
+    connection = FakeConnection(SALES, ROWS, **cursor)
+    monkeypatch.setattr(ConnectionManager, "connect", lambda self, profile: connection)
+    return connection
+
+
+def _prepare(tmp_path: Path) -> Path:
+    conn = get_connection()
+    crypto = CryptoManager(conn)
+    crypto.set_master_password("pwd")
+    manager = ConnectionManager(conn, crypto)
+    profile = manager.create(
+        ConnectionProfile(name="p", server="srv", database="db", username="u", password="p")
+    )
+    datasets = DatasetManager(conn)
+    datasets.create(Dataset(name="sales", query="SELECT id, name FROM sales", connection_id=profile.id))
+    datasets.create(Dataset(name="bad", query="DROP TABLE sales", connection_id=profile.id))
+    conn.close()
+
+    key_file = tmp_path / "app.key"
+    write_key_file(key_file, "pwd")
+    return key_file
+
+
+def _store_schema(conn) -> None:
+    # Schema snapshot of profile "p": ``sales.id`` is an int primary key.
+    column = {"schema": "dbo", "table": "sales", "nullable": False}
+    SchemaCache(conn).store(
+        "p",
+        {
+            "columns": [
+                {**column, "name": "id", "type": "int"},
+                {**column, "name": "name", "type": "nvarchar"},
+            ],
+            "primary_keys": [{"schema": "dbo", "table": "sales", "column": "id"}],
+            "indexes": [],
+        },
+    )
+
+
+def test_run_exports_datasets_and_records_them(tmp_path, monkeypatch):
+    key_file = _prepare(tmp_path)
+    _connect(monkeypatch)
+
+    results = run_datasets(["sales", "bad"], output_dir=tmp_path / "out", key_file=str(key_file))
+
+    by_name = {r.dataset.name: r for r in results}
+    assert by_name["bad"].error
+    ok = by_name["sales"]
+    assert ok.error is None and ok.rows == 2
+    with ok.path.open(encoding="utf-8", newline="") as fh:
+        assert list(csv.reader(fh)) == [["id", "name"], ["1", "alpha"], ["2", "beta"]]
+
+    exports = DatasetManager(container.get("db_connection")).exports()
+    assert [(e.dataset_id, e.rows) for e in exports] == [(ok.dataset.id, 2)]
+
+
+def test_run_exports_several_formats_from_one_query(tmp_path, monkeypatch):
+    import gzip
+
+    import openpyxl
+
+    key_file = _prepare(tmp_path)
+    connection = _connect(monkeypatch)
+
+    (result,) = run_datasets(
+        ["sales"],
+        output_dir=tmp_path,
+        key_file=str(key_file),
+        formats=["xlsx", "tsv", "xlsx"],
+        compression="gzip",
+    )
+
+    assert result.error is None and len(connection.cursors) == 1
+    xlsx, tsv = result.paths
+    assert xlsx.name.endswith(".xlsx") and tsv.name.endswith(".tsv.gz")
+    rows = list(openpyxl.load_workbook(xlsx).active.iter_rows(values_only=True))
+    assert rows == [("id", "name"), (1, "alpha"), (2, "beta")]
+    with gzip.open(tsv, "rt", encoding="utf-8", newline="") as fh:
+        assert fh.read() == "id\tname\r\n1\talpha\r\n2\tbeta\r\n"
+    exports = DatasetManager(container.get("db_connection")).exports()
+    assert sorted(e.path for e in exports) == sorted(str(p) for p in result.paths)
+    assert all(e.rows == 2 and e.duration_ms is not None for e in exports)
+
+
+def test_cached_dataset_is_not_requeried_until_edited(tmp_path, monkeypatch):
+    key_file = _prepare(tmp_path)
+    connects = []
+    connection = FakeConnection(SALES, ROWS)
+    monkeypatch.setattr(
+        ConnectionManager, "connect", lambda self, profile: connects.append(profile) or connection
+    )
+    cache = ResultCache(tmp_path / "cache")
+    bus = EventBus()
+    bus.subscribe("dataset:changed", lambda dataset_id: cache.invalidate_where(dataset_id=dataset_id))
+    conn = get_connection()
+    datasets = DatasetManager(conn, bus=bus)
+    sales = datasets.find("sales")
+    sales.cache_ttl = 3600
+    datasets.update(sales)
+
+    def run(name, **options):
+        (result,) = run_datasets(
+            ["sales"], output_dir=tmp_path / name, key_file=str(key_file), cache=cache, **options
+        )
+        assert result.error is None
+        return result
+
+    first, second = run("first"), run("second")
+    assert not first.cached and second.cached and len(connects) == 1
+    assert second.path.read_bytes() == first.path.read_bytes()
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+    assert not run("fresh", use_cache=False).cached and len(connects) == 2
+
+    datasets.update(sales)
+    conn.close()
+    assert cache.entries() == []
+    assert not run("edited").cached and len(connects) == 3
+
+
+def test_watermark_dataset_fetches_only_new_rows(tmp_path, monkeypatch):
+    key_file = _prepare(tmp_path)
+    table = list(ROWS)
+
+    def respond(query, params):
+        above = params[0] if params else 0
+        return [row for row in table if row[0] > above]
+
+    connection = _connect(monkeypatch, respond=respond)
+    cache = ResultCache(tmp_path / "cache")
+    conn = get_connection()
+    datasets = DatasetManager(conn)
+    sales = datasets.find("sales")
+    sales.watermark_column = "id"
+    datasets.update(sales)
+    _store_schema(conn)
+    conn.close()
+
+    def run(name):
+        (result,) = run_datasets(
+            ["sales"], output_dir=tmp_path / name, key_file=str(key_file), cache=cache
+        )
+        assert result.error is None
+        return result
+
+    first = run("first")
+    assert first.appended is None and first.rows == 2
+    table.append((3, "gamma"))
+    second = run("second")
+    assert second.cached and second.appended == 1 and second.rows == 3
+    query, params = connection.executed[-1]
+    assert params == (2,) and "WHERE src.[id] > ?" in query
+    with second.path.open(encoding="utf-8", newline="") as fh:
+        assert list(csv.reader(fh))[1:] == [["1", "alpha"], ["2", "beta"], ["3", "gamma"]]
+    assert run("third").appended == 0
+    assert cache.get(cache.key(sales.connection_id, sales.query)).watermark == 3
+
+    # Only a unique key is a safe watermark; anything else is fetched in full.
+    conn = get_connection()
+    sales.watermark_column = "name"
+    DatasetManager(conn).update(sales)
+    conn.close()
+    fourth = run("fourth")
+    assert fourth.appended is None and connection.executed[-1] == ("SELECT id, name FROM sales", ())
+
+
+def test_rejected_watermark_query_falls_back_to_full_fetch(tmp_path, monkeypatch):
+    key_file = _prepare(tmp_path)
+
+    def respond(query, params):
+        if params:
+            raise RuntimeError("Incorrect syntax near the keyword 'WITH'")
+        return ROWS
+
+    connection = _connect(monkeypatch, respond=respond)
+    cache = ResultCache(tmp_path / "cache")
+    conn = get_connection()
+    datasets = DatasetManager(conn)
+    sales = datasets.find("sales")
+    sales.watermark_column = "id"
+    datasets.update(sales)
+    _store_schema(conn)
+    with pytest.raises(ValueError, match="WITH"):
+        datasets.update(sales.model_copy(update={"query": "WITH s AS (SELECT 1 AS id) SELECT id FROM s"}))
+    conn.close()
+
+    for name in ("first", "second"):
+        (result,) = run_datasets(
+            ["sales"], output_dir=tmp_path / name, key_file=str(key_file), cache=cache
+        )
+        assert result.error is None and result.rows == 2 and result.appended is None
+    queries = [query for query, _ in connection.executed]
+    assert queries[-1] == "SELECT id, name FROM sales" and len(queries) == 3
+
+
+def test_partitioned_dataset_is_fetched_by_key_ranges(tmp_path, monkeypatch):
+    key_file = _prepare(tmp_path)
+
+    def respond(query, params):
+        if "MIN(" in query:
+            return [(1, 3)]
+        if "IS NULL" in query:
+            return [(1, "alpha")]
+        return [(3, "gamma")] if params else [(1, "alpha"), (3, "gamma")]
+
+    connection = _connect(monkeypatch, respond=respond)
+    conn = get_connection()
+    _store_schema(conn)
+    datasets = DatasetManager(conn)
+    sales = datasets.find("sales")
+    sales.partitions = 2
+    datasets.update(sales)
+    conn.close()
+
+    # The key is taken from the primary key in the cached schema.
+    (result,) = run_datasets(["sales"], output_dir=tmp_path, key_file=str(key_file), use_cache=False)
+    assert result.error is None and result.rows == 2
+    queries = connection.executed
+    assert "MIN(src.[id]), MAX(src.[id])" in queries[0][0]
+    assert [params for _, params in queries] == [(), (2,), (2,)]
+    assert container.get("server_slots").busy("srv") == 0
+    with result.path.open(encoding="utf-8", newline="") as fh:
+        assert list(csv.reader(fh)) == [["id", "name"], ["1", "alpha"], ["3", "gamma"]]
+
+    # A column that does not lead an index is not used for ranges.
+    conn = get_connection()
+    sales.partition_column = "name"
+    DatasetManager(conn).update(sales)
+    conn.close()
+    connection.cursors.clear()
+    (result,) = run_datasets(["sales"], output_dir=tmp_path / "plain", key_file=str(key_file), use_cache=False)
+    assert result.error is None and connection.executed == [("SELECT id, name FROM sales", ())]
+
+
+def test_dependent_dataset_is_skipped_while_its_inputs_are_unchanged(tmp_path, monkeypatch):
+    key_file = _prepare(tmp_path)
+    table = list(ROWS)
+    connection = _connect(monkeypatch, respond=lambda query, params: table)
+    conn = get_connection()
+    datasets = DatasetManager(conn)
+    sales = datasets.find("sales")
+    # ``report`` only reads what ``sales`` loads; ``audit`` has a source of its own.
+    report = datasets.create(
+        Dataset(
+            name="report",
+            query="SELECT id FROM sales",
+            connection_id=sales.connection_id,
+            skip_unchanged=True,
+        )
+    )
+    audit = datasets.create(
+        Dataset(name="audit", query="SELECT id FROM audit", connection_id=sales.connection_id)
+    )
+    datasets.set_dependencies(report.id, [sales.id])
+    datasets.set_dependencies(audit.id, [sales.id])
+    with pytest.raises(CycleError):
+        datasets.set_dependencies(sales.id, [report.id])
+    assert datasets.get(report.id).skip_unchanged and not datasets.get(audit.id).skip_unchanged
+    conn.close()
+
+    def run(name, **options):
+        results = run_datasets(
+            ["report", "audit"], output_dir=tmp_path / name, key_file=str(key_file), **options
+        )
+        return {result.dataset.name: result for result in results}
+
+    first = run("first")
+    assert set(first) == {"sales", "report", "audit"}
+    assert connection.executed[0][0] == "SELECT id, name FROM sales"
+    assert first["sales"].fingerprint and not first["report"].skipped
+    second = run("second")
+    assert second["report"].skipped and second["report"].paths == []
+    assert not second["audit"].skipped and second["audit"].path.exists()
+    assert not list((tmp_path / "second").glob("report_*"))
+    table.append((3, "gamma"))
+    third = run("third")
+    assert not third["report"].skipped and third["report"].path.exists()
+    assert run("fourth", force=True)["report"].skipped is False
+
+    manager = DatasetManager(container.get("db_connection"))
+    assert [r.status for r in manager.runs(report.id)] == ["done", "skipped", "done", "done"]
+    assert [r.status for r in manager.runs(audit.id)] == ["done"] * 4
+    assert len(manager.exports(report.id)) == 3
+    # Run and export times share one clock: aware UTC.
+    times = [r.started_at for r in manager.runs(report.id)] + [
+        e.created_at for e in manager.exports(report.id)
+    ]
+    assert all(dt.datetime.fromisoformat(t).utcoffset() == dt.timedelta(0) for t in times)
+
+
+def test_services_register_into_the_app_container(monkeypatch):
+    # Some tests put ``src`` on sys.path, which makes a second, top-level
+    # ``core`` importable; services must still land in ``src.core``.
+    monkeypatch.syspath_prepend(str(ROOT / "src"))
+    import core.container  # noqa: F401
+
+    from src.modules.datasets import result_cache
+    from src.modules.datasource import connection_manager, slots
+
+    for module in (connection_manager, result_cache, slots):
+        assert module.container is container
+
+
+def test_wrong_key_is_rejected(tmp_path):
+    _prepare(tmp_path)
+    wrong = tmp_path / "wrong.key"
+    wrong.write_bytes(b"x" * 44)
+    with pytest.raises(BatchError):
+        run_datasets(["sales"], output_dir=tmp_path, key_file=str(wrong))
+
+
+def test_batch_does_not_import_qt():
+    code = "import sys, src.app.batch; print(any(m.startswith('PySide6') for m in sys.modules))"
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == "False"
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2] / "src"))
+
+from core.config import ConfigService, diff_configs, load_config
+from core.events import EventBus
+
+
+def _write(path: Path, data: dict) -> None:
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def test_service_reloads_only_on_change(tmp_path, monkeypatch):
+    default = tmp_path / "default.json"
+    user = tmp_path / "user.json"
+    _write(default, {"app_name": "app", "version": "1", "ui": {"theme": "light"}})
+
+    calls = {"count": 0}
+    original = load_config
+
+    def counting_load(*args):
+        calls["count"] += 1
+        return original(*args)
+
+    monkeypatch.setattr("core.config.load_config", counting_load)
+    bus = EventBus()
+    events = []
+    bus.subscribe("config:changed", lambda cfg, changes: events.append(changes))
+    service = ConfigService(default, user, bus)
+
+    assert service.reload() == {}
+    assert calls["count"] == 1
+
+    _write(user, {"ui": {"theme": "dark"}, "extra": 1})
+    changes = service.reload()
+
+    assert calls["count"] == 2
+    assert changes == {"extra": (None, 1), "ui.theme": ("light", "dark")}
+    assert events == [changes]
+    assert service.config.ui == {"theme": "dark"}
+
+
+def test_invalid_config_keeps_previous(tmp_path):
+    default = tmp_path / "default.json"
+    user = tmp_path / "user.json"
+    _write(default, {"app_name": "app"})
+    service = ConfigService(default, user)
+
+    user.write_text("{broken", encoding="utf-8")
+    assert service.reload() == {}
+    assert service.config.app_name == "app"
+
+
+def test_watcher_picks_up_changes(tmp_path):
+    default = tmp_path / "default.json"
+    _write(default, {"app_name": "app"})
+    service = ConfigService(default, tmp_path / "user.json")
+    service.start_watching(interval=0.01)
+    try:
+        _write(tmp_path / "user.json", {"app_name": "renamed"})
+        deadline = time.time() + 2
+        while service.config.app_name != "renamed" and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        service.close()
+    assert service.config.app_name == "renamed"
+
+
+def test_diff_configs_reports_changed_keys():
+    old = load_config()
+    new = old.model_copy(update={"app_name": "other"})
+    assert diff_configs(old, new) == {"app_name": (old.app_name, "other")}
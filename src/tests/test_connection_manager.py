@@ -9,6 +9,7 @@ import pytest
 sys.path.append(str(Path(__file__).resolve().parents[2] / "src"))
 
 from core.crypto import CryptoManager
+from core.events import EventBus
 from core.storage import DB_PATH, get_connection, init_db
 from modules.datasource import ConnectionManager, ConnectionProfile
 
@@ -80,6 +81,29 @@ def test_delete_profile_removes_secrets():
     manager.conn.close()
 
 
+def test_update_and_delete_emit_connection_events():
+    manager = _prepare_manager()
+    profile = ConnectionProfile(
+        name="p4",
+        server="srv",
+        database="db",
+        auth="sql",
+        username="u",
+        password="p",
+    )
+    manager.create(profile)
+    pid = profile.id
+    events = []
+    manager.bus = EventBus()
+    for name in ("connection:changed", "connection:deleted"):
+        manager.bus.subscribe(name, lambda profile_id, name=name: events.append((name, profile_id)))
+    profile.database = "other"
+    manager.update(profile)
+    manager.delete(pid)
+    assert events == [("connection:changed", pid), ("connection:deleted", pid)]
+    manager.conn.close()
+
+
 def test_test_connection_handles_error(monkeypatch):
     manager = _prepare_manager()
     profile = ConnectionProfile(
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import sys
+import threading
+import time
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).resolve().parents[2] / "src"))
@@ -10,6 +13,7 @@ sys.path.append(str(Path(__file__).resolve().parents[2] / "src"))
 import pytest
 
 from core.container import (
+    CircularDependencyError,
     Container,
     EncryptionManager,
     LocalDBManager,
@@ -59,3 +63,224 @@ def test_default_services_registered():
     assert isinstance(log, logging.Logger)
     assert isinstance(enc, EncryptionManager)
     assert isinstance(db, LocalDBManager)
+
+
+def test_concurrent_get_builds_single_instance():
+    calls = {"count": 0}
+    barrier = threading.Barrier(8)
+
+    def provider() -> object:
+        calls["count"] += 1
+        time.sleep(0.05)
+        return object()
+
+    c = Container()
+    c.register("slow", provider)
+    results = []
+
+    def worker() -> None:
+        barrier.wait()
+        results.append(c.get("slow"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls["count"] == 1
+    assert all(r is results[0] for r in results)
+    assert "slow" in c.timings()["app"]
+
+
+def test_aget_awaits_async_provider_once():
+    calls = {"count": 0}
+
+    async def provider() -> object:
+        calls["count"] += 1
+        await asyncio.sleep(0.01)
+        return object()
+
+    c = Container()
+    c.register("async", provider)
+
+    async def run() -> list:
+        return await asyncio.gather(*(c.aget("async") for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert calls["count"] == 1
+    assert all(r is results[0] for r in results)
+    assert c.get("async") is results[0]
+
+
+def test_aget_shares_one_build_across_event_loops():
+    calls = {"count": 0}
+    started = threading.Event()
+
+    async def provider() -> object:
+        calls["count"] += 1
+        started.set()
+        await asyncio.sleep(0.1)
+        return object()
+
+    c = Container()
+    c.register("async", provider)
+    results: dict = {}
+
+    def run(slot: str) -> None:
+        try:
+            results[slot] = asyncio.run(c.aget("async"))
+        except Exception as exc:  # noqa: BLE001
+            results[slot] = exc
+
+    first = threading.Thread(target=run, args=("first",))
+    first.start()
+    assert started.wait(5)
+    second = threading.Thread(target=run, args=("second",))
+    second.start()
+    first.join(5)
+    second.join(5)
+
+    assert calls["count"] == 1
+    assert results["first"] is results["second"] is c.get("async")
+
+
+def test_get_rejects_unresolved_async_provider():
+    async def provider() -> object:
+        return object()
+
+    c = Container()
+    c.register("async", provider)
+
+    with pytest.raises(TypeError):
+        c.get("async")
+
+
+def test_circular_dependency_detected():
+    c = Container()
+    c.register("a", lambda: c.get("b"))
+    c.register("b", lambda: c.get("a"))
+
+    with pytest.raises(CircularDependencyError):
+        c.get("a")
+
+
+def test_warm_up_respects_dependencies_and_runs_in_parallel():
+    started: dict = {}
+
+    def make(name: str, delay: float = 0.1):
+        def provider() -> str:
+            started[name] = time.perf_counter()
+            time.sleep(delay)
+            return name
+
+        return provider
+
+    c = Container()
+    c.register("a", make("a"), eager=True)
+    c.register("b", make("b"), eager=True)
+    c.register("c", lambda: c.get("a") + c.get("b"), depends_on=("a", "b"))
+
+    begin = time.perf_counter()
+    errors = c.warm_up(["c"]).result(timeout=5)
+    elapsed = time.perf_counter() - begin
+
+    assert errors == {}
+    assert c.get("c") == "ab"
+    assert elapsed < 0.19
+    assert c.dependencies("c") == ("a", "b")
+
+
+def test_warm_up_reports_failures():
+    def broken() -> None:
+        raise RuntimeError("boom")
+
+    c = Container()
+    c.register("ok", lambda: 1, eager=True)
+    c.register("broken", broken, eager=True)
+
+    errors = c.warm_up().result(timeout=5)
+
+    assert set(errors) == {"broken"}
+    assert c.get("ok") == 1
+
+
+class Resource:
+    def __init__(self, name: str, log: list) -> None:
+        self.name = name
+        self.log = log
+
+    def close(self) -> None:
+        self.log.append(self.name)
+
+
+def test_clear_disposes_in_reverse_creation_order():
+    closed: list = []
+    c = Container()
+    c.register("first", lambda: Resource("first", closed))
+    c.register("second", lambda: Resource("second", closed))
+    c.register("custom", lambda: "value", dispose=lambda v: closed.append(v))
+
+    c.get("first")
+    c.get("custom")
+    c.get("second")
+    c.clear(scope="app")
+
+    assert closed == ["second", "value", "first"]
+    assert c.get("first") is not None
+
+
+def test_open_scope_resolves_parent_services_and_closes_own():
+    closed: list = []
+    c = Container()
+    c.register("shared", lambda: Resource("shared", closed))
+    c.register("conn", lambda: Resource("conn", closed), scope="query")
+
+    with c.open_scope("query") as first, c.open_scope("query") as second:
+        assert first.get("conn") is not second.get("conn")
+        assert first.get("shared") is c.get("shared")
+
+    assert closed == ["conn", "conn"]
+    assert c.leak_report() == []
+    with pytest.raises(RuntimeError):
+        first.get("conn")
+
+
+def test_clearing_parent_closes_child_scopes():
+    closed: list = []
+    c = Container()
+    c.register("shared", lambda: Resource("shared", closed))
+    c.register("conn", lambda: Resource("conn", closed), scope="module")
+    c.register("other", lambda: Resource("other", closed), scope="other")
+
+    child = c.open_scope("module")
+    child.get("conn")
+    child.get("shared")
+    unrelated = c.open_scope("module", parent="other")
+    c.clear(scope="app")
+
+    assert closed == ["conn", "shared"]
+    assert child.closed and not unrelated.closed
+    with pytest.raises(RuntimeError):
+        child.get("conn")
+    unrelated.close()
+
+
+def test_module_scope_provides_task_group():
+    assert container.is_registered("tasks", scope="module")
+    assert not container.is_registered("tasks")
+
+
+def test_shutdown_reports_open_scopes():
+    closed: list = []
+    c = Container()
+    c.register("conn", lambda: Resource("conn", closed), scope="module")
+    c.register("db", lambda: Resource("db", closed))
+
+    c.get("db")
+    c.open_scope("module").get("conn")
+
+    report = c.shutdown()
+
+    assert report == ["module:conn (Resource)"]
+    assert closed == ["conn", "db"]
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from src.modules.datasets import CycleError, critical_path, run_graph, topological_order
+
+# c and d depend on a and b; e depends on d.
+GRAPH = {"c": ["a", "b"], "d": ["a"], "e": ["d"]}
+
+
+def test_topological_order_puts_dependencies_first():
+    order = topological_order(GRAPH)
+    assert sorted(order) == ["a", "b", "c", "d", "e"]
+    for node, deps in GRAPH.items():
+        assert all(order.index(dep) < order.index(node) for dep in deps)
+
+
+def test_cycle_is_reported():
+    with pytest.raises(CycleError) as info:
+        topological_order({"a": ["b"], "b": ["c"], "c": ["a"], "d": []})
+    assert info.value.cycle[0] == info.value.cycle[-1]
+    assert set(info.value.cycle) == {"a", "b", "c"}
+
+
+def test_critical_path_follows_heaviest_chain():
+    length, path = critical_path(GRAPH, {"a": 1, "b": 5, "c": 1, "d": 2, "e": 2})
+    assert (length, path) == (6, ["b", "c"])
+    length, path = critical_path(GRAPH, {"a": 3, "b": 1, "c": 1, "d": 2, "e": 2})
+    assert (length, path) == (7, ["a", "d", "e"])
+
+
+def test_graph_runs_in_critical_path_time():
+    delay = 0.05
+    finished = []
+
+    def work(node, upstream):
+        assert all(run.status == "done" for run in upstream.values())
+        time.sleep(delay)
+        finished.append(node)
+        return node
+
+    started = time.perf_counter()
+    runs = run_graph(GRAPH, work, jobs=4)
+    elapsed = time.perf_counter() - started
+    assert all(run.status == "done" and run.result == node for node, run in runs.items())
+    # a | b -> c | d -> e: three levels instead of five sequential jobs.
+    assert elapsed < 4 * delay
+    assert finished.index("e") > finished.index("d") > finished.index("a")
+    assert runs["e"].ready_at == pytest.approx(runs["d"].finished_at)
+
+
+def test_group_limit_and_failures():
+    lock = threading.Lock()
+    active = {"x": 0}
+    peak = {"x": 0}
+    done = []
+
+    def work(node, upstream):
+        if node == "a":
+            raise RuntimeError("boom")
+        with lock:
+            active["x"] += 1
+            peak["x"] = max(peak["x"], active["x"])
+        time.sleep(0.02)
+        with lock:
+            active["x"] -= 1
+        return node
+
+    graph = {"a": [], "b": [], "c": [], "d": [], "e": ["a"], "f": ["e"]}
+    runs = run_graph(
+        graph,
+        work,
+        jobs=4,
+        group=lambda node: "x",
+        group_limit=2,
+        on_done=lambda node, run: done.append((node, run.status)),
+    )
+    assert peak["x"] == 2
+    assert runs["a"].status == "failed" and str(runs["a"].error) == "boom"
+    assert runs["e"].status == runs["f"].status == "blocked"
+    assert runs["f"].started_at is None
+    assert sorted(done) == sorted((node, run.status) for node, run in runs.items())
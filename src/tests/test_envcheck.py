@@ -1,17 +1,24 @@
 from __future__ import annotations
 
 import sys
+import threading
+import time
 from pathlib import Path
 
 import pytest
 
 sys.path.append(str(Path(__file__).resolve().parents[2] / "src"))
 
+from conftest import FakeConnection
+from modules.datasource import ConnectionProfile
 from modules.envcheck import (
     CheckStatus,
     check_directory_writable,
     check_odbc_driver,
     check_python_version,
+    clear_cache,
+    probe_connections,
+    run_checks,
 )
 
 
@@ -51,3 +58,143 @@ def test_check_python_version(monkeypatch):
     monkeypatch.setattr(sys, "version_info", V())
     result = check_python_version()
     assert result.status is CheckStatus.ERROR
+
+
+def test_run_checks_cached_and_concurrent(monkeypatch):
+    calls = []
+    threads = set()
+
+    def fake_run(args):
+        calls.append(args)
+        threads.add(threading.current_thread().name)
+        time.sleep(0.05)
+        return DummyProcess("ODBC Driver 18 for SQL Server")
+
+    monkeypatch.setattr("modules.envcheck.checks._run_odbcinst", fake_run)
+    clear_cache()
+    first = run_checks()
+    second = run_checks()
+    assert [r.name for r in first] == [r.name for r in second]
+    assert first[0].status is CheckStatus.OK
+    assert len(calls) == 1
+    assert all(name.startswith("envcheck") for name in threads)
+
+    run_checks(refresh=True)
+    assert len(calls) == 2
+    clear_cache()
+
+
+class FakeManager:
+    delays = {"fast": 0.0, "slow": 0.02, "hung": 5.0}
+
+    def __init__(self) -> None:
+        self.timeouts = {}
+
+    def connect(self, profile):
+        self.timeouts[profile.name] = profile.connect_timeout
+        if profile.name == "down":
+            raise RuntimeError("login failed")
+        return FakeConnection([("ok",)], [(1,)], delay=self.delays[profile.name])
+
+
+def test_probe_connections_parallel_with_timeout(monkeypatch):
+    monkeypatch.setattr("modules.envcheck.checks.SLOW_CONNECTION_MS", 10.0)
+    manager = FakeManager()
+    profiles = [
+        ConnectionProfile(name=name, server="srv", database="db", connect_timeout=30)
+        for name in ("fast", "slow", "down", "hung")
+    ]
+
+    started = time.monotonic()
+    results = probe_connections(manager, profiles, timeout=0.5)
+    assert time.monotonic() - started < 1.5
+
+    fast, slow, down, hung = results
+    assert fast.status is CheckStatus.OK and fast.duration_ms is not None
+    assert slow.status is CheckStatus.WARNING
+    assert down.status is CheckStatus.ERROR and "login failed" in down.message
+    assert hung.status is CheckStatus.ERROR and "Нет ответа" in hung.message
+    assert manager.timeouts["fast"] == 1  # the probe bound overrides the profile timeout
+
+
+def test_widget_runs_checks_in_background(monkeypatch):
+    import os
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtCore import QEvent
+    from PySide6.QtWidgets import QApplication
+
+    from core.tasks import TaskRunner
+    from modules.envcheck import EnvCheckWidget
+
+    app = QApplication.instance() or QApplication([])
+    monkeypatch.setattr(
+        "modules.envcheck.checks._run_odbcinst",
+        lambda args: DummyProcess("ODBC Driver 18 for SQL Server"),
+    )
+    clear_cache()
+
+    class Manager(FakeManager):
+        def list(self):
+            return [ConnectionProfile(name="fast", server="srv", database="db")]
+
+    runner = TaskRunner(max_workers=2)
+    widget = EnvCheckWidget(runner=runner, connections=Manager())
+    assert widget.status_labels["odbc"].text().endswith("...")
+
+    deadline = time.monotonic() + 5
+    while not widget.repeat_btn.isEnabled() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    while widget.server_labels[0].text().endswith("...") and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    assert widget.status_labels["odbc"].text() == "ODBC драйвер: Драйвер найден"
+    assert widget.server_labels[0].text().startswith("Сервер fast: подключение")
+    runner.shutdown()
+    widget.deleteLater()
+    app.sendPostedEvents(None, QEvent.DeferredDelete)
+    clear_cache()
+
+
+def test_diagnostics_report(tmp_path, monkeypatch):
+    import json
+    import sqlite3
+
+    from modules.envcheck import diagnostics, format_report, run_diagnostics, write_report
+
+    monkeypatch.setattr(
+        "modules.envcheck.checks._run_odbcinst",
+        lambda args: DummyProcess("ODBC Driver 18 for SQL Server\nODBC Driver 17 for SQL Server"),
+    )
+    (tmp_path / "data").mkdir()
+    app_db = tmp_path / "data" / "app.db"
+    conn = sqlite3.connect(app_db)
+    conn.execute("CREATE TABLE profiles (id INTEGER)")
+    conn.close()
+    before = app_db.read_bytes()
+
+    results = run_diagnostics(tmp_path, size_mb=1)
+    by_name = {r.name.split(":")[0]: r for r in results}
+    assert by_name["Последовательная запись"].value > 0
+    assert by_name["Запись с fsync"].unit == "мс"
+    assert by_name["Фиксация транзакции SQLite"].value is not None
+    assert by_name["MS ODBC драйверы"].message == "Установлены: 17, 18"
+    # The commit latency is measured on a scratch database, not on app.db.
+    assert app_db.read_bytes() == before
+    assert [p.name for p in (tmp_path / "data").iterdir()] == ["app.db"]
+    assert not list((tmp_path / "cache").iterdir())
+
+    class Manager(FakeManager):
+        def connect(self, profile):
+            return FakeConnection([("id",), ("name",), ("created",)], [(1, "x", None)] * 12_000)
+
+    profile = ConnectionProfile(name="fast", server="srv", database="db")
+    fetch = diagnostics.measure_fetch_rate(Manager(), profile)
+    assert fetch.value > 0 and fetch.message.startswith("12000 строк")
+
+    text = format_report(results + [fetch])
+    assert "Скорость выборки: fast" in text
+    report = write_report(results, tmp_path / "report.json")
+    payload = json.loads(report.read_text(encoding="utf-8"))
+    assert payload["results"][0]["status"] in {"ok", "warning"}
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import gc
+import sys
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2] / "src"))
+
+from core.events import EventBus, QueuedDispatcher
+
+
+class Widget:
+    def __init__(self) -> None:
+        self.values: list = []
+
+    def on_event(self, value) -> None:  # noqa: ANN001
+        self.values.append(value)
+
+
+def test_emit_calls_handlers_synchronously():
+    bus = EventBus()
+    received = []
+    bus.subscribe("evt", lambda value: received.append(value))
+
+    bus.emit("evt", 1)
+    bus.emit("other", 2)
+
+    assert received == [1]
+
+
+def test_unsubscribe_stops_delivery():
+    bus = EventBus()
+    received = []
+    subscription = bus.subscribe("evt", received.append)
+
+    bus.emit("evt", 1)
+    subscription.unsubscribe()
+    bus.emit("evt", 2)
+
+    assert received == [1]
+    assert not subscription.active
+
+
+def test_bound_methods_are_weak():
+    bus = EventBus()
+    widget = Widget()
+    subscription = bus.subscribe("evt", widget.on_event)
+
+    bus.emit("evt", 1)
+    assert widget.values == [1]
+
+    del widget
+    gc.collect()
+
+    assert not subscription.active
+    bus.emit("evt", 2)
+
+
+def test_queued_delivery_runs_on_target_thread():
+    bus = EventBus()
+    dispatcher = QueuedDispatcher()
+    threads = []
+    bus.subscribe("evt", lambda: threads.append(threading.get_ident()), target=dispatcher)
+
+    worker = threading.Thread(target=bus.emit, args=("evt",))
+    worker.start()
+    worker.join()
+
+    assert threads == []
+    assert dispatcher.process_pending() == 1
+    assert threads == [threading.get_ident()]
+
+
+def test_coalesced_events_keep_latest_value():
+    bus = EventBus()
+    dispatcher = QueuedDispatcher()
+    received = []
+    bus.subscribe("progress", lambda key, value: received.append((key, value)), target=dispatcher)
+
+    for value in range(100):
+        bus.emit_coalesced("progress", "q1", "q1", value)
+    bus.emit_coalesced("progress", "q2", "q2", 5)
+
+    assert dispatcher.process_pending() == 2
+    assert received == [("q1", 99), ("q2", 5)]
+
+
+def test_wildcard_subscriptions():
+    bus = EventBus()
+    single, deep, exact = [], [], []
+    bus.subscribe("module:*", lambda m: single.append(m))
+    bus.subscribe("query:**", lambda m: deep.append(m))
+    bus.subscribe("module:mounted", lambda m: exact.append(m))
+
+    bus.emit("module:mounted", 1)
+    bus.emit("module:changed", 2)
+    bus.emit("module:a:b", 3)
+    bus.emit("query", 4)
+    bus.emit("query:progress:rows", 5)
+
+    assert single == [1, 2]
+    assert deep == [4, 5]
+    assert exact == [1]
+
+
+def test_handler_cache_invalidated_on_subscribe():
+    bus = EventBus()
+    received = []
+    bus.emit("module:mounted", 0)
+    assert bus.handlers("module:mounted") == ()
+
+    subscription = bus.subscribe("module:*", received.append)
+    bus.emit("module:mounted", 1)
+    assert bus.handlers("module:mounted") == (subscription,)
+
+    subscription.unsubscribe()
+    bus.emit("module:mounted", 2)
+    assert received == [1]
+    assert bus._root.children == {}
+
+
+def test_stats_record_handlers_and_warn_on_slow(caplog):
+    bus = EventBus()
+    bus.subscribe("module:mounted", lambda: None)
+    bus.emit("module:mounted")
+    assert bus.stats() == {"events": {}, "handlers": {}}
+
+    bus.enable_stats(budget_ms=1)
+
+    def slow() -> None:
+        import time
+
+        time.sleep(0.005)
+
+    bus.subscribe("module:mounted", slow)
+    with caplog.at_level("WARNING"):
+        bus.emit("module:mounted")
+
+    stats = bus.stats()
+    assert stats["events"]["module:mounted"]["count"] == 1
+    slow_stats = [v for k, v in stats["handlers"].items() if k.endswith(".slow")]
+    assert slow_stats and slow_stats[0]["max"] >= 0.005
+    assert "slow" in caplog.text
+    assert "module:mounted" in bus.dump_stats()
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import datetime as dt
+import gzip
+import lzma
+import sys
+import threading
+import uuid
+from decimal import Decimal
+from pathlib import Path
+
+import openpyxl
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from conftest import FakeCursor
+from src.modules.datasets import Sink, TextSink, open_sink, tee, write_csv, write_xlsx
+
+
+def test_write_xlsx_converts_columns(tmp_path):
+    ident = uuid.UUID(int=1)
+    description = [
+        ("id", int),
+        ("name", str),
+        ("amount", Decimal),
+        ("created", dt.datetime),
+        ("blob", bytes),
+        ("guid", uuid.UUID),
+        ("other", None),
+    ]
+    rows = [
+        (1, "=SUM(A1)", Decimal("1.50"), dt.datetime(2024, 1, 2, 3, 4, 5), b"\x01\xff", ident, b"\x02"),
+        (2, "bad\x01char", None, None, None, None, "text"),
+    ]
+    path = tmp_path / "out.xlsx"
+    assert write_xlsx(FakeCursor(description, rows), path, fetch_size=1) == 2
+
+    sheet = openpyxl.load_workbook(path).active
+    values = [[cell.value for cell in row] for row in sheet.iter_rows()]
+    assert values[0] == ["id", "name", "amount", "created", "blob", "guid", "other"]
+    assert values[1] == [1, "=SUM(A1)", 1.5, dt.datetime(2024, 1, 2, 3, 4, 5), "0x01FF", str(ident), "0x02"]
+    assert sheet["B2"].data_type == "s"
+    assert values[2] == [2, "badchar", None, None, None, None, "text"]
+
+
+def test_write_xlsx_rolls_over_sheets(tmp_path):
+    rows = [(i,) for i in range(7)]
+    path = tmp_path / "out.xlsx"
+    assert write_xlsx(FakeCursor([("n", int)], rows), path, fetch_size=3, sheet_rows=4) == 7
+
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    assert workbook.sheetnames == ["Data", "Data (2)", "Data (3)"]
+    sheets = [[row[0] for row in ws.iter_rows(values_only=True)] for ws in workbook.worksheets]
+    assert sheets == [["n", 0, 1, 2], ["n", 3, 4, 5], ["n", 6]]
+
+
+@pytest.mark.parametrize("suffix, opener", [(".csv", open), (".csv.gz", gzip.open), (".csv.xz", lzma.open)])
+def test_text_sink_compression(tmp_path, suffix, opener):
+    path = tmp_path / f"out{suffix}"
+    rows = [(i, f"name {i}") for i in range(1000)]
+    assert tee(FakeCursor([("id",), ("name",)], rows), [open_sink(path)], fetch_size=100) == 1000
+    with opener(path, "rt", encoding="utf-8", newline="") as fh:
+        lines = fh.read().splitlines()
+    assert lines[0] == "id,name" and lines[-1] == "999,name 999" and len(lines) == 1001
+
+
+def test_text_sink_writes_on_its_own_thread(tmp_path, monkeypatch):
+    writers = set()
+    original = TextSink._run
+
+    def run(self, columns):
+        writers.add(threading.current_thread())
+        original(self, columns)
+
+    monkeypatch.setattr(TextSink, "_run", run)
+    assert write_csv(FakeCursor([("n",)], [(1,), (2,)]), tmp_path / "out.tsv", delimiter="\t") == 2
+    assert threading.main_thread() not in writers and len(writers) == 1
+    assert (tmp_path / "out.tsv").read_bytes() == b"n\r\n1\r\n2\r\n"
+
+
+def test_tee_removes_all_outputs_on_failure(tmp_path):
+    class Failing(FakeCursor):
+        def fetchmany(self, size):
+            if self.fetches:
+                raise RuntimeError("connection lost")
+            return super().fetchmany(size)
+
+    paths = [tmp_path / "a.csv", tmp_path / "b.xlsx", tmp_path / "c.tsv.gz"]
+    cursor = Failing([("n", int)], [(i,) for i in range(10)])
+    with pytest.raises(RuntimeError):
+        tee(cursor, [open_sink(path) for path in paths], fetch_size=5)
+    assert not any(path.exists() for path in paths)
+
+
+def test_open_sink_rejects_unknown_suffix(tmp_path):
+    with pytest.raises(ValueError):
+        open_sink(tmp_path / "out.parquet")
+
+
+def test_sink_requires_the_write_hooks(tmp_path):
+    class Partial(Sink):
+        def _open(self, description):
+            pass
+
+    with pytest.raises(TypeError):
+        Partial(tmp_path / "out.csv")
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2] / "src"))
+
+from core.logger import (
+    CompressingRotatingFileHandler,
+    get_queue_handler,
+    setup_logging,
+    shutdown_logging,
+)
+
+
+def test_json_lines_written_by_background_listener(tmp_path):
+    root = setup_logging(tmp_path, json_lines=True)
+    try:
+        assert get_queue_handler() in root.handlers
+        logging.getLogger("query").info(
+            "выполнен запрос", extra={"query_id": "q1", "duration_ms": 12.5}
+        )
+    finally:
+        shutdown_logging()
+        root.removeHandler(get_queue_handler())
+
+    lines = (tmp_path / "app.jsonl").read_text(encoding="utf-8").splitlines()
+    record = json.loads(lines[-1])
+    assert record["message"] == "выполнен запрос"
+    assert record["logger"] == "query"
+    assert record["query_id"] == "q1"
+    assert record["duration_ms"] == 12.5
+
+
+def test_rotated_files_are_compressed(tmp_path):
+    path = tmp_path / "app.log"
+    handler = CompressingRotatingFileHandler(path, maxBytes=50, backupCount=2, encoding="utf-8")
+    try:
+        for i in range(5):
+            handler.emit(logging.makeLogRecord({"msg": f"строка {i} " * 5}))
+    finally:
+        handler.close()
+
+    rotated = tmp_path / "app.log.1.gz"
+    assert rotated.exists()
+    assert "строка" in gzip.decompress(rotated.read_bytes()).decode("utf-8")
+    assert not (tmp_path / "app.log.1").exists()
+
+
+def test_exception_keeps_its_own_field(tmp_path):
+    for json_lines in (True, False):
+        root = setup_logging(tmp_path, json_lines=json_lines)
+        try:
+            try:
+                1 / 0
+            except ZeroDivisionError:
+                logging.getLogger("task").exception("сбой задачи %s", 7)
+        finally:
+            shutdown_logging()
+            root.removeHandler(get_queue_handler())
+
+    record = json.loads((tmp_path / "app.jsonl").read_text(encoding="utf-8").splitlines()[-1])
+    assert record["message"] == "сбой задачи 7"
+    assert record["exc"].startswith("Traceback") and "ZeroDivisionError" in record["exc"]
+    text = (tmp_path / "app.log").read_text(encoding="utf-8")
+    assert "сбой задачи 7" in text and text.count("ZeroDivisionError") == 1
+
+
+def test_records_after_shutdown_are_written_directly(tmp_path):
+    root = setup_logging(tmp_path)
+    try:
+        logging.getLogger("app.exit").info("до остановки")
+    finally:
+        shutdown_logging()
+    try:
+        logging.getLogger("app.exit").warning("после остановки")
+        text = (tmp_path / "app.log").read_text(encoding="utf-8")
+        assert "до остановки" in text and "после остановки" in text
+    finally:
+        root.removeHandler(get_queue_handler())
@@ -5,7 +5,7 @@ from pathlib import Path
 
 sys.path.append(str(Path(__file__).resolve().parents[2] / "src"))
 
-from core.module_api import BaseModule
+from core.module_api import BaseModule, ModuleProfiler
 
 
 class DummyModule(BaseModule):
@@ -25,3 +25,33 @@ def test_default_widget_methods():
     assert module.get_sidebar_items() == []
     assert module.get_properties_widget(None) is None
     assert module.get_preview_widget(None) is None
+
+
+def test_profiler_disabled_records_nothing():
+    profiler = ModuleProfiler()
+    with profiler.measure(DummyModule(), "mount", memory=True):
+        pass
+    profiler.record_widgets(DummyModule(), 3)
+    assert profiler.report() == {}
+
+
+def test_profiler_records_phases_memory_and_widgets(tmp_path):
+    profiler = ModuleProfiler()
+    profiler.enable()
+    module = DummyModule()
+    leak = []
+    try:
+        with profiler.measure(module, "mount", memory=True):
+            leak.append(bytearray(256 * 1024))
+        with profiler.measure(module, "unmount", memory=True):
+            pass
+        profiler.record_widgets(module, 2)
+    finally:
+        profiler.disable()
+
+    data = profiler.report()["dummy"]
+    assert data["phases"]["mount"]["count"] == 1
+    assert data["memory_growth"] >= 256 * 1024
+    assert data["widgets_alive"] == 2
+    assert "dummy" in profiler.format_report()
+    assert profiler.dump(tmp_path / "profile.json").exists()
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import datetime as dt
+import pickle
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from conftest import FakeConnection, FakeCursor
+from src.modules.datasets import partition
+from src.modules.datasets import (
+    PartitionedCursor,
+    fetch_partitioned,
+    partition_bounds,
+    range_queries,
+    referenced_tables,
+    split_range,
+)
+from src.modules.datasource import ServerSlots
+
+TABLE = [(i, f"row {i}") for i in range(1, 101)] + [(None, "no key")]
+DESCRIPTION = [("id", int), ("name", str)]
+
+
+def _key(row):
+    return (row[0] is not None, row[0] or 0)
+
+
+class Cursor(FakeCursor):
+    """Evaluates the queries built by ``partition`` against ``TABLE``."""
+
+    def __init__(self, server) -> None:
+        super().__init__(respond=self._evaluate)
+        self.server = server
+
+    def _evaluate(self, sql, params):
+        self.server.queries.append((sql, params))
+        if "MIN(" in sql:
+            keys = [row[0] for row in TABLE if row[0] is not None]
+            return [(min(keys), max(keys))]
+        if "IS NULL" in sql:
+            rows = [r for r in TABLE if r[0] is None or r[0] <= params[0]]
+        elif "AND" in sql:
+            rows = [r for r in TABLE if r[0] is not None and params[0] < r[0] <= params[1]]
+        elif params:
+            rows = [r for r in TABLE if r[0] is not None and r[0] > params[0]]
+        else:
+            rows = list(TABLE)
+        self.description = DESCRIPTION
+        if self.server.fail_above is not None and params and params[0] >= self.server.fail_above:
+            raise RuntimeError("connection lost")
+        # Without ORDER BY the server is free to return any order.
+        return sorted(rows, key=_key) if "ORDER BY" in sql else rows[::-1]
+
+    def fetchmany(self, size):
+        time.sleep(self.server.delay)
+        return super().fetchmany(size)
+
+
+class Connection(FakeConnection):
+    cursor_class = Cursor
+
+    def __init__(self, server) -> None:
+        super().__init__(server)
+        self.server = server
+        with server._lock:
+            server.open += 1
+            server.peak = max(server.peak, server.open)
+
+    def close(self):
+        super().close()
+        with self.server._lock:
+            self.server.open -= 1
+
+
+class Server:
+    def __init__(self, delay: float = 0.0, fail_above=None) -> None:
+        self.delay = delay
+        self.fail_above = fail_above
+        self.queries = []
+        self.open = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def connect(self):
+        return Connection(self)
+
+
+def _drain(cursor):
+    rows = []
+    try:
+        while True:
+            batch = cursor.fetchmany()
+            if not batch:
+                return rows
+            rows.extend(batch)
+    finally:
+        cursor.close()
+
+
+def test_bounds_split_key_range_and_build_range_queries():
+    server = Server()
+    bounds = partition_bounds(server.connect().cursor(), "SELECT id, name FROM t ORDER BY id", "id", 4)
+    assert bounds == [25, 50, 75]
+    assert server.queries[0][0] == (
+        "SELECT MIN(src.[id]), MAX(src.[id]) FROM (SELECT id, name FROM t) AS src"
+    )
+    assert partition_bounds(server.connect().cursor(), "SELECT 1", "id", 1) == []
+    assert split_range(1, 3, 8) == [1, 2]
+    assert split_range(dt.date(2024, 1, 1), dt.date(2024, 1, 5), 2) == [dt.date(2024, 1, 3)]
+    assert split_range("a", "z", 4) == [] and split_range(5, 5, 4) == []
+
+    queries = range_queries("SELECT id, name FROM t", "id", bounds)
+    assert [params for _, params in queries] == [(25,), (25, 50), (50, 75), (75,)]
+    assert "src.[id] <= ? OR src.[id] IS NULL" in queries[0][0]
+    assert all(sql.endswith("ORDER BY src.[id]") for sql, _ in queries)
+    assert "ORDER BY" not in range_queries("SELECT 1", "id", bounds, ordered=False)[1][0]
+
+    assert referenced_tables(
+        "SELECT o.id FROM sales.[Order Lines] o JOIN dbo.items i ON i.id = o.item JOIN t ON 1 = 1"
+    ) == [("sales", "Order Lines"), ("dbo", "items"), (None, "t")]
+
+
+def test_ordered_fetch_keeps_key_order_and_spills_to_disk():
+    server = Server()
+    bounds = [25, 50, 75]
+    cursor = PartitionedCursor(
+        server.connect, range_queries("SELECT * FROM t", "id", bounds), fetch_size=7, memory_batches=1
+    )
+    assert cursor.description == DESCRIPTION
+    assert _drain(cursor) == sorted(TABLE, key=_key)
+    assert server.open == 0
+
+
+def test_spilling_one_part_does_not_block_the_others(monkeypatch):
+    gate = threading.Event()
+    stalled = []
+    write = partition._Spool.write
+
+    def slow(spool, data):
+        if pickle.loads(data)[0][0] > 50:
+            stalled.append(not gate.wait(5))
+        write(spool, data)
+
+    monkeypatch.setattr(partition._Spool, "write", slow)
+    cursor = PartitionedCursor(
+        Server().connect, range_queries("SELECT * FROM t", "id", [50]), fetch_size=7, memory_batches=1
+    )
+    rows = []
+    while len(rows) < 51:
+        rows.extend(cursor.fetchmany())
+    gate.set()
+    assert rows + _drain(cursor) == sorted(TABLE, key=_key)
+    assert stalled and not any(stalled)
+
+
+def test_unordered_fetch_returns_every_row():
+    server = Server(delay=0.001)
+    cursor = fetch_partitioned(server.connect, "SELECT * FROM t", "id", 4, ordered=False, fetch_size=5)
+    rows = _drain(cursor)
+    assert sorted(rows, key=_key) == sorted(TABLE, key=_key)
+    assert len(server.queries) == 5 and server.open == 0
+
+
+def test_slots_cap_connections_per_server():
+    server = Server(delay=0.002)
+    slots = ServerSlots(limit=2)
+    cursor = fetch_partitioned(
+        server.connect, "SELECT * FROM t", "id", 8, fetch_size=3, slot=lambda: slots.acquire("SRV")
+    )
+    assert len(_drain(cursor)) == len(TABLE)
+    assert server.peak == 2
+    assert slots.busy("srv") == 0
+
+
+def test_part_error_reaches_the_consumer():
+    server = Server(fail_above=50)
+    cursor = fetch_partitioned(server.connect, "SELECT * FROM t", "id", 4, fetch_size=5)
+    with pytest.raises(RuntimeError, match="connection lost"):
+        _drain(cursor)
+    assert server.open == 0
@@ -1,5 +1,9 @@
+import json
+import sys
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parents[2] / "src"))
+
 from core.module_api import BaseModule
 from core.registry import autodiscover_modules, registry
 
@@ -32,8 +36,10 @@ def test_autodiscover(tmp_path):
     )
 
     try:
-        autodiscover_modules()
+        # The cache goes to tmp_path so the real cache/modules.json is untouched.
+        autodiscover_modules(cache_path=tmp_path / "modules.json")
         assert registry.get("test") is not None
+        assert "testmod" in json.loads((tmp_path / "modules.json").read_text())["entries"]
     finally:
         for file in modules_dir.glob("**/*"):
             if file.is_file():
@@ -42,3 +48,30 @@ def test_autodiscover(tmp_path):
             if directory.is_dir():
                 directory.rmdir()
         registry._modules.clear()
+
+
+def test_manifest_modules_are_not_imported(tmp_path):
+    registry._modules.clear()
+    registry._infos.clear()
+    modules_dir = tmp_path / "modules"
+    (modules_dir / "lazy").mkdir(parents=True)
+    (modules_dir / "lazy" / "manifest.json").write_text(
+        json.dumps({"id": "lazy", "title": "Lazy", "icon": "lazy.svg"})
+    )
+    cache_path = tmp_path / "modules.json"
+
+    infos = autodiscover_modules(modules_dir, cache_path)
+
+    assert [(i.id, i.title, i.icon) for i in infos] == [("lazy", "Lazy", "lazy.svg")]
+    assert not registry.is_loaded("lazy")
+    assert "modules.lazy.module" not in sys.modules
+
+    # Повторный запуск берёт метаданные из кеша, пока файлы не менялись.
+    cache = json.loads(cache_path.read_text())
+    cache["entries"]["lazy"]["info"]["title"] = "Cached"
+    cache_path.write_text(json.dumps(cache))
+    registry._infos.clear()
+
+    infos = autodiscover_modules(modules_dir, cache_path)
+    assert infos[0].title == "Cached"
+    registry._infos.clear()
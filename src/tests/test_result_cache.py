@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import datetime as dt
+import json
+import os
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from conftest import FakeCursor
+from src.modules.datasets import (
+    ResultCache,
+    TextSink,
+    cache_key,
+    normalize_sql,
+    tee,
+    watermark_query,
+    write_csv,
+)
+
+
+DESCRIPTION = [
+    ("id", int, None, None, None, None, False),
+    ("name", str, None, None, None, None, True),
+    ("amount", Decimal, None, None, 10, 2, True),
+    ("created", dt.datetime, None, None, None, None, True),
+    ("day", dt.date, None, None, None, None, True),
+    ("at", dt.time, None, None, None, None, True),
+    ("ratio", float, None, None, None, None, True),
+    ("flag", bool, None, None, None, None, True),
+    ("blob", bytes, None, None, None, None, True),
+    ("big", Decimal, None, None, 38, 4, True),
+    ("untyped", None, None, None, None, None, True),
+]
+
+
+def _row(i: int):
+    return (
+        i,
+        None if i % 5 == 0 else f"name {i % 3}",
+        None if i % 7 == 0 else Decimal(i) / 4,
+        dt.datetime(2024, 1, 1) + dt.timedelta(minutes=i),
+        dt.date(2024, 1, 1) + dt.timedelta(days=i),
+        dt.time(i % 24, 30, 15, 250),
+        i / 3,
+        i % 2 == 0,
+        bytes([i % 256]),
+        Decimal("12345678901234567890.1234"),
+        None if i < 6 else "late",
+    )
+
+
+def test_roundtrip_preserves_values_and_nulls(tmp_path):
+    cache = ResultCache(tmp_path)
+    key = cache_key(1, "SELECT 1")
+    rows = [_row(i) for i in range(23)]
+    sink = cache.sink(key, profile_id=1)
+    assert tee(FakeCursor(DESCRIPTION, rows), [sink], fetch_size=4) == 23
+    assert sink.path == cache.path(key)
+    assert not [p for p in tmp_path.iterdir() if p.name.startswith(".")]
+
+    result = cache.get(key)
+    assert result.columns == [column[0] for column in DESCRIPTION]
+    assert len(result) == 23 and result.meta["profile_id"] == 1
+    assert [result.row(i) for i in range(23)] == rows
+    name = result.column(1)
+    assert name.encoding == "dictionary" and result.meta["columns"][1]["dictionary"] == 3
+    assert isinstance(result.column(0).values, np.memmap)
+    assert not result.meta["columns"][0]["nulls"]
+
+
+def test_high_cardinality_strings_switch_to_blob(tmp_path):
+    cache = ResultCache(tmp_path, max_dictionary=10)
+    rows = [(None if i == 3 else f"value {i}",) for i in range(50)]
+    tee(FakeCursor([("s", str)], rows), [cache.sink("k")], fetch_size=7)
+
+    result = cache.get("k")
+    assert result.column(0).encoding == "blob"
+    assert [result.value(i, 0) for i in range(50)] == [r[0] for r in rows]
+
+
+def test_argsort_and_reexport(tmp_path):
+    cache = ResultCache(tmp_path)
+    rows = [(3, "b"), (None, "a"), (1, "c"), (3, "a"), (2, None)]
+    tee(FakeCursor([("n", int), ("s", str)], rows), [cache.sink("k")])
+    result = cache.get("k")
+
+    assert result.argsort(0).tolist() == [1, 2, 4, 0, 3]
+    assert result.argsort(0, descending=True).tolist() == [0, 3, 4, 2, 1]
+    assert result.argsort(1).tolist() == [4, 1, 3, 0, 2]
+
+    path = tmp_path / "sorted.csv"
+    assert write_csv(result.cursor(result.argsort(1)), path) == 5
+    assert path.read_text(encoding="utf-8").splitlines() == ["n,s", "2,", ",a", "3,a", "3,b", "1,c"]
+
+
+def test_blob_argsort_matches_python_order(tmp_path):
+    cache = ResultCache(tmp_path, max_dictionary=2)
+    words = ["same prefix long tail b", "same prefix long tail a", "same prefix", "", "ёж", "z", "Z"]
+    rows = [(None if i % 9 == 4 else words[i * 5 % len(words)] + "!" * (i % 3),) for i in range(40)]
+    tee(FakeCursor([("s", str)], rows), [cache.sink("k")])
+    result = cache.get("k")
+    assert result.column(0).encoding == "blob"
+
+    def expected(descending):
+        present = [r for r in range(40) if rows[r][0] is not None]
+        present.sort(key=lambda r: rows[r][0], reverse=descending)
+        nulls = [r for r in range(40) if rows[r][0] is None]
+        return present + nulls if descending else nulls + present
+
+    # ``sorted`` is stable with ``reverse`` too, like ``argsort``.
+    assert result.argsort(0).tolist() == expected(False)
+    assert result.argsort(0, descending=True).tolist() == expected(True)
+
+
+def test_failed_fetch_keeps_previous_entry(tmp_path):
+    cache = ResultCache(tmp_path)
+    tee(FakeCursor([("n", int)], [(1,)]), [cache.sink("k")])
+
+    class Failing(FakeCursor):
+        def fetchmany(self, size):
+            raise RuntimeError("lost")
+
+    with pytest.raises(RuntimeError):
+        tee(Failing([("n", int)], []), [cache.sink("k")])
+    assert cache.get("k").row(0) == (1,)
+    assert [p.name for p in tmp_path.iterdir()] == ["k"]
+
+    cache.invalidate("k")
+    assert cache.get("k") is None
+
+
+def test_failed_replace_restores_previous_entry(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path)
+    tee(FakeCursor([("n", int)], [(1,)]), [cache.sink("k")])
+    replace = os.replace
+
+    def locked(src, dst):
+        if Path(dst).name == "k" and not str(src).endswith("-old"):
+            raise PermissionError("in use")
+        replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", locked)
+    with pytest.raises(PermissionError):
+        tee(FakeCursor([("n", int)], [(2,)]), [cache.sink("k")])
+    assert cache.get("k").row(0) == (1,)
+    assert [p.name for p in tmp_path.iterdir()] == ["k"]
+
+    monkeypatch.setattr(os, "replace", replace)
+    tee(FakeCursor([("n", int)], [(3,)]), [cache.sink("k")])
+    assert cache.get("k").row(0) == (3,)
+    assert [p.name for p in tmp_path.iterdir()] == ["k"]
+
+
+def test_failure_after_commit_keeps_cache_entry(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path / "cache")
+
+    class Broken(TextSink):
+        def _close(self):
+            super()._close()
+            raise OSError("disk full")
+
+    output = tmp_path / "out.csv"
+    with pytest.raises(OSError):
+        tee(FakeCursor([("n", int)], [(1,)]), [cache.sink("k"), Broken(output)])
+    assert cache.get("k").row(0) == (1,)
+    assert not output.exists()
+
+    def evict(**kwargs):
+        raise OSError("busy")
+
+    monkeypatch.setattr(cache, "evict", evict)
+    with pytest.raises(OSError):
+        tee(FakeCursor([("n", int)], [(2,)]), [cache.sink("k")])
+    assert cache.get("k").row(0) == (2,)
+
+
+def test_cache_key_ignores_formatting():
+    assert normalize_sql("SELECT  a -- c\n FROM [t  x]\n WHERE b = 'x  y';") == (
+        "SELECT a FROM [t  x] WHERE b = 'x  y'"
+    )
+    assert cache_key(1, "select a\nfrom t") == cache_key(1, "select a /* x */ from t;")
+    assert cache_key(1, "select a from t") != cache_key(2, "select a from t")
+    assert cache_key(1, "select ?", [1]) != cache_key(1, "select ?", [2])
+
+
+
+def test_ttl_lru_budget_and_stats(tmp_path):
+    cache = ResultCache(tmp_path)
+    for key in ("a", "b", "c"):
+        tee(FakeCursor([("n", int)], [(i,) for i in range(100)]), [cache.sink(key, profile_id=key)])
+    size = cache.entries()[0]["size"]
+    for age, key in enumerate("abc"):
+        os.utime(cache.path(key) / "meta.json", (1000 + age, 1000 + age))
+
+    assert cache.get("a") is not None  # a is now the most recently used
+    assert cache.get("missing") is None
+    cache.max_bytes = size * 2
+    assert cache.evict() == 1
+    assert [meta["key"] for meta in cache.entries()] == ["c", "a"]
+
+    meta_path = cache.path("c") / "meta.json"
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    assert dt.datetime.fromisoformat(meta["created_at"]).utcoffset() == dt.timedelta(0)
+    # Older entries hold local naive times.
+    meta["created_at"] = (dt.datetime.now() - dt.timedelta(hours=2)).isoformat()
+    meta_path.write_text(json.dumps(meta), encoding="utf-8")
+    assert cache.get("c", max_age=3600) is None and not cache.path("c").exists()
+    assert cache.get("a", max_age=3600) is not None
+
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.expired, stats.evictions) == (2, 2, 1, 1)
+    assert stats.as_dict()["hit_rate"] == 0.5
+
+
+def test_storing_over_budget_evicts_and_invalidate_where(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=1)
+    tee(FakeCursor([("n", int)], [(1,)]), [cache.sink("old", profile_id=1, dataset_id=1)])
+    tee(FakeCursor([("n", int)], [(2,)]), [cache.sink("new", profile_id=1, dataset_id=2)])
+    # The entry just stored is kept even though it alone exceeds the budget.
+    assert [meta["key"] for meta in cache.entries()] == ["new"]
+
+    cache.max_bytes = None
+    tee(FakeCursor([("n", int)], [(3,)]), [cache.sink("other", profile_id=2, dataset_id=3)])
+    assert cache.invalidate_where(dataset_id=2) == 1
+    assert cache.invalidate_where(profile_id=1) == 0
+    assert [meta["key"] for meta in cache.entries()] == ["other"]
+
+
+def test_append_extends_entry_and_tracks_watermark(tmp_path):
+    cache = ResultCache(tmp_path, max_dictionary=4)
+    rows = [_row(i) for i in range(10)]
+    sink = cache.sink("k", watermark="created", profile_id=1)
+    tee(FakeCursor(DESCRIPTION, rows), [sink], fetch_size=3)
+    assert cache.get("k").watermark == rows[-1][3]
+
+    more = [_row(i) for i in range(10, 30)]
+    sink = cache.sink("k", append=True, watermark="created")
+    assert tee(FakeCursor(DESCRIPTION, more), [sink], fetch_size=6) == 20
+
+    result = cache.get("k")
+    assert len(result) == 30 and result.meta["profile_id"] == 1
+    assert [result.row(i) for i in range(30)] == rows + more
+    assert result.column(1).encoding == "dictionary"
+    assert result.watermark == more[-1][3]
+
+    with pytest.raises(ValueError):
+        tee(FakeCursor([("other", int)], [(1,)]), [cache.sink("k", append=True)])
+    assert len(cache.get("k")) == 30
+
+
+def test_append_switches_dictionary_to_blob(tmp_path):
+    cache = ResultCache(tmp_path, max_dictionary=5)
+    tee(FakeCursor([("s", str), ("b", bytes)], [("a", None), (None, None)]), [cache.sink("k")])
+    more = [(f"v{i}", bytes([i])) for i in range(8)]
+    tee(FakeCursor([("s", str), ("b", bytes)], more), [cache.sink("k", append=True)])
+
+    result = cache.get("k")
+    assert result.column(0).encoding == "blob"
+    assert [result.row(i) for i in range(10)] == [("a", None), (None, None)] + more
+
+
+def test_append_shares_files_and_drops_leftovers_of_failed_append(tmp_path):
+    cache = ResultCache(tmp_path)
+    rows = [_row(i) for i in range(10)]
+    tee(FakeCursor(DESCRIPTION, rows), [cache.sink("k")])
+    values = cache.path("k") / "0.values"
+    inode = values.stat().st_ino
+
+    class Failing(FakeCursor):
+        def fetchmany(self, size):
+            if not self._rows:
+                raise RuntimeError("lost")
+            return super().fetchmany(size)
+
+    with pytest.raises(RuntimeError):
+        tee(Failing(DESCRIPTION, [_row(i) for i in range(10, 15)]), [cache.sink("k", append=True)])
+    # The appended bytes stay behind the committed rows and are not visible.
+    assert values.stat().st_size > 10 * 8
+    result = cache.get("k")
+    assert [result.row(i) for i in range(len(result))] == rows
+
+    more = [_row(i) for i in range(10, 13)]
+    tee(FakeCursor(DESCRIPTION, more), [cache.sink("k", append=True)])
+    result = cache.get("k")
+    assert [result.row(i) for i in range(len(result))] == rows + more
+    # The entry was extended, not copied.
+    assert (cache.path("k") / "0.values").stat().st_ino == inode
+    assert [p.name for p in tmp_path.iterdir()] == ["k"]
+
+
+def test_watermark_query():
+    assert watermark_query("SELECT a, ts FROM t ORDER BY a;", "ts") == (
+        "SELECT * FROM (SELECT a, ts FROM t) AS src WHERE src.[ts] > ? ORDER BY src.[ts]"
+    )
+    assert "ORDER BY a) AS src" in watermark_query("SELECT TOP 5 a FROM t ORDER BY a", "a")
+    paged = "SELECT a FROM t ORDER BY a OFFSET 10 ROWS FETCH NEXT 5 ROWS ONLY"
+    assert f"FROM ({paged}) AS src" in watermark_query(paged, "a")
+    with pytest.raises(ValueError):
+        watermark_query("WITH x AS (SELECT a FROM t) SELECT a FROM x", "a")
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+from PySide6.QtCore import QModelIndex, Qt
+from PySide6.QtWidgets import QApplication
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from conftest import FakeCursor
+from src.core.columnar import ColumnarBuffer
+from src.core.tasks import TaskRunner
+from src.modules.datasets import ResultCache, tee
+from src.ui.result_grid import ResultGrid, ResultTableModel, format_value
+
+
+def _cursor(total: int) -> FakeCursor:
+    rows = [(i, f"row {i}", None if i % 2 else i / 2) for i in range(total)]
+    return FakeCursor([("id",), ("name",), ("amount",)], rows)
+
+
+def test_buffer_spills_blocks_and_reads_them_back(tmp_path):
+    buffer = ColumnarBuffer(["a", "b"], block_rows=10, max_blocks=2, spill_dir=tmp_path)
+    buffer.append((i, str(i)) for i in range(25))
+    # Reading an old block must not push out the partially filled tail.
+    assert buffer.value(3, 1) == "3"
+    buffer.append((i, str(i)) for i in range(25, 95))
+    assert len(buffer) == 95
+    assert buffer.blocks_in_memory <= 2
+    assert [buffer.value(i, 0) for i in range(95)] == list(range(95))
+    assert buffer.row(94) == (94, "94")
+    buffer.close()
+    assert not any(tmp_path.iterdir())
+
+
+def test_model_fetches_incrementally_and_formats_lazily():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    QApplication.instance() or QApplication([])
+    cursor = _cursor(2500)
+    model = ResultTableModel(cursor, fetch_size=1000)
+
+    assert model.rowCount() == 0 and model.columnCount() == 3
+    assert model.headerData(1, Qt.Horizontal) == "name"
+    assert model.canFetchMore(QModelIndex())
+    model.fetchMore(QModelIndex())
+    assert model.rowCount() == 1000 and cursor.fetches == 1
+
+    model.fetchMore(QModelIndex())
+    model.fetchMore(QModelIndex())
+    assert model.rowCount() == 2500
+    assert not model.canFetchMore(QModelIndex())
+
+    assert model.data(model.index(2, 1)) == "row 2"
+    assert model.data(model.index(1, 2)) == "NULL"
+    assert model.data(model.index(2, 2)) == "1"
+    assert model.data(model.index(2, 0), Qt.TextAlignmentRole) == int(Qt.AlignRight | Qt.AlignVCenter)
+
+    model.close()
+    assert cursor.closed and model.rowCount() == 0
+
+
+def test_format_value():
+    assert format_value(b"\x01\xff") == "0x01FF"
+    assert format_value(0.1 + 0.2) == "0.3"
+
+
+def test_grid_shows_and_sorts_cached_result(tmp_path):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    QApplication.instance() or QApplication([])
+    cache = ResultCache(tmp_path)
+    key = cache.key(1, "SELECT id, name FROM t")
+    cursor = FakeCursor([("id", int), ("name", str)], [(3, "c"), (1, None), (2, "b")])
+    tee(cursor, [cache.sink(key)])
+
+    grid = ResultGrid()
+    grid.set_result(cache.get(key))
+    model = grid.model
+    assert model.rowCount() == 3 and not model.canFetchMore(QModelIndex())
+    assert model.data(model.index(0, 1)) == "c"
+
+    model.sort(0, Qt.AscendingOrder)
+    assert [model.data(model.index(i, 0)) for i in range(3)] == ["1", "2", "3"]
+    model.sort(1, Qt.DescendingOrder)
+    assert [model.data(model.index(i, 1)) for i in range(3)] == ["c", "b", "NULL"]
+    grid.close_result()
+
+
+def _pump(app, until):
+    for _ in range(200):
+        app.processEvents()
+        if until():
+            return
+        time.sleep(0.01)
+
+
+def test_close_waits_for_running_fetch_before_closing_cursor():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication.instance() or QApplication([])
+    runner = TaskRunner(max_workers=1)
+    started, release = threading.Event(), threading.Event()
+    cursor = _cursor(10)
+    fetch = cursor.fetchmany
+
+    def slow_fetch(size):
+        started.set()
+        release.wait(5)
+        return fetch(size)
+
+    cursor.fetchmany = slow_fetch
+    model = ResultTableModel(cursor, runner=runner)
+    resets = []
+    model.modelReset.connect(lambda: resets.append(True))
+    model.fetchMore(QModelIndex())
+    assert started.wait(5)
+
+    model.close()
+    assert resets and model.rowCount() == 0 and model.columnCount() == 0
+    assert not cursor.closed
+    release.set()
+    _pump(app, lambda: cursor.closed)
+    assert cursor.closed and model.rowCount() == 0
+    runner.shutdown()
+
+
+def test_failed_fetch_is_reported_not_treated_as_complete():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication.instance() or QApplication([])
+    runner = TaskRunner(max_workers=1)
+    cursor = _cursor(10)
+
+    def broken_fetch(size):
+        raise RuntimeError("connection lost")
+
+    cursor.fetchmany = broken_fetch
+    grid = ResultGrid(cursor, runner=runner)
+    messages = []
+    grid.model.fetch_failed.connect(messages.append)
+    grid.model.fetchMore(QModelIndex())
+    _pump(app, lambda: messages)
+
+    assert messages == ["connection lost"]
+    assert isinstance(grid.model.error, RuntimeError)
+    assert not grid.model.canFetchMore(QModelIndex())
+    assert not grid.error_label.isHidden() and "connection lost" in grid.error_label.text()
+    grid.close_result()
+    assert grid.model.error is None and grid.error_label.isHidden()
+    runner.shutdown()
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import datetime as dt
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2] / "src"))
+
+from core.migrations import apply_migrations
+from modules.schema import SchemaCache
+
+
+def test_watermark_columns_come_from_snapshot():
+    conn = sqlite3.connect(":memory:")
+    apply_migrations(conn)
+    cache = SchemaCache(conn)
+    assert cache.watermark_columns("prod", "orders") == []
+
+    column = {"schema": "dbo", "table": "orders", "nullable": False}
+    cache.store(
+        "prod",
+        {
+            "columns": [
+                {**column, "name": "created_at", "type": "datetime2"},
+                {**column, "name": "id", "type": "int"},
+                {**column, "name": "note", "type": "nvarchar"},
+                {**column, "name": "rv", "type": "timestamp"},
+                {**column, "table": "other", "name": "x", "type": "bigint"},
+            ],
+            "primary_keys": [{"schema": "dbo", "table": "orders", "column": "id"}],
+        },
+    )
+    # Only the unique key: equal created-at times or rowversion would lose
+    # or duplicate rows.
+    assert cache.watermark_columns("prod", "orders") == ["id"]
+    assert cache.watermark_columns("prod", "other") == []
+    conn.close()
+
+
+def test_partition_columns_lead_primary_key_or_index():
+    conn = sqlite3.connect(":memory:")
+    apply_migrations(conn)
+    cache = SchemaCache(conn)
+    column = {"schema": "dbo", "table": "orders", "nullable": False}
+    cache.store(
+        "prod",
+        {
+            "columns": [
+                {**column, "name": "id", "type": "int"},
+                {**column, "name": "created_at", "type": "datetime2"},
+                {**column, "name": "note", "type": "nvarchar"},
+                {**column, "name": "amount", "type": "money"},
+            ],
+            "primary_keys": [{"schema": "dbo", "table": "orders", "column": "id"}],
+            "indexes": [
+                {"schema": "dbo", "table": "orders", "name": "ix_note", "columns": ["note"]},
+                {"schema": "dbo", "table": "orders", "name": "ix_date", "columns": ["created_at", "id"]},
+                {"schema": "dbo", "table": "orders", "name": "ix_amount", "columns": ["amount"]},
+            ],
+        },
+    )
+    # Strings are not split into ranges; money is not in PARTITION_TYPES.
+    assert cache.partition_columns("prod", "orders") == ["id", "created_at"]
+    assert cache.partition_columns("prod", "orders", schema="sales") == []
+    conn.close()
+
+
+def test_cached_at_is_aware_and_legacy_naive_times_still_load():
+    conn = sqlite3.connect(":memory:")
+    apply_migrations(conn)
+    cache = SchemaCache(conn)
+    cache.store("prod", {"columns": []})
+    payload = json.loads(conn.execute("SELECT schema FROM schema_cache").fetchone()[0])
+    assert dt.datetime.fromisoformat(payload["cached_at"]).utcoffset() == dt.timedelta(0)
+    assert cache.get("prod") == {"columns": []}
+
+    # Entries written before the times carried a zone hold naive UTC.
+    payload["cached_at"] = (dt.datetime.now(dt.timezone.utc) - dt.timedelta(minutes=1)).replace(
+        tzinfo=None
+    ).isoformat()
+    conn.execute("UPDATE schema_cache SET schema=?", (json.dumps(payload),))
+    assert cache.get("prod") == {"columns": []}
+    conn.close()
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import importlib
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2] / "src"))
+
+from core.startup import StartupProfiler
+
+
+def test_import_times_are_recorded(tmp_path, monkeypatch):
+    package = tmp_path / "slowpkg"
+    package.mkdir()
+    (package / "__init__.py").write_text("from . import child\n", encoding="utf-8")
+    (package / "child.py").write_text("import time\ntime.sleep(0.02)\n", encoding="utf-8")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    startup = StartupProfiler()
+    startup.install()
+    try:
+        module = importlib.import_module("slowpkg")
+    finally:
+        startup.uninstall()
+        sys.modules.pop("slowpkg", None)
+        sys.modules.pop("slowpkg.child", None)
+
+    child = startup.imports["slowpkg.child"]
+    parent = startup.imports["slowpkg"]
+    assert child["self"] >= 0.02
+    assert parent["total"] >= child["total"]
+    assert parent["self"] < child["self"]
+    # Модулю возвращается исходный загрузчик.
+    assert type(module.__loader__).__name__ != "_TimedLoader"
+    assert startup._finder is None
+
+    startup.mark("first_paint")
+    report = startup.report()
+    assert "first_paint" in report["marks"]
+    assert report["imports"][0]["module"] == "slowpkg.child"
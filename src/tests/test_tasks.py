@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from src.core.events import EventBus, QueuedDispatcher
+from src.core.tasks import TaskCancelled, TaskGroup, TaskRunner, current_task
+
+
+def _blocker(runner: TaskRunner) -> threading.Event:
+    release = threading.Event()
+    runner.submit(release.wait, 5)
+    time.sleep(0.05)  # the only worker is now busy
+    return release
+
+
+def test_higher_priority_runs_first():
+    runner = TaskRunner(max_workers=1)
+    order = []
+    release = _blocker(runner)
+    handles = [
+        runner.submit(order.append, "low", priority=0),
+        runner.submit(order.append, "high", priority=10),
+        runner.submit(order.append, "mid", priority=5),
+    ]
+    release.set()
+    for handle in handles:
+        handle.result(timeout=5)
+    assert order == ["high", "mid", "low"]
+    runner.shutdown()
+
+
+def test_identical_in_flight_tasks_are_deduplicated():
+    runner = TaskRunner(max_workers=1)
+    calls = []
+    release = _blocker(runner)
+    first = runner.submit(calls.append, 1, key="same")
+    second = runner.submit(calls.append, 2, key="same")
+    assert first is second
+    release.set()
+    first.result(timeout=5)
+    third = runner.submit(calls.append, 3, key="same")
+    third.result(timeout=5)
+    assert calls == [1, 3]
+    runner.shutdown()
+
+
+def test_cancellation_and_gui_thread_delivery():
+    runner = TaskRunner(max_workers=2)
+    dispatcher = QueuedDispatcher()
+    delivered = []
+    started = threading.Event()
+
+    def slow() -> None:
+        started.set()
+        task = current_task()
+        while True:
+            task.check()
+            time.sleep(0.01)
+
+    running = runner.submit(slow, on_done=delivered.append, dispatcher=dispatcher)
+    assert started.wait(5)
+    running.cancel()
+    with pytest.raises(TaskCancelled):
+        running.result(timeout=5)
+
+    done = runner.submit(lambda: 42, on_done=delivered.append, dispatcher=dispatcher)
+    done.result(timeout=5)
+    time.sleep(0.05)
+    # Callbacks run only when the receiving thread drains its queue.
+    assert delivered == []
+    dispatcher.process_pending()
+    assert delivered == [42]
+    runner.shutdown()
+
+
+def test_progress_is_published_on_bus():
+    bus = EventBus()
+    runner = TaskRunner(max_workers=1, bus=bus)
+    progress = []
+    finished = []
+    bus.subscribe(TaskRunner.EVENT_PROGRESS, lambda task, value, msg: progress.append((value, msg)))
+    bus.subscribe(TaskRunner.EVENT_FINISHED, finished.append)
+
+    def work() -> str:
+        current_task().progress(0.5, "half")
+        return "ok"
+
+    handle = runner.submit(work)
+    assert handle.result(timeout=5) == "ok"
+    runner.shutdown()
+    assert progress == [(0.5, "half")]
+    assert finished == [handle]
+
+
+def test_connection_dialog_tests_in_background(monkeypatch):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication, QMessageBox
+
+    from src.ui.dialog_connection import ConnectionDialog
+
+    app = QApplication.instance() or QApplication([])
+    caller = []
+
+    class Manager:
+        def test_connection(self, profile):
+            caller.append(threading.current_thread())
+            return True, None
+
+    shown = []
+    monkeypatch.setattr(QMessageBox, "information", lambda *args: shown.append(args[2]))
+    runner = TaskRunner(max_workers=1)
+    dialog = ConnectionDialog(Manager(), runner=runner)
+    dialog.name_edit.setText("p")
+    dialog.test_button.click()
+    assert not dialog.test_button.isEnabled()
+
+    deadline = time.monotonic() + 5
+    while not shown and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    assert shown == ["Соединение установлено"]
+    assert caller[0] is not threading.main_thread()
+    assert dialog.test_button.isEnabled()
+    runner.shutdown()
+
+
+def test_failing_dispatcher_does_not_kill_the_worker():
+    class Broken(QueuedDispatcher):
+        def post(self, call, key=None):
+            raise RuntimeError("Signal source has been deleted")
+
+    runner = TaskRunner(max_workers=1)
+    runner.submit(lambda: 1, on_done=print, dispatcher=Broken()).result(timeout=5)
+    assert runner.submit(lambda: 2).result(timeout=5) == 2
+    runner.shutdown()
+
+
+def test_master_key_dialog_cancel_drops_the_pending_key():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication
+
+    from src.ui.dialog_master_key import MasterKeyDialog
+
+    app = QApplication.instance() or QApplication([])
+    started = threading.Event()
+    derive = threading.Event()
+    applied = []
+
+    class Crypto:
+        def is_configured(self):
+            return False
+
+        def derive_key(self, password, salt):
+            started.set()
+            derive.wait(5)
+            return b"key"
+
+        def set_master_key(self, salt, key):
+            applied.append(key)
+
+    runner = TaskRunner(max_workers=1)
+    dialog = MasterKeyDialog(Crypto(), runner=runner)
+    dialog.password_edit.setText("pwd")
+    dialog.confirm_edit.setText("pwd")
+    dialog._handle_accept()
+    task = dialog._task
+    assert started.wait(5)
+    dialog.reject()
+    derive.set()
+    assert task.result(timeout=5) == b"key"
+    for _ in range(20):
+        app.processEvents()
+        time.sleep(0.01)
+    assert applied == []
+    runner.shutdown()
+
+
+def test_task_group_cancels_its_pending_tasks_on_close():
+    runner = TaskRunner(max_workers=1)
+    release = _blocker(runner)
+    group = TaskGroup(runner)
+    ran = []
+    handle = group.submit(ran.append, "group")
+    other = runner.submit(ran.append, "other")
+
+    group.close()
+    release.set()
+    other.result(timeout=5)
+    assert handle.cancelled and ran == ["other"]
+    with pytest.raises(RuntimeError):
+        group.submit(ran.append, "late")
+    runner.shutdown()
+
+
+def test_shared_keyed_task_is_cancelled_only_by_its_last_group():
+    runner = TaskRunner(max_workers=1)
+    release = _blocker(runner)
+    first, second = TaskGroup(runner), TaskGroup(runner)
+    results = {}
+    shared = first.submit(
+        lambda: "data", key="load", on_done=lambda value: results.setdefault("first", value)
+    )
+    assert second.submit(
+        lambda: "data", key="load", on_done=lambda value: results.setdefault("second", value)
+    ) is shared
+
+    first.close()
+    assert not shared.cancelled
+    release.set()
+    assert shared.result(timeout=5) == "data"
+    time.sleep(0.05)  # callbacks run after the future resolves
+    assert results == {"second": "data"}
+
+    release = _blocker(runner)
+    third, fourth = TaskGroup(runner), TaskGroup(runner)
+    pending = third.submit(lambda: "late", key="load")
+    fourth.submit(lambda: "late", key="load")
+    third.close()
+    fourth.close()
+    release.set()
+    assert pending.cancelled
+    runner.shutdown()
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from pathlib import Path
+
+from PySide6.QtWidgets import QApplication
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from src.ui.theme import DARK_THEME, LIGHT_THEME, ThemeCache
+
+
+def test_rendered_theme_is_reused_from_disk(tmp_path, monkeypatch):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication.instance() or QApplication([])
+
+    cache = ThemeCache(tmp_path)
+    theme = cache.apply(app, LIGHT_THEME)
+    assert theme.stylesheet and app.styleSheet() == theme.stylesheet
+    assert any(theme.icons.iterdir())
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # A new cache (e.g. the next start) loads the stylesheet without rendering.
+    fresh = ThemeCache(tmp_path)
+    monkeypatch.setattr(fresh, "_render", lambda *a: (_ for _ in ()).throw(AssertionError))
+    assert fresh.get(LIGHT_THEME).stylesheet == theme.stylesheet
+
+    cache.prerender(DARK_THEME).join()
+    dark = ThemeCache(tmp_path).get(DARK_THEME)
+    assert dark.stylesheet != theme.stylesheet
+    assert cache.key(DARK_THEME) != cache.key(LIGHT_THEME)
+
+
+def test_rendering_one_theme_does_not_block_another(tmp_path, monkeypatch):
+    cache = ThemeCache(tmp_path)
+    light = cache.get(LIGHT_THEME)
+    cache._memory.clear()
+    rendering = threading.Event()
+    release = threading.Event()
+    render = cache._render
+    calls = []
+
+    def slow(name, key):
+        rendering.set()
+        calls.append(release.wait(5))
+        return render(name, key)
+
+    monkeypatch.setattr(cache, "_render", slow)
+    first = cache.prerender(DARK_THEME)
+    second = cache.prerender(DARK_THEME)
+    assert rendering.wait(5)
+    # The light theme is on disk; loading it must not wait for the dark one.
+    assert cache.get(LIGHT_THEME).stylesheet == light.stylesheet
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert calls == [True]  # rendered once, and not until released
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import gc
 import os
 import sys
 from types import SimpleNamespace
@@ -11,7 +12,7 @@ sys.path.append(str(Path(__file__).resolve().parents[2]))
 
 from src.core.events import EventBus
 from src.core.registry import registry
-from src.core.module_api import BaseModule
+from src.core.module_api import BaseModule, profiler
 from src.ui.main_window import MainWindow
 
 
@@ -42,7 +43,7 @@ class DummyModule(BaseModule):
 
 def test_switching_modules_updates_ui():
     os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
-    app = QApplication([])
+    app = QApplication.instance() or QApplication([])
     bus = EventBus()
 
     registry._modules.clear()
@@ -64,9 +65,97 @@ def test_switching_modules_updates_ui():
 
     window.nav_list.setCurrentRow(1)
     assert m1.unmounted
+    assert m1.scope is None
+    assert m2.scope is not None
     assert window.active_module is m2
     assert window.canvas_layout.itemAt(0).widget().text() == "Module 2"
     assert window.props_layout.itemAt(0).widget().text() == "Props2"
     assert window.preview_layout.itemAt(0).widget().text() == "Prev2"
 
     app.quit()
+
+
+class KeepAliveModule(DummyModule):
+    keep_alive = True
+
+    def __init__(self, *args) -> None:  # noqa: ANN002
+        super().__init__(*args)
+        self.mount_count = 0
+        self.resumed = 0
+
+    def mount(self, ui, app, bus) -> None:  # noqa: D401, ANN001
+        super().mount(ui, app, bus)
+        self.mount_count += 1
+
+    def resume(self) -> None:
+        self.resumed += 1
+
+
+def test_keep_alive_modules_are_parked_and_evicted():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication.instance() or QApplication([])
+    bus = EventBus()
+
+    registry._modules.clear()
+    modules = [KeepAliveModule(f"k{i}", f"Keep {i}", f"P{i}", f"V{i}") for i in range(3)]
+    for module in modules:
+        registry.register(module)
+
+    config = SimpleNamespace(app_name="test", parked_modules_max=1)
+    window = MainWindow(config, bus)
+    k0, k1, k2 = modules
+
+    window.nav_list.setCurrentRow(0)
+    canvas_widget = window.canvas_layout.itemAt(0).widget()
+    window.nav_list.setCurrentRow(1)
+    assert not k0.unmounted
+    window.nav_list.setCurrentRow(0)
+
+    assert k0.mount_count == 1
+    assert k0.resumed == 1
+    assert window.canvas_layout.itemAt(0).widget() is canvas_widget
+    assert window.props_layout.itemAt(0).widget().text() == "P0"
+
+    # k0 and k1 compete for a single parking slot.
+    window.nav_list.setCurrentRow(2)
+    assert k1.unmounted
+    assert not k0.unmounted
+
+    app.quit()
+
+
+class LeakyModule(DummyModule):
+    def unmount(self) -> None:  # noqa: D401
+        super().unmount()
+        self.leak = QLabel("leak")
+
+
+def test_widget_count_ignores_parked_modules():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication.instance() or QApplication([])
+    # Windows of earlier tests must be gone before widgets are counted.
+    gc.collect()
+
+    registry._modules.clear()
+    parked = KeepAliveModule("k", "Keep", "P", "V")
+    leaky = LeakyModule("m", "Leaky", "P", "V")
+    other = DummyModule("o", "Other", "P", "V")
+    for module in (parked, leaky, other):
+        registry.register(module)
+    window = MainWindow(SimpleNamespace(app_name="test"), EventBus())
+
+    profiler.reset()
+    profiler.enable()
+    try:
+        window.nav_list.setCurrentRow(0)
+        window.nav_list.setCurrentRow(1)
+        # The parked module is evicted while the leaky one is active.
+        for entry in window._parked.clear():
+            window._discard_parked(entry)
+        window.nav_list.setCurrentRow(2)
+        assert profiler.report()["m"]["widgets_alive"] == 1
+    finally:
+        profiler.disable()
+        profiler.reset()
+
+    app.quit()
@@ -10,7 +10,10 @@ from PySide6.QtWidgets import (
     QSpinBox,
 )
 
+from ..core.container import container
+from ..core.tasks import TaskHandle, TaskRunner
 from ..modules.datasource import ConnectionManager, ConnectionProfile
+from .dispatch import QtDispatcher
 
 
 class ConnectionDialog(QDialog):
@@ -21,10 +24,16 @@ class ConnectionDialog(QDialog):
         manager: ConnectionManager,
         profile: ConnectionProfile | None = None,
         parent=None,
+        runner: TaskRunner | None = None,
     ) -> None:
         super().__init__(parent)
         self.manager = manager
         self.profile = profile
+        self.runner = runner or container.get("task_runner")
+        # Results of background tasks are delivered on the GUI thread; the
+        # dispatcher dies with the dialog, so late results are dropped.
+        self.dispatcher = QtDispatcher(self)
+        self._test_task: TaskHandle | None = None
         self.setWindowTitle("Профиль подключения")
 
         layout = QFormLayout(self)
@@ -100,8 +109,29 @@ class ConnectionDialog(QDialog):
 
     def _test_connection(self) -> None:
         profile = self._gather_profile()
-        ok, error = self.manager.test_connection(profile)
+        self.test_button.setEnabled(False)
+        self._test_task = self.runner.submit(
+            self.manager.test_connection,
+            profile,
+            key=("test_connection", profile.server, profile.database, profile.username),
+            priority=10,
+            owner=self,
+            on_done=self._on_tested,
+            on_error=lambda exc: self._on_tested((False, str(exc))),
+            dispatcher=self.dispatcher,
+        )
+
+    def _on_tested(self, outcome) -> None:
+        ok, error = outcome
+        self._test_task = None
+        self.test_button.setEnabled(True)
         if ok:
             QMessageBox.information(self, "Успех", "Соединение установлено")
         else:
             QMessageBox.warning(self, "Ошибка", error or "Не удалось подключиться")
+
+    def done(self, result: int) -> None:
+        if self._test_task is not None:
+            self._test_task.release(self)
+            self._test_task = None
+        super().done(result)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 import time
 
 from PySide6.QtCore import QTimer
@@ -14,7 +15,10 @@ from PySide6.QtWidgets import (
 
 # ``ui`` is a sibling of ``core`` inside ``src``; use a relative import so the
 # application can be executed without adjusting ``PYTHONPATH``.
+from ..core.container import container
 from ..core.crypto import CryptoManager
+from ..core.tasks import TaskHandle, TaskRunner
+from .dispatch import QtDispatcher
 
 
 class MasterKeyDialog(QDialog):
@@ -24,12 +28,17 @@ class MasterKeyDialog(QDialog):
     failed attempt the dialog locks for five minutes.
     """
 
-    def __init__(self, crypto: CryptoManager, parent=None) -> None:
+    def __init__(
+        self, crypto: CryptoManager, parent=None, runner: TaskRunner | None = None
+    ) -> None:
         super().__init__(parent)
         self.crypto = crypto
+        self.runner = runner or container.get("task_runner")
+        self.dispatcher = QtDispatcher(self)
         self.setWindowTitle("Мастер-пароль")
         self.attempts = 0
         self.lock_until: float | None = None
+        self._task: TaskHandle | None = None
 
         self.label = QLabel()
         self.password_edit = QLineEdit()
@@ -68,11 +77,40 @@ class MasterKeyDialog(QDialog):
             if not password or password != self.confirm_edit.text():
                 QMessageBox.warning(self, "Ошибка", "Пароли не совпадают.")
                 return
-            self.crypto.set_master_password(password)
-            self.accept()
+            # Key derivation (PBKDF2) takes a noticeable fraction of a second
+            # and runs in the background; settings are stored on this thread.
+            salt = os.urandom(16)
+            self._submit(
+                self.crypto.derive_key,
+                password,
+                salt,
+                on_done=lambda key: self._on_key_set(salt, key),
+            )
             return
 
-        if not self.crypto.verify_master_password(password):
+        self._submit(self.crypto.derive_master_key, password, on_done=self._on_key_verified)
+
+    def _submit(self, fn, *args, on_done) -> None:
+        self.buttons.setEnabled(False)
+        self._task = self.runner.submit(
+            fn,
+            *args,
+            priority=10,
+            on_done=on_done,
+            on_error=self._on_failed,
+            dispatcher=self.dispatcher,
+        )
+
+    def _on_key_set(self, salt: bytes, key: bytes) -> None:
+        self._task = None
+        self.buttons.setEnabled(True)
+        self.crypto.set_master_key(salt, key)
+        self.accept()
+
+    def _on_key_verified(self, key: bytes | None) -> None:
+        self._task = None
+        self.buttons.setEnabled(True)
+        if key is None or not self.crypto.unlock_with_key(key):
             self.attempts += 1
             QMessageBox.warning(self, "Ошибка", "Неверный пароль.")
             if self.attempts >= 3:
@@ -83,7 +121,20 @@ class MasterKeyDialog(QDialog):
 
         self.accept()
 
+    def _on_failed(self, exc: BaseException) -> None:
+        self._task = None
+        self.buttons.setEnabled(True)
+        QMessageBox.warning(self, "Ошибка", str(exc))
+
     def _unlock(self) -> None:
         self.attempts = 0
         self.lock_until = None
         self.password_edit.setEnabled(True)
+
+    def done(self, result: int) -> None:
+        # Cancel and close both end here; a cancelled task delivers nothing,
+        # so the password is not applied after the dialog is dismissed.
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        super().done(result)
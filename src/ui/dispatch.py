@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from typing import Callable
+
+from PySide6.QtCore import QObject, Qt, Signal, Slot
+
+from ..core.events import QueuedDispatcher
+
+
+class _Waker(QObject):
+    wake = Signal()
+
+    def __init__(self, callback: Callable[[], None], parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self._callback = callback
+
+    @Slot()
+    def run(self) -> None:
+        self._callback()
+
+
+class QtDispatcher(QueuedDispatcher):
+    """Delivers queued event handlers on the thread of a Qt event loop.
+
+    The dispatcher must be created on the target thread (normally the GUI
+    thread). Any thread may post to it; the queue is drained by the Qt event
+    loop, so handlers can safely touch widgets.
+    """
+
+    def __init__(self, parent: QObject | None = None) -> None:
+        super().__init__()
+        self._waker = _Waker(self._drain, parent)
+        self._waker.wake.connect(self._waker.run, Qt.QueuedConnection)
+        self._scheduled = False
+
+    def _wakeup(self) -> None:
+        with self._lock:
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self._waker.wake.emit()
+
+    def _drain(self) -> None:
+        with self._lock:
+            self._scheduled = False
+        self.process_pending()
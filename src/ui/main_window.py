@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from PySide6.QtCore import QSettings, Qt
+from PySide6.QtCore import QCoreApplication, QEvent, QSettings, Qt, QTimer
 from PySide6.QtGui import QAction
 from PySide6.QtWidgets import (
     QApplication,
@@ -15,12 +15,17 @@ from PySide6.QtWidgets import (
     QVBoxLayout,
 )
 
-from qt_material import apply_stylesheet
-
+from ..core.container import container
 from ..core.events import EventBus
+from ..core.module_api import profiler
 from ..core.registry import registry
-from ..modules.datasource import ConnectionManager
+from ..modules import datasource  # noqa: F401 - registers connection services
 from .dialog_connection import ConnectionDialog
+from .dispatch import QtDispatcher
+from .result_grid import ResultGrid
+from .startup import on_first_paint
+from .theme import DARK_THEME, LIGHT_THEME, theme_cache
+from .widget_cache import ParkedUi, ParkedUiCache
 
 
 class MainWindow(QMainWindow):
@@ -30,11 +35,24 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.config = config
         self.event_bus = event_bus
+        # Очередь для обработчиков событий, которые должны выполняться в
+        # GUI-потоке (``event_bus.subscribe(..., target=window.dispatcher)``).
+        self.dispatcher = QtDispatcher(self)
         self.setWindowTitle(config.app_name)
 
         self.settings = QSettings("mssql-module-construct", "main_window")
 
         self.active_module = None
+        self.result_grid: ResultGrid | None = None
+        self._widgets_baseline = 0
+        # Интерфейсы неактивных модулей с ``keep_alive``: скрытые виджеты
+        # хранятся в невидимом контейнере, пока не будут вытеснены.
+        self._parked = ParkedUiCache(
+            max_entries=getattr(config, "parked_modules_max", 3),
+            max_bytes=getattr(config, "parked_modules_memory_mb", 64) * 1024 * 1024,
+        )
+        self._parking = QWidget()
+        self.event_bus.subscribe("config:changed", self._on_config_changed, target=self.dispatcher)
 
         self._create_widgets()
         self._populate_navigation()
@@ -98,6 +116,10 @@ class MainWindow(QMainWindow):
         self.dark_theme_action = QAction("Тёмная тема", self, checkable=True)
         self.dark_theme_action.triggered.connect(self._toggle_theme)
 
+        self.module_profile_action = QAction("Профиль модулей", self)
+        self.module_profile_action.triggered.connect(self._show_module_profile)
+        self.module_profile_action.setVisible(profiler.enabled)
+
         self.connection_profiles_action = QAction("Профили подключений", self)
         self.connection_profiles_action.triggered.connect(self._open_connection_dialog)
 
@@ -119,44 +141,132 @@ class MainWindow(QMainWindow):
         view_menu.addAction(self.run_action)
         view_menu.addSeparator()
         view_menu.addAction(self.dark_theme_action)
+        view_menu.addAction(self.module_profile_action)
 
         connections_menu = menu_bar.addMenu("Подключения")
         connections_menu.addAction(self.connection_profiles_action)
 
     def _populate_navigation(self) -> None:
-        self.modules = registry.all()
-        for module in self.modules:
-            self.nav_list.addItem(module.title)
+        # Навигация строится по метаданным: модуль импортируется только при
+        # первой активации.
+        self.modules = registry.infos()
+        for info in self.modules:
+            self.nav_list.addItem(info.title)
 
     def _on_nav_changed(self, index: int) -> None:
         if index < 0 or index >= len(getattr(self, "modules", [])):
             return
-        module = self.modules[index]
+        module = registry.get(self.modules[index].id)
+        if module is None:
+            QMessageBox.warning(self, "Ошибка", "Не удалось загрузить модуль")
+            return
         self._activate_module(module)
 
     def _activate_module(self, module) -> None:
         if self.active_module is module:
             return
-        if self.active_module is not None:
-            self.event_bus.emit("module:before_unmount", self.active_module)
-            try:
-                self.active_module.unmount()
-            finally:
-                self.event_bus.emit("module:unmounted", self.active_module)
+        previous = self.active_module
+        # Сохранённый интерфейс забираем до парковки текущего модуля, чтобы
+        # он не был вытеснен из кеша.
+        parked = self._parked.take(module.id) if module is not None else None
+        unmounted = False
+        if previous is not None:
+            if getattr(previous, "keep_alive", False):
+                self._park_module(previous)
+            else:
+                self._unmount_module(previous)
+                unmounted = True
         self._set_canvas_widget(None)
+        if profiler.enabled:
+            # Виджеты, пережившие unmount, считаются относительно числа
+            # виджетов перед mount при полностью очищенных панелях.
+            # Припаркованные модули в счёт не входят: их виджеты удаляются
+            # при вытеснении и иначе занижали бы следующую разницу.
+            self._set_properties_widget(None)
+            self._set_preview_widget(None)
+            alive = self._count_widgets()
+            if unmounted:
+                profiler.record_widgets(previous, alive - self._widgets_baseline)
+            self._widgets_baseline = alive
         props = None
         preview = None
-        if module is not None:
+        if parked is not None:
+            with profiler.measure(module, "resume"):
+                for widget in parked.canvas:
+                    self.canvas_layout.addWidget(widget)
+                    widget.show()
+                props, preview = parked.props, parked.preview
+                module.resume()
+            self.event_bus.emit("module:resumed", module)
+        elif module is not None:
             self.event_bus.emit("module:before_mount", module)
-            module.mount(self.canvas, self.config, self.event_bus)
-            props = module.get_properties_widget(self)
-            preview = module.get_preview_widget(self)
+            module.scope = container.open_scope("module")
+            with profiler.measure(module, "mount", memory=True):
+                module.mount(self.canvas, self.config, self.event_bus)
+            with profiler.measure(module, "properties"):
+                props = module.get_properties_widget(self)
+            with profiler.measure(module, "preview"):
+                preview = module.get_preview_widget(self)
             self.event_bus.emit("module:mounted", module)
         self._set_properties_widget(props or QLabel(""))
         self._set_preview_widget(preview or QLabel(""))
+        if props is not None:
+            props.show()
+        if preview is not None:
+            preview.show()
         self.active_module = module
         self.event_bus.emit("module:changed", module)
 
+    def _unmount_module(self, module) -> None:
+        self.event_bus.emit("module:before_unmount", module)
+        try:
+            with profiler.measure(module, "unmount", memory=True):
+                module.unmount()
+        finally:
+            self._close_module_scope(module)
+            self.event_bus.emit("module:unmounted", module)
+
+    def _park_module(self, module) -> None:
+        """Скрывает виджеты модуля и сохраняет их в кеше."""
+
+        entry = ParkedUi(
+            module,
+            canvas=self._take_widgets(self.canvas_layout),
+            props=next(iter(self._take_widgets(self.props_layout)), None),
+            preview=next(iter(self._take_widgets(self.preview_layout)), None),
+        )
+        module.suspend()
+        self.event_bus.emit("module:suspended", module)
+        for evicted in self._parked.park(entry):
+            self._discard_parked(evicted)
+
+    def _discard_parked(self, entry: ParkedUi) -> None:
+        self._unmount_module(entry.module)
+        for widget in entry.widgets():
+            widget.deleteLater()
+
+    def _take_widgets(self, layout) -> list:
+        widgets = []
+        while layout.count():
+            item = layout.takeAt(0)
+            if w := item.widget():
+                w.hide()
+                w.setParent(self._parking)
+                widgets.append(w)
+        return widgets
+
+    def _count_widgets(self) -> int:
+        """Считает живые виджеты вне парковки, предварительно удалив отложенные."""
+
+        QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+        parked = len(self._parking.findChildren(QWidget))
+        return len(QApplication.allWidgets()) - parked
+
+    def _close_module_scope(self, module) -> None:
+        scope, module.scope = module.scope, None
+        if scope is not None:
+            scope.close()
+
     def _set_canvas_widget(self, widget: QWidget | None) -> None:
         while self.canvas_layout.count():
             item = self.canvas_layout.takeAt(0)
@@ -173,7 +283,21 @@ class MainWindow(QMainWindow):
         if widget is not None:
             self.props_layout.addWidget(widget)
 
+    def show_result(self, cursor) -> ResultGrid:
+        """Show the result set of an executed ``cursor`` in the preview area.
+
+        Rows are fetched from the cursor as the grid is scrolled.
+        """
+
+        grid = ResultGrid(cursor, runner=container.get("task_runner"))
+        self._set_preview_widget(grid)
+        self.result_grid = grid
+        return grid
+
     def _set_preview_widget(self, widget: QWidget | None) -> None:
+        if self.result_grid is not None and widget is not self.result_grid:
+            self.result_grid.close_result()
+            self.result_grid = None
         while self.preview_layout.count():
             item = self.preview_layout.takeAt(0)
             if w := item.widget():
@@ -181,12 +305,23 @@ class MainWindow(QMainWindow):
         if widget is not None:
             self.preview_layout.addWidget(widget)
 
+    def _show_module_profile(self) -> None:
+        QMessageBox.information(
+            self, "Профиль модулей", profiler.format_report() or "Нет данных"
+        )
+
+    def _on_config_changed(self, config, changes) -> None:  # noqa: ARG002
+        self.config = config
+        self.setWindowTitle(config.app_name)
+        self._parked.max_entries = getattr(config, "parked_modules_max", 3)
+        self._parked.max_bytes = getattr(config, "parked_modules_memory_mb", 64) * 1024 * 1024
+
     # ------------------------------------------------------------------
     # Connection profiles
     # ------------------------------------------------------------------
     def _open_connection_dialog(self) -> None:
         if not hasattr(self, "connection_manager"):
-            self.connection_manager = ConnectionManager()
+            self.connection_manager = container.get("connection_manager")
         dialog = ConnectionDialog(self.connection_manager, parent=self)
         dialog.exec()
 
@@ -215,8 +350,10 @@ class MainWindow(QMainWindow):
     # Theme management
     # ------------------------------------------------------------------
     def _apply_theme(self) -> None:
-        theme = "dark_teal_500" if self.dark_theme_action.isChecked() else "light_teal_500"
-        apply_stylesheet(QApplication.instance(), theme=theme)
+        dark = self.dark_theme_action.isChecked()
+        theme_cache.apply(QApplication.instance(), DARK_THEME if dark else LIGHT_THEME)
+        # Переключение темы не должно ждать рендеринга второй темы.
+        theme_cache.prerender(LIGHT_THEME if dark else DARK_THEME)
 
     def _toggle_theme(self, checked: bool) -> None:  # noqa: ARG002
         self._apply_theme()
@@ -235,7 +372,9 @@ class MainWindow(QMainWindow):
             self.v_splitter.restoreState(self.settings.value("v_splitter"))
         dark = self.settings.value("theme", "light") == "dark"
         self.dark_theme_action.setChecked(dark)
-        self._apply_theme()
+        # При первом запуске тема рендерится заметное время, поэтому она
+        # применяется после того, как окно впервые отрисовано.
+        on_first_paint(self, lambda: QTimer.singleShot(0, self, self._apply_theme))
 
     def _save_settings(self) -> None:
         self.settings.setValue("geometry", self.saveGeometry())
@@ -247,4 +386,7 @@ class MainWindow(QMainWindow):
 
     def closeEvent(self, event) -> None:  # noqa: N802
         self._save_settings()
+        self._activate_module(None)
+        for entry in self._parked.clear():
+            self._discard_parked(entry)
         super().closeEvent(event)
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+from functools import partial
+from typing import TYPE_CHECKING
+
 from PySide6.QtWidgets import (
     QMessageBox,
     QPushButton,
@@ -9,22 +12,26 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
+from ..core.container import container
+from ..core.tasks import TaskHandle, TaskRunner
 from ..modules.schema import SchemaCache
+from .dispatch import QtDispatcher
 
-try:
+if TYPE_CHECKING:  # pragma: no cover - used only when MSSQL available
     import pyodbc
-except ImportError:  # pragma: no cover - used only when MSSQL available
-    pyodbc = None  # type: ignore
 
 
 class SchemaPanel(QWidget):
     """Left panel widget displaying cached schema information."""
 
-    def __init__(self, cache: SchemaCache, parent=None) -> None:
+    def __init__(self, cache: SchemaCache, parent=None, runner: TaskRunner | None = None) -> None:
         super().__init__(parent)
         self.cache = cache
+        self.runner = runner or container.get("task_runner")
+        self.dispatcher = QtDispatcher(self)
         self.connection: pyodbc.Connection | None = None
         self.cache_name: str | None = None
+        self._refresh_task: TaskHandle | None = None
 
         self.tree = QTreeWidget()
         self.tree.setHeaderLabels(["Объект", "Тип"])
@@ -51,8 +58,41 @@ class SchemaPanel(QWidget):
         if not self.connection or not self.cache_name:
             QMessageBox.warning(self, "Нет соединения", "Сначала подключитесь к БД")
             return
-        data = self.cache.update(self.cache_name, self.connection)
-        self._populate_tree(data)
+        # Schema queries run in the background; the local cache is written
+        # on the GUI thread, which owns its SQLite connection.
+        name = self.cache_name
+        self.refresh_button.setEnabled(False)
+        self._refresh_task = self.runner.submit(
+            self.cache.collect,
+            self.connection,
+            key=("schema_refresh", name),
+            owner=self,
+            on_done=lambda data: self._on_refreshed(name, data),
+            on_error=self._on_refresh_failed,
+            dispatcher=self.dispatcher,
+        )
+        # A panel embedded in a window is usually deleted without a close
+        # event; drop the result then as well. Another panel refreshing the
+        # same cache keeps the shared task running.
+        self.destroyed.connect(partial(self._refresh_task.release, self))
+
+    def _on_refreshed(self, name: str, data) -> None:
+        self._refresh_task = None
+        self.refresh_button.setEnabled(True)
+        self.cache.store(name, data)
+        if name == self.cache_name:
+            self._populate_tree(data)
+
+    def _on_refresh_failed(self, exc: BaseException) -> None:
+        self._refresh_task = None
+        self.refresh_button.setEnabled(True)
+        QMessageBox.warning(self, "Ошибка", f"Не удалось обновить схему: {exc}")
+
+    def closeEvent(self, event) -> None:  # noqa: N802 - Qt API
+        if self._refresh_task is not None:
+            self._refresh_task.release(self)
+            self._refresh_task = None
+        super().closeEvent(event)
 
     # ------------------------------------------------------------------
     def _populate_tree(self, schema_data) -> None:
@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import datetime as dt
+import logging
+from decimal import Decimal
+from typing import Any, Optional
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt, Signal
+from PySide6.QtWidgets import (
+    QAbstractItemView,
+    QHeaderView,
+    QLabel,
+    QTableView,
+    QVBoxLayout,
+    QWidget,
+)
+
+from ..core.columnar import ColumnarBuffer
+from ..core.tasks import TaskHandle, TaskRunner
+from .dispatch import QtDispatcher
+
+#: Rows requested from the cursor per ``fetchMore``.
+FETCH_SIZE = 2000
+NULL_TEXT = "NULL"
+
+
+def format_value(value: Any) -> str:
+    """Render a cell value for display."""
+
+    if value is None:
+        return NULL_TEXT
+    if isinstance(value, float):
+        return f"{value:.15g}"
+    if isinstance(value, (dt.datetime, dt.date, dt.time)):
+        return value.isoformat(sep=" ") if isinstance(value, dt.datetime) else value.isoformat()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        data = bytes(value)
+        return "0x" + data[:32].hex().upper() + ("…" if len(data) > 32 else "")
+    return str(value)
+
+
+class ResultTableModel(QAbstractTableModel):
+    """Table model over a streaming DB-API cursor.
+
+    Rows are pulled with ``fetchmany`` only when the view asks for more
+    (``canFetchMore``/``fetchMore``) and kept in a :class:`ColumnarBuffer`,
+    whose memory does not grow with the row count. Cells are formatted in
+    :meth:`data`, only for rows the view actually paints. With a ``runner``
+    the fetch runs in the background and rows are appended on the GUI thread.
+    A failed fetch stops fetching, is kept in :attr:`error` and announced
+    by :attr:`fetch_failed`; the rows loaded so far stay visible.
+    """
+
+    fetch_failed = Signal(str)
+
+    def __init__(
+        self,
+        cursor: Any = None,
+        *,
+        fetch_size: int = FETCH_SIZE,
+        runner: TaskRunner | None = None,
+        buffer_blocks: int = 32,
+        parent=None,
+    ) -> None:
+        super().__init__(parent)
+        self.fetch_size = fetch_size
+        self.runner = runner
+        self.buffer_blocks = buffer_blocks
+        self.dispatcher = QtDispatcher(self) if runner is not None else None
+        self.cursor: Any = None
+        self.buffer = ColumnarBuffer([])
+        self._exhausted = True
+        self._fetching: Optional[TaskHandle] = None
+        self._order: Any = None
+        self.error: Optional[BaseException] = None
+        if cursor is not None:
+            self.set_cursor(cursor)
+
+    def set_cursor(self, cursor: Any) -> None:
+        """Show the result set of an executed ``cursor``."""
+
+        self.beginResetModel()
+        self._cancel_fetch()
+        self.buffer.close()
+        self.cursor = cursor
+        columns = [column[0] for column in getattr(cursor, "description", None) or ()]
+        self.buffer = ColumnarBuffer(columns, max_blocks=self.buffer_blocks)
+        self._order = None
+        self.error = None
+        self._exhausted = cursor is None or not columns
+        self.endResetModel()
+
+    def set_result(self, result: Any) -> None:
+        """Show a complete, already materialized result such as a cached one.
+
+        ``result`` provides the buffer interface (``columns``, ``len()``,
+        ``value``, ``close``); if it also has ``argsort`` the model can be
+        sorted by clicking a header.
+        """
+
+        self.beginResetModel()
+        self._cancel_fetch()
+        self.buffer.close()
+        self.cursor = None
+        self.buffer = result
+        self._order = None
+        self.error = None
+        self._exhausted = True
+        self.endResetModel()
+
+    def close(self) -> None:
+        """Drop buffered rows and close the cursor.
+
+        A ``fetchmany`` already running in the background is not
+        interrupted: the cursor is closed on the pool thread once it returns.
+        """
+
+        self.beginResetModel()
+        fetching = self._fetching
+        self._cancel_fetch()
+        self.buffer.close()
+        self.buffer = ColumnarBuffer([])
+        cursor, self.cursor = self.cursor, None
+        self._order = None
+        self.error = None
+        self._exhausted = True
+        self.endResetModel()
+        if cursor is None or not hasattr(cursor, "close"):
+            return
+        if fetching is not None:
+            fetching.future.add_done_callback(lambda _: cursor.close())
+        else:
+            cursor.close()
+
+    # ------------------------------------------------------------------
+    # QAbstractTableModel interface
+    # ------------------------------------------------------------------
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:  # noqa: N802
+        return 0 if parent.isValid() else len(self.buffer)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:  # noqa: N802
+        return 0 if parent.isValid() else len(self.buffer.columns)
+
+    def headerData(self, section: int, orientation, role: int = Qt.DisplayRole) -> Any:  # noqa: N802
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.buffer.columns[section]
+        return str(section + 1)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        row = index.row() if self._order is None else int(self._order[index.row()])
+        if role == Qt.DisplayRole:
+            return format_value(self.buffer.value(row, index.column()))
+        if role == Qt.TextAlignmentRole:
+            value = self.buffer.value(row, index.column())
+            if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+                return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def sort(self, column: int, order=Qt.AscendingOrder) -> None:
+        """Sort by ``column`` when the result supports ``argsort``.
+
+        Streaming results are not sorted: only part of them is loaded.
+        """
+
+        if not hasattr(self.buffer, "argsort") or not 0 <= column < len(self.buffer.columns):
+            return
+        self.layoutAboutToBeChanged.emit()
+        self._order = self.buffer.argsort(column, descending=order == Qt.DescendingOrder)
+        self.layoutChanged.emit()
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:  # noqa: N802
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()) -> None:  # noqa: N802
+        if parent.isValid() or self._exhausted or self._fetching is not None:
+            return
+        if self.runner is None:
+            self._append(self.cursor.fetchmany(self.fetch_size))
+            return
+        cursor = self.cursor
+        self._fetching = self.runner.submit(
+            cursor.fetchmany,
+            self.fetch_size,
+            priority=5,
+            on_done=lambda rows: self._on_fetched(cursor, rows),
+            on_error=lambda exc: self._on_fetch_failed(cursor, exc),
+            dispatcher=self.dispatcher,
+        )
+
+    # ------------------------------------------------------------------
+    def _on_fetched(self, cursor: Any, rows) -> None:
+        if cursor is not self.cursor:
+            return  # the model was reset while the fetch was running
+        self._fetching = None
+        self._append(rows)
+
+    def _on_fetch_failed(self, cursor: Any, exc: BaseException) -> None:
+        if cursor is not self.cursor:
+            return
+        logging.warning("Fetching result rows failed: %s", exc)
+        self._fetching = None
+        self._exhausted = True
+        self.error = exc
+        self.fetch_failed.emit(str(exc) or type(exc).__name__)
+
+    def _append(self, rows) -> None:
+        if not rows:
+            self._exhausted = True
+            return
+        first = len(self.buffer)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.buffer.append(rows)
+        self.endInsertRows()
+        if len(rows) < self.fetch_size:
+            self._exhausted = True
+
+    def _cancel_fetch(self) -> None:
+        if self._fetching is not None:
+            self._fetching.cancel()
+            self._fetching = None
+
+
+class ResultGrid(QWidget):
+    """Read-only grid for query results, virtualized over a :class:`ResultTableModel`."""
+
+    def __init__(self, cursor: Any = None, *, runner: TaskRunner | None = None, parent=None) -> None:
+        super().__init__(parent)
+        self.model = ResultTableModel(cursor, runner=runner, parent=self)
+        self.model.fetch_failed.connect(self._show_error)
+        self.model.modelReset.connect(self._hide_error)
+        self.error_label = QLabel()
+        self.error_label.setWordWrap(True)
+        self.error_label.hide()
+        self.view = QTableView()
+        self.view.setModel(self.model)
+        self.view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.view.setWordWrap(False)
+        # Fixed row heights and column widths keep layout cost independent
+        # of the row count: nothing is measured per row or per cell.
+        vertical = self.view.verticalHeader()
+        vertical.setSectionResizeMode(QHeaderView.Fixed)
+        vertical.setDefaultSectionSize(self.view.fontMetrics().height() + 6)
+        self.view.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.error_label)
+        layout.addWidget(self.view)
+
+    def set_cursor(self, cursor: Any) -> None:
+        self.view.setSortingEnabled(False)
+        self.model.set_cursor(cursor)
+
+    def set_result(self, result: Any) -> None:
+        self.view.setSortingEnabled(False)
+        self.model.set_result(result)
+        # Enabling sorting re-applies the header indicator; start unsorted.
+        self.view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.view.setSortingEnabled(hasattr(result, "argsort"))
+
+    def close_result(self) -> None:
+        """Release buffered rows and the cursor."""
+
+        self.model.close()
+
+    def _show_error(self, message: str) -> None:
+        self.error_label.setText(f"Не удалось загрузить строки: {message}")
+        self.error_label.show()
+
+    def _hide_error(self) -> None:
+        self.error_label.hide()
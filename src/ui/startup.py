@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from typing import Callable
+
+from PySide6.QtCore import QEvent, QObject
+
+
+class _FirstPaintFilter(QObject):
+    def __init__(self, widget: QObject, callback: Callable[[], None]) -> None:
+        super().__init__(widget)
+        self._callback = callback
+
+    def eventFilter(self, watched: QObject, event: QEvent) -> bool:  # noqa: N802
+        if event.type() == QEvent.Paint:
+            watched.removeEventFilter(self)
+            self.deleteLater()
+            self._callback()
+        return False
+
+
+def on_first_paint(widget: QObject, callback: Callable[[], None]) -> None:
+    """Call ``callback`` once, when ``widget`` receives its first paint event."""
+
+    widget.installEventFilter(_FirstPaintFilter(widget, callback))
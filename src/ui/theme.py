@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+from PySide6.QtCore import QDir
+from PySide6.QtGui import QColor, QFontDatabase, QGuiApplication, QPalette
+
+from ..core.config import BASE_DIR
+
+DARK_THEME = "dark_teal.xml"
+LIGHT_THEME = "light_teal_500.xml"
+DEFAULT_CACHE_DIR = BASE_DIR / "cache" / "themes"
+
+
+@dataclass(frozen=True)
+class RenderedTheme:
+    """A stylesheet rendered from a qt_material theme, with its icon directory."""
+
+    name: str
+    stylesheet: str
+    icons: Path
+    primary_color: str
+
+
+def _qt_material_version() -> str:
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version("qt-material")
+    except PackageNotFoundError:  # pragma: no cover - running from a checkout
+        return "unknown"
+
+
+def _theme_file(name: str) -> Path:
+    """Resolve ``name`` to a theme XML: a path or a theme bundled with qt_material."""
+
+    path = Path(name)
+    if path.suffix == ".xml" and path.exists():
+        return path
+    import qt_material
+
+    themes = Path(qt_material.__file__).resolve().parent / "themes"
+    return themes / (name if name.endswith(".xml") else f"{name}.xml")
+
+
+class ThemeCache:
+    """Disk cache of rendered qt_material stylesheets.
+
+    ``qt_material.apply_stylesheet`` renders a Jinja template and regenerates
+    every icon on each call. This cache renders a theme once. It stores the QSS
+    and recolored icons under ``cache/themes``. Entries are keyed by the theme
+    name, the qt_material version and a hash of the theme file. Applying a
+    cached theme is then a plain ``setStyleSheet`` with a precompiled string.
+    Rendering has no Qt side effects, so :meth:`prerender` can run it on a
+    background thread.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None) -> None:
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self._lock = threading.Lock()
+        self._memory: Dict[str, RenderedTheme] = {}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._fonts_loaded = False
+
+    def key(self, name: str) -> str:
+        source = _theme_file(name)
+        digest = hashlib.sha1(source.read_bytes()).hexdigest()[:10]
+        binding = "pyside6" if "PySide6" in sys.modules else "qt"
+        return f"{source.stem}-{_qt_material_version()}-{binding}-{digest}"
+
+    def get(self, name: str) -> RenderedTheme:
+        """Return the rendered theme ``name``, rendering it on a cache miss.
+
+        Rendering holds a lock of its own key only, so a background
+        :meth:`prerender` does not block the GUI thread asking for another
+        theme, while two requests for the same theme still render it once.
+        """
+
+        key = self.key(name)
+        with self._lock:
+            theme = self._memory.get(key)
+            if theme is not None:
+                return theme
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                theme = self._memory.get(key)
+            if theme is None:
+                theme = self._load(name, key) or self._render(name, key)
+                with self._lock:
+                    self._memory[key] = theme
+        return theme
+
+    def prerender(self, name: str) -> threading.Thread:
+        """Render ``name`` in a background thread if it is not cached yet."""
+
+        def run() -> None:
+            try:
+                self.get(name)
+            except Exception:  # pragma: no cover - logging
+                logging.exception("Failed to pre-render theme %s", name)
+
+        thread = threading.Thread(target=run, name="theme-prerender", daemon=True)
+        thread.start()
+        return thread
+
+    def apply(self, app, name: str) -> RenderedTheme:
+        """Apply the theme ``name`` to ``app``. Must be called on the GUI thread."""
+
+        theme = self.get(name)
+        if not self._fonts_loaded:
+            import qt_material
+
+            fonts = Path(qt_material.__file__).resolve().parent / "fonts" / "roboto"
+            for font in sorted(fonts.glob("*.ttf")):
+                QFontDatabase.addApplicationFont(str(font))
+            self._fonts_loaded = True
+        app.setStyle("Fusion")
+        palette = QGuiApplication.palette()
+        color = QColor(theme.primary_color)
+        color.setAlpha(92)
+        palette.setColor(QPalette.ColorRole.Text, color)
+        QGuiApplication.setPalette(palette)
+        QDir.setSearchPaths("icon", [str(theme.icons)])
+        app.setStyleSheet(theme.stylesheet)
+        return theme
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _resources_dir() -> Path:
+        import qt_material
+
+        return Path(qt_material.__file__).resolve().parent / "resources"
+
+    def _load(self, name: str, key: str) -> Optional[RenderedTheme]:
+        entry = self.cache_dir / key
+        try:
+            meta = json.loads((entry / "theme.json").read_text(encoding="utf-8"))
+            stylesheet = (entry / "style.qss").read_text(encoding="utf-8")
+        except (OSError, ValueError):
+            return None
+        if not (entry / "icons").is_dir():
+            return None
+        return RenderedTheme(name, stylesheet, entry / "icons", meta["primaryColor"])
+
+    def _render(self, name: str, key: str) -> RenderedTheme:
+        import jinja2
+        import qt_material
+        from qt_material.resources import ResourseGenerator
+
+        colors = qt_material.get_theme(str(_theme_file(name)))
+        if colors is None:
+            raise ValueError(f"Unknown theme: {name}")
+        for option, value in (
+            ("icon", None),
+            ("font_family", "Roboto"),
+            ("danger", "#dc3545"),
+            ("warning", "#ffc107"),
+            ("success", "#17a2b8"),
+            ("density_scale", "0"),
+            ("button_shape", "default"),
+        ):
+            colors.setdefault(option, value)
+
+        # Files are written to a temporary directory and moved into place, so
+        # a reader never sees a half-written entry.
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = self.cache_dir / key
+        tmp = self.cache_dir / f".{key}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        icons = tmp / "icons"
+        ResourseGenerator(
+            primary=colors["primaryColor"],
+            secondary=colors["secondaryColor"],
+            disabled=colors["secondaryLightColor"],
+            source=str(self._resources_dir() / "source"),
+            parent=str(icons),
+        ).generate()
+
+        template_path = Path(qt_material.TEMPLATE_FILE)
+        env = jinja2.Environment(
+            autoescape=False, loader=jinja2.FileSystemLoader(str(template_path.parent))
+        )
+        env.filters["opacity"] = qt_material.opacity
+        env.filters["density"] = qt_material.density
+        context = {
+            "linux": platform.system() == "Linux",
+            "windows": platform.system() == "Windows",
+            "darwin": platform.system() == "Darwin",
+            "pyqt6": "PyQt6" in sys.modules,
+            "pyside6": "PySide6" in sys.modules,
+            **colors,
+        }
+        stylesheet = env.get_template(template_path.name).render(context)
+
+        (tmp / "style.qss").write_text(stylesheet, encoding="utf-8")
+        (tmp / "theme.json").write_text(
+            json.dumps({"name": name, "primaryColor": colors["primaryColor"]}),
+            encoding="utf-8",
+        )
+        shutil.rmtree(entry, ignore_errors=True)
+        tmp.replace(entry)
+        logging.info("Theme %s rendered into %s", name, entry)
+        return RenderedTheme(name, stylesheet, entry / "icons", colors["primaryColor"])
+
+
+theme_cache = ThemeCache()
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+from PySide6.QtWidgets import QWidget
+
+#: Rough per-widget footprint used to estimate the size of a parked UI.
+WIDGET_COST_BYTES = 16 * 1024
+
+
+@dataclass
+class ParkedUi:
+    """Widgets of an inactive module kept alive for a fast switch back."""
+
+    module: Any
+    canvas: List[QWidget] = field(default_factory=list)
+    props: Optional[QWidget] = None
+    preview: Optional[QWidget] = None
+    size: int = 0
+
+    def widgets(self) -> List[QWidget]:
+        return [w for w in (*self.canvas, self.props, self.preview) if w is not None]
+
+    def estimate_size(self) -> int:
+        """Estimate the memory held by the parked widget trees."""
+
+        count = sum(1 + len(w.findChildren(QWidget)) for w in self.widgets())
+        self.size = count * WIDGET_COST_BYTES
+        return self.size
+
+
+class ParkedUiCache:
+    """Bounded LRU of parked module UIs.
+
+    Both the number of entries and their estimated total size are capped;
+    the least recently parked entries are evicted first.
+    """
+
+    def __init__(self, max_entries: int = 3, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, ParkedUi]" = OrderedDict()
+
+    def __contains__(self, module_id: str) -> bool:
+        return module_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_size(self) -> int:
+        return sum(entry.size for entry in self._entries.values())
+
+    def park(self, entry: ParkedUi) -> List[ParkedUi]:
+        """Store ``entry`` and return the entries evicted to stay in budget."""
+
+        if not entry.size:
+            entry.estimate_size()
+        self._entries[entry.module.id] = entry
+        self._entries.move_to_end(entry.module.id)
+        evicted: List[ParkedUi] = []
+        while self._entries and (
+            len(self._entries) > self.max_entries or self.total_size > self.max_bytes
+        ):
+            _, oldest = self._entries.popitem(last=False)
+            evicted.append(oldest)
+        return evicted
+
+    def take(self, module_id: str) -> Optional[ParkedUi]:
+        """Remove and return the parked UI of ``module_id``."""
+
+        return self._entries.pop(module_id, None)
+
+    def clear(self) -> List[ParkedUi]:
+        """Remove and return all parked UIs."""
+
+        entries = list(self._entries.values())
+        self._entries.clear()
+        return entries